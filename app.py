@@ -1,8 +1,4 @@
 import streamlit as st
-from modules.kpis import exibir_kpis
-from modules.confiabilidade import exibir_confiabilidade
-from modules.planejamento import exibir_planejamento
-from modules.gestao_operacional import exibir_gestao
 
 # Configuração da página
 st.set_page_config(
@@ -28,11 +24,17 @@ with st.sidebar:
     st.caption("Versão 1.0 | Engenharia de Confiabilidade")
 
 # Roteamento principal
+# Cada módulo é importado só quando sua página é aberta: a partida não carrega
+# lifelines, plotly, fpdf etc. de páginas que o usuário não visitou
 if opcao == "📊 KPIs de Manutenção":
+    from modules.kpis import exibir_kpis
     exibir_kpis()
 elif opcao == "🔧 Análise de Confiabilidade":
+    from modules.confiabilidade import exibir_confiabilidade
     exibir_confiabilidade()
 elif opcao == "📘 Planejamento Estratégico":
+    from modules.planejamento import exibir_planejamento
     exibir_planejamento()
 elif opcao == "👷 Gestão Operacional":
+    from modules.gestao_operacional import exibir_gestao
     exibir_gestao()
\ No newline at end of file
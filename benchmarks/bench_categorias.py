@@ -0,0 +1,83 @@
+# benchmarks/bench_categorias.py
+#
+# Memória e tempo das colunas de texto da hierarquia (SISTEMA, CONJUNTO, ITEM, CAUSA, EQUIPAMENTO, FROTA) como
+# texto simples (str.strip por linha, como antes) e como category (clean_and_convert_column), com até 1M falhas
+# de 2000 equipamentos: limpeza, memória e as operações típicas da página de KPIs (groupbys, isin, value_counts).
+# Uso, a partir da raiz do repositório: python -m benchmarks.bench_categorias [maior_n]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.pipeline_kpis import TEXT_COLS_FALHAS
+from modules.utils import clean_and_convert_column
+
+def falhas_brutas(n, n_equipamentos=2000, seed=0):
+    """Falhas como saem do Excel: colunas de texto object, com espaços sobrando em parte dos valores."""
+    rng = np.random.default_rng(seed)
+    vocabulario = {
+        'SISTEMA': [f'SISTEMA {i}' for i in range(12)],
+        'CONJUNTO': [f'CONJUNTO {i}' for i in range(80)],
+        'ITEM': [f'ITEM {i}' for i in range(400)],
+        'CAUSA': [f'CAUSA {i}' for i in range(40)],
+        'EQUIPAMENTO': [f'EQ{i:04d}' for i in range(n_equipamentos)],
+        'FROTA': [f'FROTA {i}' for i in range(20)],
+    }
+    df = pd.DataFrame({
+        col: np.array(valores + [f' {v} ' for v in valores], dtype=object)[rng.integers(0, 2 * len(valores), n)]
+        for col, valores in vocabulario.items()
+    })
+    df['DURAÇÃO'] = rng.exponential(4, n)
+    return df
+
+def limpar_texto(df):
+    """Limpeza anterior às categorias: str/strip linha a linha, coluna object."""
+    df = df.copy()
+    for col in TEXT_COLS_FALHAS:
+        df[col] = df[col].astype(str).str.strip()
+    return df
+
+def limpar_categorias(df):
+    df = df.copy()
+    for col in TEXT_COLS_FALHAS:
+        df[col] = clean_and_convert_column(df[col])
+    return df
+
+def operacoes_kpis(df):
+    """Agrupamentos, filtro e contagem que a página de KPIs faz sobre as colunas da hierarquia."""
+    for grupo in ('EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO', 'ITEM', ['EQUIPAMENTO', 'ITEM'], ['FROTA', 'EQUIPAMENTO'],
+                  ['SISTEMA', 'CONJUNTO', 'ITEM']):
+        df.groupby(grupo, observed=True)['DURAÇÃO'].agg(['sum', 'count'])
+    selecionados = df[df['EQUIPAMENTO'].isin(['EQ0001', 'EQ0500', 'EQ1500'])]
+    return len(selecionados), df['CAUSA'].value_counts().loc[lambda c: c > 0].nlargest(5)
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = np.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def memoria(df):
+    return df[TEXT_COLS_FALHAS].memory_usage(deep=True).sum() / 2 ** 20
+
+def main(maior_n=1_000_000):
+    for n in (n for n in (100_000, 1_000_000) if n <= maior_n):
+        bruto = falhas_brutas(n)
+        t_limpa_txt, texto = cronometrar(lambda: limpar_texto(bruto))
+        t_limpa_cat, categorias = cronometrar(lambda: limpar_categorias(bruto))
+        t_txt, (linhas_txt, causas_txt) = cronometrar(lambda: operacoes_kpis(texto))
+        t_cat, (linhas_cat, causas_cat) = cronometrar(lambda: operacoes_kpis(categorias))
+
+        # As duas codificações precisam dar os mesmos resultados
+        assert linhas_txt == linhas_cat
+        assert causas_txt.to_dict() == {str(k): v for k, v in causas_cat.items()}
+        print(f"  {n:>9,} falhas: memória {memoria(texto):.0f} MB (texto) vs {memoria(categorias):.1f} MB (category) · "
+              f"limpeza {t_limpa_txt:.2f} s vs {t_limpa_cat:.2f} s · groupbys + isin + value_counts "
+              f"{t_txt:.2f} s vs {t_cat:.2f} s")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,62 @@
+# benchmarks/bench_disponibilidade.py
+#
+# Tempo da MatrizDisponibilidade (horas paradas por equipamento × dia) com até 3M falhas de 2000 equipamentos
+# em 3 anos, e das séries de DF que saem dela, contra um parada_unida por dia.
+# Uso, a partir da raiz do repositório: python -m benchmarks.bench_disponibilidade [maior_n]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.motor_mtbf import MatrizDisponibilidade, parada_unida
+
+INICIO, FIM = pd.Timestamp('2022-01-01'), pd.Timestamp('2025-01-01')
+
+def falhas(n, n_equipamentos=2000, seed=0):
+    """Falhas com início uniforme nos 3 anos e duração exponencial (média de 5 h), em ordem de DATA INICIAL."""
+    rng = np.random.default_rng(seed)
+    inicio = INICIO.value + rng.integers(0, (FIM - INICIO).days * 86400, n).astype(np.int64) * 10 ** 9
+    fim = inicio + (rng.exponential(5, n) * 3600e9).astype(np.int64)
+    df = pd.DataFrame({
+        'EQUIPAMENTO': pd.Categorical.from_codes(
+            rng.integers(0, n_equipamentos, n), [f'EQ{i:04d}' for i in range(n_equipamentos)]
+        ),
+        'DATA INICIAL': pd.to_datetime(inicio),
+        'DATA FINAL': pd.to_datetime(fim),
+    })
+    return df.sort_values('DATA INICIAL', ignore_index=True)
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = np.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def por_dia(df, dias):
+    """Coluna da matriz calculada dia a dia com parada_unida, como faria um laço sobre os dias."""
+    return np.column_stack([
+        parada_unida(df, ['EQUIPAMENTO'], dia.start_time, dia.start_time + pd.Timedelta(days=1))['Tempo_Parada (h)']
+        for dia in dias
+    ])
+
+def main(maior_n=3_000_000):
+    for n in (n for n in (300_000, 1_000_000, 3_000_000) if n <= maior_n):
+        df = falhas(n)
+        t_matriz, matriz = cronometrar(lambda: MatrizDisponibilidade(df, INICIO, FIM))
+        t_series, _ = cronometrar(lambda: (matriz.serie('W'), matriz.serie_frota('M')))
+        t_um, _ = cronometrar(lambda: matriz.serie('D', ['EQ0005']))
+
+        # Laço por dia só nos primeiros 7 dias; o tempo total é estimado para o período inteiro
+        t_laco, semana = cronometrar(lambda: por_dia(df, matriz.dias[:7]), repeticoes=1)
+        erro = np.abs(matriz.parada[:, :7] - semana).max()
+        print(f"  {n:>9,} falhas, matriz {matriz.parada.shape[0]} × {matriz.parada.shape[1]}: "
+              f"{t_matriz:.2f} s ({matriz.nbytes / 2 ** 20:.1f} MB) · séries semanal + frota mensal "
+              f"{t_series * 1000:.0f} ms · 1 equipamento diário {t_um * 1000:.1f} ms · parada_unida por dia "
+              f"≈ {t_laco / 7 * len(matriz.dias):.0f} s (maior diferença {erro:.1e} h)")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000)
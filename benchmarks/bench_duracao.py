@@ -0,0 +1,52 @@
+# benchmarks/bench_duracao.py
+#
+# Tempo de clean_duration (por célula, via Series.apply) contra clean_duration_series em colunas de 1M linhas.
+# Uso, a partir da raiz do repositório: python -m benchmarks.bench_duracao [linhas]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import clean_duration, clean_duration_series
+
+def colunas(n, seed=0):
+    rng = np.random.default_rng(seed)
+    horas = np.round(rng.exponential(5, n), 2)
+    texto = horas.astype(str)
+    misto = texto.astype(object)
+    sorteio = rng.random(n)
+    misto[sorteio < 0.3] = np.char.add(np.char.replace(texto[sorteio < 0.3], '.', ','), 'h')
+    misto[(sorteio >= 0.3) & (sorteio < 0.4)] = '1:30'
+    misto[(sorteio >= 0.4) & (sorteio < 0.45)] = '2h15'
+    misto[(sorteio >= 0.45) & (sorteio < 0.5)] = 'sem registro'
+    # Pior caso: nenhum valor se repete (6 casas decimais), então converter só os distintos não ajuda
+    distintos = np.char.add(np.char.replace(np.round(rng.exponential(5, n), 6).astype(str), '.', ','), 'h').astype(object)
+    distintos[sorteio < 0.2] = 'sem registro'
+    return {
+        'células numéricas': pd.Series(horas, dtype=object),
+        'texto numérico': pd.Series(texto, dtype=object),
+        'texto misto (vírgula, "h", HH:MM, inválidos)': pd.Series(misto, dtype=object),
+        'texto "5,123456h" sem repetição, 20% inválidos': pd.Series(distintos, dtype=object),
+    }
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = np.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def main(n=1_000_000):
+    print(f"{n:,} linhas (melhor de 3)")
+    for nome, serie in colunas(n).items():
+        t_legado, legado = cronometrar(lambda: serie.apply(clean_duration), repeticoes=1)
+        t_vetor, vetor = cronometrar(lambda: clean_duration_series(serie))
+        iguais = np.isclose(vetor, legado, equal_nan=True).mean()
+        print(f"  {nome}: apply {t_legado:.2f} s · vetorizado {t_vetor:.2f} s "
+              f"({t_legado / t_vetor:.0f}x) · {iguais:.1%} iguais ao legado")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,48 @@
+# benchmarks/bench_importacao.py
+#
+# Tempo de partida de cada página do app.py: um interpretador novo importa streamlit e o módulo da página,
+# como faz o roteamento sob demanda, contra a importação de todas as páginas de uma vez (como era antes).
+# Mediana de vários interpretadores, para descontar o cache de disco e a variação entre execuções.
+# Uso, a partir da raiz do repositório: python -m benchmarks.bench_importacao [repeticoes]
+
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+PAGINAS = {
+    'kpis': 'modules.kpis',
+    'confiabilidade': 'modules.confiabilidade',
+    'planejamento': 'modules.planejamento',
+    'gestão operacional': 'modules.gestao_operacional',
+}
+
+# Bibliotecas que as páginas só importam quando há dados para analisar
+SOB_DEMANDA = {'lifelines': 'lifelines', 'plotly.express': 'plotly.express'}
+
+def tempo_importacao(modulos, repeticoes):
+    """Mediana do tempo de um interpretador novo, aberto na raiz do repositório, importando os módulos."""
+    codigo = '; '.join(f'import {modulo}' for modulo in modulos)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, check=True)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+def main(repeticoes=7):
+    base = tempo_importacao([], repeticoes)
+    print(f"  interpretador vazio: {base:.2f} s")
+    print(f"  streamlit: {tempo_importacao(['streamlit'], repeticoes):.2f} s")
+    print(f"  todas as páginas (importação antecipada): "
+          f"{tempo_importacao(['streamlit', *PAGINAS.values()], repeticoes):.2f} s")
+    for pagina, modulo in PAGINAS.items():
+        print(f"  só {pagina}: {tempo_importacao(['streamlit', modulo], repeticoes):.2f} s")
+    for nome, modulo in SOB_DEMANDA.items():
+        print(f"  {nome} (ao abrir a análise): {tempo_importacao([modulo], repeticoes) - base:.2f} s")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
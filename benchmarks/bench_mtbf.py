@@ -0,0 +1,59 @@
+# benchmarks/bench_mtbf.py
+#
+# Tempo do MotorMTBF (paradas unidas por EQUIPAMENTO × ITEM, EQUIPAMENTO e FROTA × EQUIPAMENTO) com até
+# 5M falhas de 2000 equipamentos, contra a fórmula antiga (período menos a soma das durações, por groupby).
+# Uso, a partir da raiz do repositório: python -m benchmarks.bench_mtbf [maior_n]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.motor_mtbf import MotorMTBF
+
+INICIO, FIM = pd.Timestamp('2024-01-01'), pd.Timestamp('2025-01-01')
+
+def falhas(n, n_equipamentos=2000, n_itens=60, n_frotas=20, seed=0):
+    """Falhas com início uniforme no ano e duração exponencial (média de 4 h), em ordem de DATA INICIAL."""
+    rng = np.random.default_rng(seed)
+    equipamento = rng.integers(0, n_equipamentos, n)
+    inicio = INICIO.value + rng.integers(0, 365 * 86400, n).astype(np.int64) * 10 ** 9
+    fim = inicio + (rng.exponential(4, n) * 3600e9).astype(np.int64)
+    df = pd.DataFrame({
+        'FROTA': pd.Categorical.from_codes(equipamento % n_frotas, [f'F{i:02d}' for i in range(n_frotas)]),
+        'EQUIPAMENTO': pd.Categorical.from_codes(equipamento, [f'EQ{i:04d}' for i in range(n_equipamentos)]),
+        'ITEM': pd.Categorical.from_codes(rng.integers(0, n_itens, n), [f'I{i:02d}' for i in range(n_itens)]),
+        'DATA INICIAL': pd.to_datetime(inicio),
+        'DATA FINAL': pd.to_datetime(fim),
+    })
+    return df.sort_values('DATA INICIAL', ignore_index=True)
+
+def formula_antiga(df):
+    """MTBF por ITEM como antes do motor: (horas do período - soma das durações) / falhas."""
+    horas = (FIM - INICIO).total_seconds() / 3600
+    duracao = (df['DATA FINAL'] - df['DATA INICIAL']).dt.total_seconds() / 3600
+    somas = duracao.groupby(df['ITEM'], observed=True).agg(['sum', 'size'])
+    return (horas - somas['sum']) / somas['size']
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = np.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def main(maior_n=5_000_000):
+    for n in (n for n in (100_000, 1_000_000, 5_000_000) if n <= maior_n):
+        df = falhas(n)
+        t_motor, motor = cronometrar(lambda: MotorMTBF(df, INICIO, FIM))
+        t_niveis, _ = cronometrar(lambda: [motor.agregar(nivel) for nivel in ('ITEM', 'EQUIPAMENTO', 'FROTA')])
+        t_antiga, antiga = cronometrar(lambda: formula_antiga(df))
+        por_item = motor.agregar('ITEM')['MTBF (h)']
+        print(f"  {n:>9,} falhas: motor {t_motor:.2f} s ({motor.nbytes / 2 ** 20:.1f} MB) · ITEM/EQUIPAMENTO/FROTA "
+              f"{t_niveis * 1000:.0f} ms · fórmula antiga {t_antiga:.2f} s · MTBF mediano por item "
+              f"{por_item.median():.1f} h (antiga {antiga.median():.1f} h)")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000)
@@ -0,0 +1,69 @@
+# benchmarks/bench_weibull_grupos.py
+#
+# Tempo de ajustar_weibull_por_grupo (Newton vetorizado sobre todos os grupos) contra um ajustar_weibull
+# por grupo, com 20 mil grupos EQUIPAMENTO × ITEM. Uso, a partir da raiz do repositório:
+# python -m benchmarks.bench_weibull_grupos [grupos]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.weibull import ajustar_weibull, ajustar_weibull_por_grupo
+
+def tempos_por_grupo(n_grupos, seed=0):
+    rng = np.random.default_rng(seed)
+    tamanhos = rng.integers(1, 41, n_grupos)
+    tempos = np.concatenate([
+        rng.uniform(10, 500) * rng.weibull(rng.uniform(0.6, 3), tamanho) for tamanho in tamanhos
+    ])
+    grupos = np.repeat(np.arange(n_grupos), tamanhos)
+    return pd.DataFrame({
+        'EQUIPAMENTO': grupos % 500,
+        'ITEM': grupos // 500,
+        'Tempo entre falhas (h)': tempos,
+        'Censurado': rng.random(len(tempos)) < 0.2,
+    })
+
+def por_grupo_individual(df, colunas_grupo, coluna_censura):
+    """Um ajustar_weibull por grupo; grupos que não podem ser ajustados ficam com NaN."""
+    betas, etas = [], []
+    for _, grupo in df.groupby(colunas_grupo, sort=True):
+        try:
+            ajuste = ajustar_weibull(grupo['Tempo entre falhas (h)'], censurados=grupo[coluna_censura])
+            betas.append(ajuste.beta)
+            etas.append(ajuste.eta)
+        except ValueError:
+            betas.append(np.nan)
+            etas.append(np.nan)
+    return np.array(betas), np.array(etas)
+
+def main(n_grupos=20_000):
+    df = tempos_por_grupo(n_grupos)
+    colunas_grupo = ['EQUIPAMENTO', 'ITEM']
+    print(f"{n_grupos:,} grupos, {len(df):,} tempos, {df['Censurado'].mean():.0%} censurados")
+
+    inicio = time.perf_counter()
+    betas, etas = por_grupo_individual(df, colunas_grupo, 'Censurado')
+    t_individual = time.perf_counter() - inicio
+
+    melhor = np.inf
+    for _ in range(3):
+        inicio = time.perf_counter()
+        tabela = ajustar_weibull_por_grupo(df, colunas_grupo, coluna_censura='Censurado')
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    mesmos_nan = np.array_equal(np.isnan(betas), tabela['Beta'].isna().to_numpy())
+    ajustados = ~np.isnan(betas)
+    diferenca = max(
+        np.max(np.abs(tabela['Beta'].to_numpy()[ajustados] / betas[ajustados] - 1)),
+        np.max(np.abs(tabela['Eta'].to_numpy()[ajustados] / etas[ajustados] - 1)),
+    )
+    print(f"  um ajuste por grupo: {t_individual:.2f} s")
+    print(f"  vetorizado (melhor de 3): {melhor:.3f} s ({t_individual / melhor:.0f}x)")
+    print(f"  {ajustados.sum():,} grupos ajustados · mesmos grupos sem ajuste: {mesmos_nan}"
+          f" · maior diferença relativa em beta/eta {diferenca:.1e}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
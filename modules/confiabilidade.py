@@ -1,10 +1,115 @@
 # modules/confiabilidade.py
 
+import hashlib
+import time
+from io import BytesIO
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-from lifelines import WeibullFitter
+
+from modules.distribuicoes import ajustar_distribuicoes_em_cache, avaliar_curvas, grade_adaptativa
+from modules.motor_kpis import DIMENSOES_CUBO
+from modules.utils import CacheLRU
+from modules.weibull import (
+    METODOS_AJUSTE, ajustar_weibull_em_cache, ajustar_weibull_por_grupo_em_cache, tempos_entre_falhas
+)
+
+COLUNA_TEMPO = 'Tempo entre falhas (h)'
+
+# Planilhas já lidas, pelo SHA-256 do arquivo enviado: reexecuções não releem o Excel
+_cache_planilhas = CacheLRU(max_entradas=4)
+
+# Tempos entre falhas derivados do histórico, por (arquivo, fim do período observado)
+_cache_tempos = CacheLRU(max_entradas=8)
+
+NOMES_METODOS = {'numpy': 'MLE (NumPy)', 'lifelines': 'lifelines'}
+
+CURVAS_DISTRIBUICOES = {
+    'R(t)': 'Confiabilidade R(t)',
+    'h(t)': 'Taxa de falha h(t)',
+    'H(t)': 'Risco acumulado H(t)',
+}
+
+def ler_dados_confiabilidade(conteudo):
+    """Dados do Excel enviado: a aba 'Falhas' do histórico de manutenção, limpa como na página de KPIs,
+    ou, sem ela, a coluna de tempos entre falhas com as colunas de agrupamento presentes (FROTA, EQUIPAMENTO, ITEM...).
+
+    Retorna (df, avisos, e_historico).
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(BytesIO(conteudo), read_only=True)
+    abas = workbook.sheetnames
+    workbook.close()
+    if 'Falhas' in abas:
+        # O pipeline de KPIs (e o que ele importa) só é carregado quando há histórico
+        from modules.pipeline_kpis import preparar_falhas
+
+        df_falhas, avisos = preparar_falhas(conteudo)
+        return df_falhas, avisos, True
+
+    df = pd.read_excel(BytesIO(conteudo))
+
+    # Verificação e tratamento dos dados
+    if COLUNA_TEMPO not in df.columns:
+        raise ValueError(f"Coluna '{COLUNA_TEMPO}' não encontrada e planilha 'Falhas' ausente. Verifique o arquivo.")
+
+    return df[[col for col in DIMENSOES_CUBO if col in df.columns] + [COLUNA_TEMPO]], [], False
+
+def exibir_ajustes_por_grupo(df, colunas_grupo):
+    """Tabela de β/η com intervalos de confiança de 95% para cada combinação das colunas de agrupamento."""
+    inicio = time.perf_counter()
+    ajustes = ajustar_weibull_por_grupo_em_cache(df, colunas_grupo, COLUNA_TEMPO, coluna_censura='Censurado')
+    segundos = time.perf_counter() - inicio
+
+    ajustados = int(ajustes['Beta'].notna().sum())
+    st.caption(
+        f"{ajustados} de {len(ajustes)} grupos ajustados em {segundos:.2f} s "
+        "(grupos com menos de 2 falhas, ou com as falhas todas iguais, ficam sem parâmetros)."
+    )
+    st.dataframe(
+        ajustes.sort_values('Amostras', ascending=False),
+        column_config={
+            col: st.column_config.NumberColumn(col, format="%.2f")
+            for col in ['Beta', 'Eta', 'Beta_Inf', 'Beta_Sup', 'Eta_Inf', 'Eta_Sup']
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    st.download_button(
+        "📥 Baixar ajustes (CSV)",
+        data=ajustes.to_csv(index=False).encode('utf-8'),
+        file_name="weibull_por_grupo.csv",
+        mime="text/csv"
+    )
+
+def exibir_comparacao_distribuicoes(tempos, censurados, t_max):
+    """Weibull, Weibull 3P, exponencial e lognormal ajustadas aos mesmos tempos, ordenadas por AIC, com as curvas."""
+    import plotly.express as px
+
+    distribuicoes, tabela = ajustar_distribuicoes_em_cache(tempos, censurados)
+    st.success(f"Distribuição mais plausível pelo AIC: **{tabela['Distribuição'].iloc[0]}** ({tabela['Parâmetros'].iloc[0]})")
+    st.dataframe(
+        tabela.style.format({
+            'Log-verossimilhança': '{:.1f}', 'AIC': '{:.1f}', 'ΔAIC': '{:.1f}', 'B10 (h)': '{:.1f}', 'B50 (h)': '{:.1f}'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption("ΔAIC abaixo de 2 indica modelos praticamente equivalentes. B10/B50: tempo até 10%/50% da população falhar.")
+
+    curva = st.radio(
+        "Curva",
+        list(CURVAS_DISTRIBUICOES),
+        format_func=CURVAS_DISTRIBUICOES.get,
+        horizontal=True,
+        key="confiabilidade_curva"
+    )
+    curvas = avaliar_curvas(distribuicoes, grade_adaptativa(distribuicoes, t_max))
+    fig = px.line(curvas, x='Tempo (h)', y=curva, color='Distribuição', title=CURVAS_DISTRIBUICOES[curva])
+    fig.update_layout(xaxis_title="Tempo (horas)", yaxis_title=CURVAS_DISTRIBUICOES[curva])
+    st.plotly_chart(fig, use_container_width=True)
 
 def exibir_confiabilidade():
     st.title("🔬 Análise de Confiabilidade")
@@ -15,31 +120,66 @@ def exibir_confiabilidade():
         key="confiabilidade_upload"
     )
     
+    metodo = st.radio(
+        "Método de ajuste",
+        METODOS_AJUSTE,
+        format_func=NOMES_METODOS.get,
+        horizontal=True,
+        key="confiabilidade_metodo"
+    )
+    
     if arquivo:
         try:
-            df = pd.read_excel(arquivo)
-            
-            # Verificação e tratamento dos dados
-            if 'Tempo entre falhas (h)' not in df.columns:
-                raise ValueError("Coluna 'Tempo entre falhas (h)' não encontrada. Verifique o nome da coluna.")
-                
-            tempos = df['Tempo entre falhas (h)'].dropna().values
+            conteudo = arquivo.getvalue()
+            chave_dados = hashlib.sha256(conteudo).hexdigest()
+            df, avisos, e_historico = _cache_planilhas.obter(chave_dados, lambda: ler_dados_confiabilidade(conteudo))
+            for aviso in avisos:
+                st.warning(aviso)
+
+            if e_historico:
+                # Tempos entre falhas por EQUIPAMENTO × ITEM; o último intervalo de cada um vai até o fim
+                # do período e é censurado (a unidade ainda operava), o que evita subestimar η
+                ultimo_reparo = df['DATA FINAL'].max()
+                if pd.isna(ultimo_reparo):
+                    raise ValueError(
+                        "A planilha 'Falhas' não tem nenhuma DATA FINAL válida: não é possível derivar os tempos entre falhas."
+                    )
+                fim_periodo = st.date_input(
+                    "Fim do período observado",
+                    value=ultimo_reparo.date(),
+                    key="confiabilidade_fim_periodo"
+                )
+                fim = pd.Timestamp(fim_periodo) + pd.Timedelta(days=1)
+                df_tempos = _cache_tempos.obter((chave_dados, fim), lambda: tempos_entre_falhas(df, fim))
+                st.caption(
+                    f"{len(df_tempos)} intervalos entre falhas derivados da planilha 'Falhas' por EQUIPAMENTO × ITEM, "
+                    f"dos quais {int(df_tempos['Censurado'].sum())} censurados (sem falha até o fim do período)."
+                )
+            else:
+                df_tempos = df.assign(Censurado=False)
+
+            tempos = df_tempos[COLUNA_TEMPO].to_numpy(dtype=float)
+            censurados = df_tempos['Censurado'].to_numpy(dtype=bool)
             
-            if len(tempos) < 2:
+            if (~np.isnan(tempos) & ~censurados).sum() < 2:
                 raise ValueError("Número insuficiente de dados (mínimo 2 registros) para realizar a análise de confiabilidade.")
                 
-            # Ajuste Weibull
-            wf = WeibullFitter()
-            wf.fit(tempos)
+            # Importada só quando há dados para ajustar
+            import plotly.express as px
+
+            # Ajuste Weibull (em cache pelo hash dos tempos; lifelines só é importada se escolhida)
+            ajuste = ajustar_weibull_em_cache(tempos, metodo, censurados)
             
             # Preparação dos dados para o gráfico
-            # Garante que x_values não seja vazio e tenha um range razoável
-            if max(tempos) == 0: # Evita divisão por zero ou range inadequado
-                x_values = np.linspace(0, 100, 200) # Define um range padrão se todos os tempos forem zero
+            # Garante que a grade não seja vazia e tenha um range razoável
+            if np.nanmax(tempos) == 0: # Evita divisão por zero ou range inadequado
+                t_max = 100 # Define um range padrão se todos os tempos forem zero
             else:
-                x_values = np.linspace(0, max(tempos) * 1.2, 200)
+                t_max = np.nanmax(tempos) * 1.2
+            # 200 pontos concentrados no joelho da curva, onde a grade uniforme ficava poligonal
+            x_values = grade_adaptativa([ajuste], t_max)
             
-            y_values = 1 - wf.predict(x_values)
+            y_values = ajuste.confiabilidade(x_values)
             
             # Criação do gráfico
             fig = px.line(
@@ -52,8 +192,8 @@ def exibir_confiabilidade():
             st.plotly_chart(fig, use_container_width=True)
             
             # Exibição dos parâmetros
-            beta = wf.rho_
-            eta = wf.lambda_
+            beta = ajuste.beta
+            eta = ajuste.eta
             
             col1, col2 = st.columns(2)
             col1.metric("β (Forma)", f"{beta:.2f}")
@@ -72,10 +212,28 @@ def exibir_confiabilidade():
             st.subheader("O que é η (Vida Característica)?")
             st.info(f"O parâmetro **η (Eta)**, ou Vida Característica ({eta:.2f} horas), é o tempo no qual aproximadamente **63.2%** dos itens de uma população falharam. É um indicador importante da 'vida útil' do componente sob análise.")
 
+            st.markdown("---")
+            st.subheader("Comparação de Distribuições")
+            exibir_comparacao_distribuicoes(tempos, censurados, t_max)
+
+            # Ajuste por grupo (ex.: EQUIPAMENTO × ITEM), se a planilha trouxer as colunas de agrupamento
+            colunas_disponiveis = [col for col in df_tempos.columns if col not in (COLUNA_TEMPO, 'Censurado')]
+            if colunas_disponiveis:
+                st.markdown("---")
+                st.subheader("Ajuste Weibull por Grupo")
+                colunas_grupo = st.multiselect(
+                    "Agrupar por",
+                    colunas_disponiveis,
+                    default=[col for col in ['EQUIPAMENTO', 'ITEM'] if col in colunas_disponiveis],
+                    key="confiabilidade_grupos"
+                )
+                if colunas_grupo:
+                    exibir_ajustes_por_grupo(df_tempos, colunas_grupo)
+
 
         except ValueError as ve:
             st.error(f"Erro nos dados: {str(ve)}")
-            st.info("Por favor, verifique se seu arquivo Excel possui a coluna 'Tempo entre falhas (h)' e se os dados são numéricos e suficientes.")
+            st.info("Por favor, verifique se seu arquivo Excel possui a planilha 'Falhas' do histórico (DATA INICIAL/DATA FINAL) ou a coluna 'Tempo entre falhas (h)', e se os dados são numéricos e suficientes.")
         except Exception as e:
             st.error(f"Ocorreu um erro inesperado: {str(e)}")
             st.info("Certifique-se de que o arquivo Excel está formatado corretamente e tente novamente.")
\ No newline at end of file
@@ -0,0 +1,145 @@
+# modules/conhecimento.py
+
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import CacheLRU
+
+COLUNAS_CONHECIMENTO = ['TipoFalha', 'Causa', 'AcaoRecomendada']
+
+# Assumindo que 'banco_conhecimento.xlsx' está no diretório de execução do app
+ARQUIVO_BANCO_CONHECIMENTO = "banco_conhecimento.xlsx"
+
+# Quantas ações do banco de conhecimento são sugeridas por causa
+MAX_RECOMENDACOES = 3
+
+# Padrões genéricos se a causa não for encontrada no banco (ou se o banco não for carregado)
+PADROES_GENERICOS = {
+    "desgaste": "Implementar programa de lubrificação preventiva e inspeção periódica",
+    "vazamento": "Substituição programada de selos e juntas conforme vida útil",
+    "elétric": "Realizar termografia periódica e análise de vibração",
+    "hidráulic": "Monitoramento contínuo de pressão e vazão",
+    "corrosão": "Aplicação de proteção superficial e controle ambiental",
+    "sobreaquecimento": "Verificação do sistema de refrigeração e limpeza de radiadores",
+    "alinhamento": "Realizar alinhamento a laser trimestral",
+    "contaminaç": "Melhorar filtragem e controle de qualidade dos fluidos"
+}
+RECOMENDACAO_PADRAO = "Realizar análise de causa raiz com a equipe técnica"
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+class BaseConhecimento:
+    """Banco de conhecimento de falhas com índice invertido de trigramas sobre as causas.
+
+    Uma causa consultada casa com as linhas do banco cuja 'Causa' a contém como
+    substring (sem diferenciar maiúsculas). Só as causas distintas do banco são
+    indexadas; uma consulta intersecta as listas dos seus trigramas e confirma a
+    substring apenas nas candidatas, em vez de varrer o banco inteiro.
+    """
+
+    def __init__(self, df_conhecimento=None):
+        if df_conhecimento is None:
+            df_conhecimento = pd.DataFrame(columns=COLUNAS_CONHECIMENTO)
+        self.df = df_conhecimento
+
+        if 'Causa' in df_conhecimento.columns and 'AcaoRecomendada' in df_conhecimento.columns:
+            causas = df_conhecimento['Causa'].astype('string').str.lower()
+            acoes = df_conhecimento['AcaoRecomendada'].astype(str).to_numpy()
+        else:
+            causas = pd.Series([], dtype='string')
+            acoes = np.array([], dtype=object)
+
+        # Causas distintas (NaN fica com código -1 e nunca casa) e linhas de cada uma, na ordem do banco
+        codigos, self._causas = pd.factorize(causas)
+        self._causas = [str(causa) for causa in self._causas]
+        ordem = np.argsort(codigos, kind='stable')
+        self._linhas_por_causa = np.split(ordem, np.searchsorted(codigos[ordem], np.arange(len(self._causas) + 1)))[1:-1]
+        self._acoes = acoes
+
+        indice = defaultdict(list)
+        for posicao, causa in enumerate(self._causas):
+            for trigrama in _trigramas(causa):
+                indice[trigrama].append(posicao)
+        self._indice = {trigrama: np.array(posicoes, dtype=np.int64) for trigrama, posicoes in indice.items()}
+
+    def __len__(self):
+        return len(self._acoes)
+
+    @property
+    def vazia(self):
+        return len(self._acoes) == 0
+
+    def _causas_que_contem(self, consulta):
+        """Posições das causas distintas do banco que contêm a consulta."""
+        trigramas = _trigramas(consulta)
+        if not trigramas:
+            # Consultas com menos de 3 caracteres não têm trigramas: comparação direta
+            return [i for i, causa in enumerate(self._causas) if consulta in causa]
+        listas = [self._indice.get(trigrama) for trigrama in trigramas]
+        if any(lista is None for lista in listas):
+            return []
+        listas.sort(key=len)
+        candidatas = listas[0]
+        for lista in listas[1:]:
+            candidatas = np.intersect1d(candidatas, lista, assume_unique=True)
+            if len(candidatas) == 0:
+                return []
+        return [i for i in candidatas if consulta in self._causas[i]]
+
+    def _recomendar_uma(self, causa):
+        causa = str(causa).lower().strip()
+
+        if not self.vazia:
+            posicoes = self._causas_que_contem(causa)
+            if posicoes:
+                # As primeiras linhas do banco (na ordem original) entre todas as causas que casaram
+                linhas = np.sort(np.concatenate([self._linhas_por_causa[i][:MAX_RECOMENDACOES] for i in posicoes]))
+                return "\n".join(f"• {acao}" for acao in self._acoes[linhas[:MAX_RECOMENDACOES]])
+
+        for palavra_chave, acao in PADROES_GENERICOS.items():
+            if palavra_chave in causa:
+                return acao
+
+        return RECOMENDACAO_PADRAO
+
+    def recomendar(self, causas):
+        """Recomendações para um lote de causas (lista alinhada com a entrada); causas repetidas são resolvidas uma vez."""
+        causas = list(causas)
+        resolvidas = {causa: self._recomendar_uma(causa) for causa in dict.fromkeys(causas)}
+        return [resolvidas[causa] for causa in causas]
+
+    def recomendacao(self, causa):
+        """Recomendação para uma única causa."""
+        return self._recomendar_uma(causa)
+
+# Bancos já lidos e indexados, compartilhados por todas as sessões do servidor.
+# A chave inclui mtime e tamanho do arquivo: ao salvar uma nova versão a chave muda e o banco é relido.
+_cache_bases = CacheLRU(max_entradas=2)
+# Uma única leitura por vez: sessões que chegam durante a leitura esperam e reaproveitam o resultado
+_lock_leitura = threading.Lock()
+
+def ler_banco_conhecimento(caminho):
+    """Lê a aba 'Falhas' do banco de conhecimento, padroniza as colunas e monta o índice."""
+    df_conhecimento = pd.read_excel(caminho, sheet_name="Falhas")
+
+    # Padroniza os dados
+    df_conhecimento['TipoFalha'] = df_conhecimento['TipoFalha'].str.lower().str.strip()
+    df_conhecimento['Causa'] = df_conhecimento['Causa'].str.lower().str.strip()
+    df_conhecimento['AcaoRecomendada'] = df_conhecimento['AcaoRecomendada'].astype(str)
+
+    return BaseConhecimento(df_conhecimento)
+
+def carregar_base_conhecimento(caminho=ARQUIVO_BANCO_CONHECIMENTO):
+    """Banco de conhecimento indexado, relido do disco só quando o arquivo muda.
+
+    Lança FileNotFoundError se o arquivo não existir; outros erros de leitura são propagados.
+    """
+    info = os.stat(caminho)
+    chave = (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+    with _lock_leitura:
+        return _cache_bases.obter(chave, lambda: ler_banco_conhecimento(caminho))
@@ -0,0 +1,258 @@
+# modules/distribuicoes.py
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import CacheLRU
+from modules.weibull import ajustar_weibull, ajustar_weibull_3p, chave_tempos, validar_tempos
+
+def _normal():
+    # scipy (fixado no requirements.txt) leva ~0,3 s para importar: só quando a lognormal é usada
+    from scipy.special import log_ndtr, ndtri
+    return log_ndtr, ndtri
+
+class Distribuicao:
+    """Distribuição de vida ajustada, avaliada de forma vetorizada sobre qualquer grade de tempos.
+
+    As subclasses definem risco_acumulado (H), log_densidade e vida_b; confiabilidade e taxa de
+    falha saem delas: R(t) = exp(-H(t)) e h(t) = f(t) / R(t).
+    """
+
+    nome = ''
+    n_parametros = 0
+
+    def risco_acumulado(self, t):
+        """H(t) = -ln R(t)."""
+        raise NotImplementedError
+
+    def log_densidade(self, t):
+        """ln f(t)."""
+        raise NotImplementedError
+
+    def vida_b(self, p):
+        """Tempo até a fração p da população falhar (B10: p = 0.10; B50: mediana)."""
+        raise NotImplementedError
+
+    def parametros(self):
+        """Parâmetros formatados para exibição."""
+        raise NotImplementedError
+
+    def confiabilidade(self, t):
+        """R(t): probabilidade de não falhar até t."""
+        return np.exp(-self.risco_acumulado(t))
+
+    def taxa_falha(self, t):
+        """h(t) = f(t) / R(t)."""
+        with np.errstate(divide='ignore', over='ignore'):
+            return np.exp(self.log_densidade(t) + self.risco_acumulado(t))
+
+    def curvas(self, t):
+        """R(t), h(t) e H(t) na grade t, calculando H uma vez só."""
+        t = np.asarray(t, dtype=float)
+        risco = self.risco_acumulado(t)
+        with np.errstate(divide='ignore', over='ignore'):
+            return np.exp(-risco), np.exp(self.log_densidade(t) + risco), risco
+
+    def log_verossimilhanca(self, tempos, censurados=None):
+        """ln L: soma de ln f nas falhas e de ln R = -H nos tempos censurados à direita."""
+        tempos = np.asarray(tempos, dtype=float)
+        if censurados is None:
+            return float(np.sum(self.log_densidade(tempos)))
+        censurados = np.asarray(censurados, dtype=bool)
+        return float(np.sum(self.log_densidade(tempos[~censurados])) - np.sum(self.risco_acumulado(tempos[censurados])))
+
+    def aic(self, tempos, censurados=None):
+        """Critério de informação de Akaike: 2k - 2 ln L (menor é melhor)."""
+        return 2 * self.n_parametros - 2 * self.log_verossimilhanca(tempos, censurados)
+
+class Weibull(Distribuicao):
+    """Weibull de 2 ou 3 parâmetros: H(t) = ((t - gama) / eta) ** beta para t >= gama."""
+
+    def __init__(self, beta, eta, gama=0.0, tres_parametros=False):
+        self.beta = float(beta)
+        self.eta = float(eta)
+        self.gama = float(gama)
+        self.nome = 'Weibull 3P' if tres_parametros else 'Weibull'
+        self.n_parametros = 3 if tres_parametros else 2
+
+    @classmethod
+    def de_ajuste(cls, ajuste, tres_parametros=False):
+        """A partir de um AjusteWeibull (modules.weibull)."""
+        return cls(ajuste.beta, ajuste.eta, ajuste.gama, tres_parametros)
+
+    def _escalado(self, t):
+        return np.maximum(np.asarray(t, dtype=float) - self.gama, 0) / self.eta
+
+    def risco_acumulado(self, t):
+        return self._escalado(t) ** self.beta
+
+    def log_densidade(self, t):
+        t = np.asarray(t, dtype=float)
+        x = self._escalado(t)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            densidade = np.log(self.beta / self.eta) + (self.beta - 1) * np.log(x) - x ** self.beta
+        return np.where(t > self.gama, densidade, -np.inf)
+
+    def taxa_falha(self, t):
+        with np.errstate(divide='ignore'):
+            return self.beta / self.eta * self._escalado(t) ** (self.beta - 1)
+
+    def vida_b(self, p):
+        return self.gama + self.eta * (-np.log1p(-np.asarray(p, dtype=float))) ** (1 / self.beta)
+
+    def parametros(self):
+        texto = f"β = {self.beta:.3f}, η = {self.eta:.1f} h"
+        return texto + f", γ = {self.gama:.1f} h" if self.n_parametros == 3 else texto
+
+class Exponencial(Distribuicao):
+    """Exponencial (falhas aleatórias): taxa de falha constante, H(t) = t / mtbf."""
+
+    nome = 'Exponencial'
+    n_parametros = 1
+
+    def __init__(self, mtbf):
+        self.mtbf = float(mtbf)
+
+    def risco_acumulado(self, t):
+        return np.maximum(np.asarray(t, dtype=float), 0) / self.mtbf
+
+    def log_densidade(self, t):
+        return -np.log(self.mtbf) - np.asarray(t, dtype=float) / self.mtbf
+
+    def taxa_falha(self, t):
+        return np.full(np.shape(t), 1 / self.mtbf)
+
+    def vida_b(self, p):
+        return -self.mtbf * np.log1p(-np.asarray(p, dtype=float))
+
+    def parametros(self):
+        return f"MTBF = {self.mtbf:.1f} h"
+
+class Lognormal(Distribuicao):
+    """Lognormal: ln t ~ Normal(mu, sigma)."""
+
+    nome = 'Lognormal'
+    n_parametros = 2
+
+    def __init__(self, mu, sigma):
+        self.mu = float(mu)
+        self.sigma = float(sigma)
+
+    def _padronizado(self, t):
+        t = np.asarray(t, dtype=float)
+        with np.errstate(divide='ignore'):
+            return (np.log(np.where(t > 0, t, 0)) - self.mu) / self.sigma
+
+    def risco_acumulado(self, t):
+        log_ndtr, _ = _normal()
+        # -ln(1 - Φ(z)) = -ln Φ(-z), estável na cauda
+        return -log_ndtr(-self._padronizado(t))
+
+    def log_densidade(self, t):
+        t = np.asarray(t, dtype=float)
+        z = self._padronizado(t)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(t > 0, -0.5 * z * z - np.log(self.sigma * np.sqrt(2 * np.pi) * t), -np.inf)
+
+    def vida_b(self, p):
+        _, ndtri = _normal()
+        return np.exp(self.mu + self.sigma * ndtri(np.asarray(p, dtype=float)))
+
+    def parametros(self):
+        return f"μ = {self.mu:.3f}, σ = {self.sigma:.3f} (mediana {np.exp(self.mu):.1f} h)"
+
+def _lognormal_censurada(log_t, falhas):
+    """MLE da lognormal com censura à direita (sem forma fechada): L-BFGS sobre (mu, ln sigma) com gradiente analítico."""
+    from scipy.optimize import minimize
+    log_ndtr, _ = _normal()
+    y_falhas, y_censurados = log_t[falhas], log_t[~falhas]
+
+    def menos_log_verossimilhanca(parametros):
+        mu, log_sigma = parametros
+        sigma = np.exp(log_sigma)
+        z_f = (y_falhas - mu) / sigma
+        z_c = (y_censurados - mu) / sigma
+        log_sobrevivencia = log_ndtr(-z_c)
+        # Razão de Mills inversa φ(z) / (1 - Φ(z)), em escala log para não estourar na cauda
+        mills = np.exp(-0.5 * z_c * z_c - 0.5 * np.log(2 * np.pi) - log_sobrevivencia)
+        valor = np.sum(-0.5 * z_f * z_f - log_sigma) + np.sum(log_sobrevivencia)
+        gradiente = [np.sum(z_f) / sigma + np.sum(mills) / sigma, np.sum(z_f * z_f - 1) + np.sum(mills * z_c)]
+        return -valor, -np.asarray(gradiente)
+
+    inicial = [y_falhas.mean(), np.log(max(y_falhas.std(), 1e-6))]
+    mu, log_sigma = minimize(menos_log_verossimilhanca, inicial, jac=True, method='L-BFGS-B').x
+    return mu, np.exp(log_sigma)
+
+def ajustar_distribuicoes(tempos, censurados=None):
+    """Ajusta Weibull, Weibull 3P, exponencial e lognormal por máxima verossimilhança aos mesmos tempos.
+
+    censurados: máscara dos tempos censurados à direita, considerada em todos os ajustes.
+    Retorna a lista de distribuições ajustadas; lança ValueError nas mesmas condições de ajustar_weibull.
+    """
+    tempos, falhas = validar_tempos(tempos, censurados)
+    censurados = ~falhas
+    log_t = np.log(tempos)
+    if falhas.all():
+        lognormal = Lognormal(log_t.mean(), log_t.std())
+    else:
+        lognormal = Lognormal(*_lognormal_censurada(log_t, falhas))
+    return [
+        Weibull.de_ajuste(ajustar_weibull(tempos, censurados=censurados)),
+        Weibull.de_ajuste(ajustar_weibull_3p(tempos, censurados=censurados), tres_parametros=True),
+        # MLE da exponencial com censura: tempo total observado / número de falhas
+        Exponencial(tempos.sum() / falhas.sum()),
+        lognormal,
+    ]
+
+def tabela_aic(distribuicoes, tempos, censurados=None):
+    """Comparação das distribuições ajustadas, da de menor AIC (mais plausível) para a de maior."""
+    tempos, falhas = validar_tempos(tempos, censurados)
+    tabela = pd.DataFrame({
+        'Distribuição': [d.nome for d in distribuicoes],
+        'Parâmetros': [d.parametros() for d in distribuicoes],
+        'Log-verossimilhança': [d.log_verossimilhanca(tempos, ~falhas) for d in distribuicoes],
+        'B10 (h)': [float(d.vida_b(0.10)) for d in distribuicoes],
+        'B50 (h)': [float(d.vida_b(0.50)) for d in distribuicoes],
+    })
+    tabela['AIC'] = [2 * d.n_parametros for d in distribuicoes] - 2 * tabela['Log-verossimilhança']
+    tabela['ΔAIC'] = tabela['AIC'] - tabela['AIC'].min()
+    return tabela.sort_values('AIC', kind='stable', ignore_index=True)
+
+# Distribuições já ajustadas, pelo hash dos tempos (o ajuste de 3 parâmetros é o mais caro)
+_cache_distribuicoes = CacheLRU(max_entradas=16)
+
+def ajustar_distribuicoes_em_cache(tempos, censurados=None):
+    """ajustar_distribuicoes e tabela_aic com cache pelo hash dos tempos e da censura."""
+    def calcular():
+        distribuicoes = ajustar_distribuicoes(tempos, censurados)
+        return distribuicoes, tabela_aic(distribuicoes, tempos, censurados)
+    return _cache_distribuicoes.obter(chave_tempos(tempos, censurados), calcular)
+
+def grade_adaptativa(distribuicoes, t_max, n_pontos=200, n_base=2048):
+    """Grade de n_pontos tempos em [0, t_max], mais densa onde as curvas R(t) dobram ou caem rápido.
+
+    Os pontos são equidistantes no comprimento de arco das curvas (t / t_max, R(t)), somado entre as
+    distribuições: trechos planos recebem o espaçamento de uma grade uniforme e o joelho da curva,
+    onde a reta de 200 pontos ficava poligonal, recebe mais pontos.
+    """
+    base = np.linspace(0, t_max, n_base)
+    passos = np.diff(base) / t_max
+    for distribuicao in distribuicoes:
+        passos = np.hypot(passos, np.diff(distribuicao.confiabilidade(base)))
+    acumulado = np.r_[0, np.cumsum(passos)]
+    return np.interp(np.linspace(0, acumulado[-1], n_pontos), acumulado, base)
+
+def avaliar_curvas(distribuicoes, grade):
+    """R(t), h(t) e H(t) de todas as distribuições na mesma grade, em formato longo (uma linha por tempo e distribuição)."""
+    grade = np.asarray(grade, dtype=float)
+    partes = []
+    for distribuicao in distribuicoes:
+        confiabilidade, taxa, risco = distribuicao.curvas(grade)
+        partes.append(pd.DataFrame({
+            'Tempo (h)': grade,
+            'Distribuição': distribuicao.nome,
+            'R(t)': confiabilidade,
+            'h(t)': taxa,
+            'H(t)': risco,
+        }))
+    return pd.concat(partes, ignore_index=True)
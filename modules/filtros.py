@@ -0,0 +1,202 @@
+# modules/filtros.py
+
+import numpy as np
+import pandas as pd
+
+# Valores dos multiselects da barra lateral que significam "sem filtro"
+OPCOES_TODOS = ("Todos", "Todas")
+
+def selecao_ativa(selecionados):
+    """Indica se um multiselect da barra lateral restringe os dados (não vazio e sem 'Todos'/'Todas')."""
+    return bool(selecionados) and not any(opcao in selecionados for opcao in OPCOES_TODOS)
+
+def chave_filtros(selecoes, periodo=None):
+    """Chave hashable e independente da ordem de seleção para um estado dos filtros."""
+    return (
+        tuple(sorted((col, tuple(sorted(map(str, valores)))) for col, valores in selecoes.items())),
+        None if periodo is None else tuple(pd.Timestamp(data) for data in periodo),
+    )
+
+def janela_dias(periodo):
+    """Janela [início, fim) de um período (data inicial, data final) em dias inteiros: a data final entra inteira.
+
+    É a janela de todos os cálculos por período: filtro de datas, MTBF, DF e matriz de disponibilidade.
+    """
+    inicio = pd.Timestamp(periodo[0]).normalize()
+    return inicio, pd.Timestamp(periodo[1]).normalize() + pd.Timedelta(days=1)
+
+def _em_ordem_cronologica(datas):
+    """Datas em ordem crescente, com eventuais NaT todos no final."""
+    validas = ~np.isnat(datas)
+    n_validas = int(validas.sum())
+    primeiras = datas[:n_validas]
+    return bool(validas[:n_validas].all()) and bool((primeiras[1:] >= primeiras[:-1]).all())
+
+def ordenar_por_data(df, coluna):
+    """Ordena o DataFrame pela coluna de data (estável, NaT no final) e renumera o índice.
+
+    Não faz nada se a coluna não existir ou se o DataFrame já estiver ordenado.
+    """
+    if coluna not in df.columns:
+        return df
+    if _em_ordem_cronologica(df[coluna].to_numpy(dtype='datetime64[ns]')):
+        return df.reset_index(drop=True)
+    return df.sort_values(coluna, kind='stable', na_position='last', ignore_index=True)
+
+def _limites_periodo(datas_ordenadas, n_validas, inicio, fim):
+    # Mesma semântica de (data >= inicio) & (data < fim); os NaT do final nunca entram
+    validas = datas_ordenadas[:n_validas]
+    lo = np.searchsorted(validas, np.datetime64(inicio, 'ns'), side='left')
+    hi = np.searchsorted(validas, np.datetime64(fim, 'ns'), side='left')
+    return int(lo), int(max(lo, hi))
+
+def fatiar_periodo(df, coluna, inicio, fim):
+    """Linhas com inicio <= df[coluna] < fim, por busca binária em um DataFrame já ordenado pela coluna.
+
+    Retorna uma fatia (iloc) do DataFrame, sem máscara booleana nem cópia dos dados.
+    """
+    datas = df[coluna].to_numpy(dtype='datetime64[ns]')
+    n_validas = len(datas) - int(np.isnat(datas).sum())
+    lo, hi = _limites_periodo(datas, n_validas, inicio, fim)
+    return df.iloc[lo:hi]
+
+class IndiceFiltros:
+    """Índice invertido das colunas de filtro de um DataFrame.
+
+    Para cada coluna guarda as posições das linhas agrupadas por valor (listas de
+    posições ordenadas, no formato CSR: ordem + limites por código de categoria) e,
+    opcionalmente, a ordem das linhas pela coluna de data. Qualquer combinação de
+    filtros é respondida partindo da seleção mais restritiva e verificando as demais
+    só nas linhas candidatas, com um único take no final. Se o DataFrame já estiver
+    ordenado pela data (ver ordenar_por_data), o período vira uma fatia contígua.
+    """
+
+    def __init__(self, df, colunas, coluna_data=None):
+        self.n_linhas = len(df)
+        self.coluna_data = coluna_data
+        self._categorias = {}
+        self._codigos = {}
+        self._ordem = {}
+        self._limites = {}
+
+        for col in colunas:
+            if col not in df.columns:
+                continue
+            serie = df[col]
+            if not isinstance(serie.dtype, pd.CategoricalDtype):
+                serie = serie.astype('category')
+            codigos = serie.cat.codes.to_numpy()
+            ordem = np.argsort(codigos, kind='stable')
+            # Linhas do código k: ordem[limites[k]:limites[k + 1]] (código -1, de NaN, fica de fora)
+            limites = np.searchsorted(codigos[ordem], np.arange(len(serie.cat.categories) + 1))
+            self._categorias[col] = serie.cat.categories
+            self._codigos[col] = codigos
+            self._ordem[col] = ordem
+            self._limites[col] = limites
+
+        self._datas = None
+        self._ordem_datas = None
+        if coluna_data is not None and coluna_data in df.columns:
+            datas = df[coluna_data].to_numpy(dtype='datetime64[ns]')
+            self._datas = datas
+            self._n_datas_validas = len(datas) - int(np.isnat(datas).sum())
+            if _em_ordem_cronologica(datas):
+                self._datas_ordenadas = datas
+            else:
+                # argsort coloca os NaT no final, como ordenar_por_data
+                self._ordem_datas = np.argsort(datas, kind='stable')
+                self._datas_ordenadas = datas[self._ordem_datas]
+
+    @property
+    def colunas(self):
+        return list(self._categorias)
+
+    @property
+    def nbytes(self):
+        arrays = [*self._codigos.values(), *self._ordem.values(), *self._limites.values()]
+        if self._ordem_datas is not None:
+            arrays += [self._ordem_datas, self._datas_ordenadas]
+        if self._datas is not None:
+            arrays.append(self._datas)
+        return sum(a.nbytes for a in arrays)
+
+    def _codigos_selecionados(self, col, valores):
+        codigos = self._categorias[col].get_indexer(pd.Index(list(valores)))
+        return np.unique(codigos[codigos >= 0])
+
+    def linhas(self, selecoes, periodo=None):
+        """Posições (ordenadas) das linhas que atendem a todas as seleções.
+
+        selecoes: {coluna: valores aceitos}; colunas fora do índice são ignoradas.
+        periodo: (data inicial, data final) aplicado à coluna de data do índice em dias inteiros
+        (janela_dias), ou None.
+        Retorna None quando nenhum filtro se aplica e um slice quando só o período
+        se aplica a um DataFrame ordenado pela data.
+        """
+        restricoes = []
+        for col, valores in selecoes.items():
+            if col not in self._categorias:
+                continue
+            codigos = self._codigos_selecionados(col, valores)
+            limites = self._limites[col]
+            tamanho = int((limites[codigos + 1] - limites[codigos]).sum())
+            restricoes.append((tamanho, 'coluna', col, codigos))
+
+        if periodo is not None and self._datas is not None:
+            inicio, fim = (np.datetime64(data, 'ns') for data in janela_dias(periodo))
+            lo, hi = _limites_periodo(self._datas_ordenadas, self._n_datas_validas, inicio, fim)
+            restricoes.append((hi - lo, 'data', lo, hi))
+
+        if not restricoes:
+            return None
+        if len(restricoes) == 1 and restricoes[0][1] == 'data' and self._ordem_datas is None:
+            return slice(lo, hi)
+
+        # A seleção com menos linhas gera os candidatos; as outras só filtram esses candidatos
+        restricoes.sort(key=lambda r: r[0])
+        _, tipo, a, b = restricoes[0]
+        if tipo == 'coluna':
+            ordem, limites = self._ordem[a], self._limites[a]
+            candidatos = np.concatenate([ordem[limites[c]:limites[c + 1]] for c in b]) if len(b) else np.empty(0, dtype=np.intp)
+        elif self._ordem_datas is None:
+            candidatos = np.arange(a, b)
+        else:
+            candidatos = self._ordem_datas[a:b]
+
+        for _, tipo, a, b in restricoes[1:]:
+            if len(candidatos) == 0:
+                break
+            if tipo == 'coluna':
+                aceitos = np.zeros(len(self._categorias[a]) + 1, dtype=bool)  # última posição: código -1
+                aceitos[b] = True
+                candidatos = candidatos[aceitos[self._codigos[a][candidatos]]]
+            else:
+                datas = self._datas[candidatos]
+                candidatos = candidatos[(datas >= inicio) & (datas < fim)]
+
+        return np.sort(candidatos)
+
+    def filtrar(self, df, selecoes, periodo=None):
+        """Aplica os filtros ao DataFrame indexado; sempre retorna um novo DataFrame.
+
+        Sem filtros ou só com o período (DataFrame ordenado) o resultado compartilha os
+        dados do original (cópia rasa): novas colunas podem ser criadas nele livremente.
+        """
+        posicoes = self.linhas(selecoes, periodo)
+        if posicoes is None:
+            return df.copy(deep=False)
+        if isinstance(posicoes, slice):
+            return df.iloc[posicoes].copy(deep=False)
+        return df.take(posicoes)
+
+    def valores(self, col, selecoes=None):
+        """Valores distintos (ordenados) da coluna, opcionalmente só nas linhas que atendem às seleções."""
+        if col not in self._categorias:
+            return []
+        posicoes = self.linhas(selecoes or {})
+        if posicoes is None:
+            presentes = np.diff(self._limites[col]) > 0
+        else:
+            codigos = self._codigos[col][posicoes]
+            presentes = np.bincount(codigos[codigos >= 0], minlength=len(self._categorias[col])) > 0
+        return list(self._categorias[col][presentes])
@@ -0,0 +1,241 @@
+# modules/historico.py
+
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from modules.filtros import ordenar_por_data
+from modules.motor_kpis import RollupHierarquia
+from modules.utils import unificar_categorias
+
+# Históricos convertidos ficam em data/historicos/<nome>/, um arquivo Feather por planilha.
+# Feather (Arrow IPC) sem compressão pode ser aberto com memory-map, sem nenhuma etapa de parse.
+DIRETORIO_HISTORICOS = Path(__file__).parent.parent / 'data' / 'historicos'
+
+ARQUIVOS_PLANILHAS = {'Falhas': 'falhas.feather', 'Indicadores': 'indicadores.feather'}
+ARQUIVO_METADADOS = 'metadados.json'
+
+# Novas falhas são gravadas em arquivos de incremento, sem reescrever a base.
+# O nome leva data/hora e um sufixo aleatório: ordena cronologicamente e nunca repete,
+# mesmo com dois processos do servidor anexando ao mesmo histórico
+PADRAO_INCREMENTOS_FALHAS = 'falhas_incremento_*.feather'
+
+# Uma falha é considerada repetida quando coincide nestas colunas com outra já gravada
+CHAVE_FALHA = ['EQUIPAMENTO', 'DATA INICIAL', 'ITEM', 'CAUSA']
+
+# Agregados mantidos junto com o histórico e atualizados a cada incremento
+ARQUIVOS_AGREGADOS = {'EQUIPAMENTO': 'agregados_equipamento.feather', 'ITEM': 'agregados_item.feather'}
+
+# Rollup SISTEMA → CONJUNTO → ITEM: nós ITEM com mapas de bits + lista de equipamentos (ordem dos bits)
+ARQUIVO_ROLLUP = 'rollup_hierarquia.feather'
+ARQUIVO_ROLLUP_EQUIPAMENTOS = 'rollup_equipamentos.feather'
+
+# Um lock por histórico: anexar e salvar leem e regravam agregados, rollup e metadados,
+# e duas sessões fazendo isso ao mesmo tempo perderiam a atualização uma da outra
+_locks_historicos = {}
+_lock_locks = threading.Lock()
+
+def _lock_historico(pasta):
+    with _lock_locks:
+        return _locks_historicos.setdefault(str(Path(pasta).resolve()), threading.Lock())
+
+def _nome_incremento():
+    return PADRAO_INCREMENTOS_FALHAS.replace('*', f"{datetime.now():%Y%m%d%H%M%S%f}_{uuid.uuid4().hex[:8]}")
+
+def normalizar_nome_historico(nome):
+    """Converte o nome informado pelo usuário em um nome de diretório seguro."""
+    nome = re.sub(r'[^\w\-]+', '_', str(nome).strip()).strip('_')
+    if not nome:
+        raise ValueError("Informe um nome válido para o histórico.")
+    return nome
+
+def listar_historicos(diretorio=DIRETORIO_HISTORICOS):
+    """Lista os históricos salvos (nomes dos diretórios com metadados)."""
+    if not diretorio.exists():
+        return []
+    return sorted(p.name for p in diretorio.iterdir() if (p / ARQUIVO_METADADOS).exists())
+
+def chave_historico(nome, diretorio=DIRETORIO_HISTORICOS):
+    """Chave de cache do histórico: muda sempre que algum arquivo dele é regravado."""
+    pasta = diretorio / nome
+    arquivos = [pasta / arquivo for arquivo in [ARQUIVO_METADADOS, *ARQUIVOS_PLANILHAS.values()]]
+    arquivos += sorted(pasta.glob(PADRAO_INCREMENTOS_FALHAS))
+    versoes = [arquivo.stat().st_mtime_ns for arquivo in arquivos if arquivo.exists()]
+    return f"historico:{nome}:{len(arquivos)}:{max(versoes, default=0)}"
+
+def _tipar_para_arrow(df):
+    """Colunas de texto viram category (dictionary no Arrow); índice descartado."""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    return df
+
+def _gravar_feather(df, caminho):
+    # Grava em arquivo temporário e renomeia, para que leitores nunca vejam um arquivo pela metade
+    temporario = caminho.with_suffix('.tmp')
+    df.to_feather(temporario, compression='uncompressed')
+    temporario.replace(caminho)
+
+def calcular_agregados(df_falhas, coluna):
+    """Agregados somáveis por equipamento ou item: tempo total, ocorrências, primeira e última falha."""
+    return df_falhas.groupby(coluna, observed=True).agg(
+        Tempo_Total_Parada=('DURAÇÃO', 'sum'),
+        Ocorrencias=('DURAÇÃO', 'count'),
+        Primeira_Falha=('DATA INICIAL', 'min'),
+        Ultima_Falha=('DATA FINAL', 'max')
+    ).reset_index()
+
+def _combinar_agregados(atual, novo, coluna):
+    # Soma/contagem/mínimo/máximo são combináveis: basta reagrupar as duas tabelas pequenas
+    return pd.concat([atual, novo], ignore_index=True).groupby(coluna, observed=True).agg(
+        Tempo_Total_Parada=('Tempo_Total_Parada', 'sum'),
+        Ocorrencias=('Ocorrencias', 'sum'),
+        Primeira_Falha=('Primeira_Falha', 'min'),
+        Ultima_Falha=('Ultima_Falha', 'max')
+    ).reset_index()
+
+def _gravar_rollup(rollup, pasta):
+    # Colunas de texto viram string e os mapas de bits, binary; não passa por _tipar_para_arrow
+    _gravar_feather(rollup.folhas(), pasta / ARQUIVO_ROLLUP)
+    _gravar_feather(pd.DataFrame({'EQUIPAMENTO': rollup.equipamentos.astype(str)}), pasta / ARQUIVO_ROLLUP_EQUIPAMENTOS)
+
+def carregar_rollup_hierarquia(nome, diretorio=DIRETORIO_HISTORICOS):
+    """Rollup SISTEMA → CONJUNTO → ITEM do histórico completo, ou None se ainda não foi gravado."""
+    pasta = diretorio / nome
+    if not (pasta / ARQUIVO_ROLLUP).exists():
+        return None
+    equipamentos = pd.read_feather(pasta / ARQUIVO_ROLLUP_EQUIPAMENTOS)['EQUIPAMENTO']
+    return RollupHierarquia.de_folhas(pd.read_feather(pasta / ARQUIVO_ROLLUP), equipamentos)
+
+def salvar_historico(nome, df_falhas, df_indicadores, origem=None, diretorio=DIRETORIO_HISTORICOS):
+    """Converte as planilhas já limpas em um histórico colunar tipado em disco.
+
+    Retorna o nome normalizado com que o histórico foi salvo.
+    """
+    nome = normalizar_nome_historico(nome)
+    pasta = diretorio / nome
+    pasta.mkdir(parents=True, exist_ok=True)
+    with _lock_historico(pasta):
+        _salvar_historico(nome, pasta, df_falhas, df_indicadores, origem)
+    return nome
+
+def _salvar_historico(nome, pasta, df_falhas, df_indicadores, origem):
+    # Um novo salvamento substitui a base; incrementos anteriores deixam de valer
+    for incremento in pasta.glob(PADRAO_INCREMENTOS_FALHAS):
+        incremento.unlink()
+
+    planilhas = {'Falhas': df_falhas, 'Indicadores': df_indicadores}
+    for aba, df in planilhas.items():
+        _gravar_feather(_tipar_para_arrow(df), pasta / ARQUIVOS_PLANILHAS[aba])
+    for coluna, arquivo in ARQUIVOS_AGREGADOS.items():
+        _gravar_feather(_tipar_para_arrow(calcular_agregados(df_falhas, coluna)), pasta / arquivo)
+    _gravar_rollup(RollupHierarquia.de_tabela(df_falhas), pasta)
+
+    metadados = {
+        'nome': nome,
+        'origem': origem,
+        'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+        'linhas': {aba: int(len(df)) for aba, df in planilhas.items()},
+    }
+    (pasta / ARQUIVO_METADADOS).write_text(json.dumps(metadados, ensure_ascii=False, indent=2), encoding='utf-8')
+
+def carregar_historico(nome, diretorio=DIRETORIO_HISTORICOS):
+    """Abre um histórico salvo via memory-map, sem reprocessar o Excel.
+
+    Retorna (df_falhas, df_indicadores, info_carga) no mesmo formato de preparar_dados.
+    """
+    from pyarrow import feather
+
+    pasta = diretorio / nome
+    if not (pasta / ARQUIVO_METADADOS).exists():
+        raise ValueError(f"O histórico '{nome}' não foi encontrado em {diretorio}.")
+
+    planilhas, tempos = {}, {}
+    for aba, arquivo in ARQUIVOS_PLANILHAS.items():
+        inicio = time.perf_counter()
+        if aba == 'Falhas':
+            tabela = _ler_falhas(pasta)
+        else:
+            tabela = feather.read_table(pasta / arquivo, memory_map=True)
+        planilhas[aba] = tabela.to_pandas()
+        tempos[aba] = time.perf_counter() - inicio
+
+    # Base e incrementos trazem dicionários próprios; volta ao dicionário único e ordenado por coluna
+    colunas_categoricas = {col for df in planilhas.values() for col in df.select_dtypes('category').columns}
+    unificar_categorias(list(planilhas.values()), sorted(colunas_categoricas))
+
+    # A base já foi gravada em ordem; só os incrementos anexados podem exigir reordenação
+    df_falhas = ordenar_por_data(planilhas['Falhas'], 'DATA INICIAL')
+    df_indicadores = ordenar_por_data(planilhas['Indicadores'], 'DATA_FINAL')
+
+    return df_falhas, df_indicadores, {'avisos': [], 'tempos_leitura': tempos}
+
+def _ler_falhas(pasta, colunas=None):
+    """Base de falhas mais todos os incrementos, como uma única tabela Arrow."""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    arquivos = [pasta / ARQUIVOS_PLANILHAS['Falhas'], *sorted(pasta.glob(PADRAO_INCREMENTOS_FALHAS))]
+    tabelas = [feather.read_table(arquivo, columns=colunas, memory_map=True) for arquivo in arquivos]
+    # Cada arquivo tem seu próprio dicionário de categorias; 'permissive' aceita índices de larguras diferentes
+    return pa.concat_tables(tabelas, promote_options='permissive')
+
+def carregar_agregados(nome, diretorio=DIRETORIO_HISTORICOS):
+    """Agregados por equipamento e por item mantidos com o histórico ({coluna: DataFrame})."""
+    pasta = diretorio / nome
+    return {coluna: pd.read_feather(pasta / arquivo) for coluna, arquivo in ARQUIVOS_AGREGADOS.items()
+            if (pasta / arquivo).exists()}
+
+def anexar_falhas(nome, df_novas, diretorio=DIRETORIO_HISTORICOS):
+    """Acrescenta ao histórico as falhas ainda não registradas, sem reescrever a base.
+
+    Registros repetidos (mesma CHAVE_FALHA) dentro do lote ou já presentes no histórico
+    são descartados. Os agregados por equipamento e por item e o rollup da hierarquia
+    são atualizados combinando apenas o lote novo. Retorna (inseridas, descartadas).
+    """
+    pasta = diretorio / nome
+    if not (pasta / ARQUIVO_METADADOS).exists():
+        raise ValueError(f"O histórico '{nome}' não foi encontrado em {diretorio}.")
+
+    # A deduplicação contra o histórico e a gravação precisam ver o mesmo estado do disco
+    with _lock_historico(pasta):
+        return _anexar_falhas(nome, pasta, df_novas, diretorio)
+
+def _anexar_falhas(nome, pasta, df_novas, diretorio):
+    total_lote = len(df_novas)
+    df_novas = df_novas.drop_duplicates(subset=CHAVE_FALHA)
+
+    # Só as colunas da chave são lidas do histórico existente
+    chaves_existentes = _ler_falhas(pasta, colunas=CHAVE_FALHA).to_pandas().drop_duplicates()
+    marcadas = df_novas[CHAVE_FALHA].merge(chaves_existentes, on=CHAVE_FALHA, how='left', indicator=True)
+    df_novas = df_novas[marcadas['_merge'].eq('left_only').to_numpy()]
+
+    if df_novas.empty:
+        return 0, total_lote
+
+    _gravar_feather(_tipar_para_arrow(df_novas), pasta / _nome_incremento())
+
+    for coluna, arquivo in ARQUIVOS_AGREGADOS.items():
+        novo = calcular_agregados(df_novas, coluna)
+        if (pasta / arquivo).exists():
+            novo = _combinar_agregados(pd.read_feather(pasta / arquivo), novo, coluna)
+        _gravar_feather(_tipar_para_arrow(novo), pasta / arquivo)
+
+    rollup = RollupHierarquia.de_tabela(df_novas)
+    rollup_atual = carregar_rollup_hierarquia(nome, diretorio)
+    _gravar_rollup(rollup if rollup_atual is None else rollup_atual.combinar(rollup), pasta)
+
+    metadados = json.loads((pasta / ARQUIVO_METADADOS).read_text(encoding='utf-8'))
+    metadados['linhas']['Falhas'] += len(df_novas)
+    metadados['incrementos'] = len(list(pasta.glob(PADRAO_INCREMENTOS_FALHAS)))
+    metadados['atualizado_em'] = datetime.now().isoformat(timespec='seconds')
+    (pasta / ARQUIVO_METADADOS).write_text(json.dumps(metadados, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    return len(df_novas), total_lote - len(df_novas)
@@ -5,307 +5,177 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 from datetime import datetime
-from sklearn.ensemble import IsolationForest
-from fpdf import FPDF
-import base64
+import hashlib
+import os
+import time
 from io import BytesIO
+from pathlib import Path
 import warnings
 
-# Adicione esta função no início do código (após os imports)
+from modules.conhecimento import BaseConhecimento, carregar_base_conhecimento
+from modules.filtros import selecao_ativa, chave_filtros, janela_dias
+from modules.historico import (
+    listar_historicos, chave_historico, carregar_historico, salvar_historico, anexar_falhas, carregar_agregados,
+    carregar_rollup_hierarquia
+)
+from modules.motor_kpis import CuboKPI
+from modules.motor_mtbf import FREQUENCIAS_DISPONIBILIDADE, MatrizDisponibilidade, MotorMTBF
+from modules.pipeline_kpis import (
+    construir_indices, preparar_dados, preparar_falhas, selecoes_indicadores, janela_periodo
+)
+from modules.relatorios import (
+    COLUNAS_LOTE, relatorio_suficiente, gerar_relatorio_pdf_temporario, especificacoes_por_coluna, gerar_lote_zip_temporario
+)
+from modules import secoes_kpis
+from modules.utils import CacheLRU
+
 def carregar_banco_conhecimento():
-    """Carrega o banco de conhecimento de falhas, causas e soluções"""
+    """Carrega o banco de conhecimento de falhas, causas e soluções, já indexado para as recomendações"""
     try:
-        # Carrega de um arquivo Excel específico
-        # Assumindo que 'banco_conhecimento.xlsx' está no mesmo diretório ou caminho acessível
-        df_conhecimento = pd.read_excel("banco_conhecimento.xlsx", sheet_name="Falhas")
-        
-        # Padroniza os dados
-        df_conhecimento['TipoFalha'] = df_conhecimento['TipoFalha'].str.lower().str.strip()
-        df_conhecimento['Causa'] = df_conhecimento['Causa'].str.lower().str.strip()
-        df_conhecimento['AcaoRecomendada'] = df_conhecimento['AcaoRecomendada'].astype(str)
-        
-        return df_conhecimento
+        # Lido uma vez por versão do arquivo e compartilhado entre as sessões
+        return carregar_base_conhecimento()
     except FileNotFoundError:
         st.warning("Arquivo 'banco_conhecimento.xlsx' não encontrado. As recomendações serão genéricas.")
-        return pd.DataFrame(columns=['TipoFalha', 'Causa', 'AcaoRecomendada'])
+        return BaseConhecimento()
     except Exception as e:
         st.warning(f"Não foi possível carregar o banco de conhecimento: {str(e)}")
-        return pd.DataFrame(columns=['TipoFalha', 'Causa', 'AcaoRecomendada'])
-
-# Modifique a função gerar_recomendacao para:
-def gerar_recomendacao(causa, df_conhecimento):
-    """Gera recomendações baseadas no banco de conhecimento"""
-    causa = str(causa).lower().strip()
-    
-    # Busca no banco de conhecimento
-    if not df_conhecimento.empty and 'Causa' in df_conhecimento.columns:
-        recomendacoes = df_conhecimento[df_conhecimento['Causa'].str.contains(causa, case=False, na=False)]
-        
-        if not recomendacoes.empty:
-            # Retorna as 3 melhores recomendações
-            return "\n".join([f"• {rec}" for rec in recomendacoes['AcaoRecomendada'].head(3).tolist()])
-    
-    # Padrões genéricos se não encontrar no banco ou se o banco não for carregado
-    padroes = {
-        "desgaste": "Implementar programa de lubrificação preventiva e inspeção periódica",
-        "vazamento": "Substituição programada de selos e juntas conforme vida útil",
-        "elétric": "Realizar termografia periódica e análise de vibração",
-        "hidráulic": "Monitoramento contínuo de pressão e vazão",
-        "corrosão": "Aplicação de proteção superficial e controle ambiental",
-        "sobreaquecimento": "Verificação do sistema de refrigeração e limpeza de radiadores",
-        "alinhamento": "Realizar alinhamento a laser trimestral",
-        "contaminaç": "Melhorar filtragem e controle de qualidade dos fluidos"
-    }
-    
-    for palavra_chave, acao in padroes.items():
-        if palavra_chave in causa:
-            return acao
-    
-    return "Realizar análise de causa raiz com a equipe técnica"
+        return BaseConhecimento()
 
 warnings.filterwarnings('ignore')
 
-class PDFReport(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'Relatório de Análise de Manutenção', 0, 1, 'C')
-        self.ln(5)
-    
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-
-def create_download_link(val, filename):
-    b64 = base64.b64encode(val)
-    return f'<a href="data:application/octet-stream;base64,{b64.decode()}" download="{filename}">Download Relatório PDF</a>'
-
-def generate_pdf_report(df_falhas_filtrado, top_equipments, timeline_data, kpis_hierarquia, df_conhecimento):
-    pdf = PDFReport()
-    # Adicionando fonte que suporte caracteres UTF-8
-    pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
-    pdf.add_font('DejaVu', 'B', 'DejaVuSansCondensed-Bold.ttf', uni=True)
-    
-    pdf.add_page()
-    pdf.set_font('DejaVu', 'B', 16)
-    pdf.cell(0, 10, 'Relatório de Análise de Manutenção', 0, 1, 'C')
-    pdf.ln(10)
-    
-    if not top_equipments.empty:
-        # Top 10 Equipamentos Críticos
-        pdf.set_font('DejaVu', 'B', 14)
-        pdf.cell(0, 10, 'Top 10 Equipamentos Críticos', 0, 1)
-        pdf.ln(5)
-        
-        pdf.set_font('DejaVu', '', 10)
-        # Ajusta largura das colunas para nomes de colunas na planilha
-        col_widths = [30, 25, 25, 25, 25, 25] 
-        headers = ['Equipamento', 'Frota', 'Tempo Total (h)', 'Ocorrências', 'Sistema', 'Conjunto']
-        
-        for i, header in enumerate(headers):
-            pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-        pdf.ln()
-        
-        for _, row in top_equipments.iterrows():
-            pdf.cell(col_widths[0], 10, str(row['EQUIPAMENTO']), 1)
-            pdf.cell(col_widths[1], 10, str(row['FROTA']), 1)
-            pdf.cell(col_widths[2], 10, f"{row['Tempo Total (h)']:.1f}", 1, 0, 'C')
-            pdf.cell(col_widths[3], 10, str(row['Ocorrências']), 1, 0, 'C')
-            pdf.cell(col_widths[4], 10, str(row['SISTEMA']), 1)
-            pdf.cell(col_widths[5], 10, str(row['CONJUNTO']), 1)
-            pdf.ln()
-    
-    # KPIs Hierárquicos
-    pdf.add_page()
-    pdf.set_font('DejaVu', 'B', 14)
-    pdf.cell(0, 10, 'Análise Hierárquica de Falhas', 0, 1, 'C')
-    pdf.ln(5)
-    
-    for nivel, df_kpi in kpis_hierarquia.items():
-        if not df_kpi.empty:
-            pdf.set_font('DejaVu', 'B', 12)
-            pdf.cell(0, 10, f'Nível: {nivel}', 0, 1)
-            pdf.ln(3)
-            
-            pdf.set_font('DejaVu', '', 10)
-            col_widths = [50, 25, 25, 25, 25]
-            headers = [nivel, 'Tempo Total (h)', 'MTTR (h)', 'Ocorrências', 'Equip. Afetados']
-            
-            for i, header in enumerate(headers):
-                pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-            pdf.ln()
-            
-            for _, row in df_kpi.iterrows():
-                pdf.cell(col_widths[0], 10, str(row.name), 1)
-                pdf.cell(col_widths[1], 10, f"{row['Tempo Total (h)']:.1f}", 1, 0, 'C')
-                pdf.cell(col_widths[2], 10, f"{row['MTTR (h)']:.1f}", 1, 0, 'C')
-                pdf.cell(col_widths[3], 10, str(row['Ocorrências']), 1, 0, 'C')
-                pdf.cell(col_widths[4], 10, str(row['Equip. Afetados']), 1, 0, 'C')
-                pdf.ln()
-            pdf.ln(10)
-    
-    # Linha do Tempo de Falhas
-    pdf.add_page()
-    pdf.set_font('DejaVu', 'B', 14)
-    pdf.cell(0, 10, 'Linha do Tempo das Falhas Mais Impactantes', 0, 1, 'C')
-    pdf.ln(5)
-    
-    if not timeline_data.empty:
-        pdf.set_font('DejaVu', '', 10)
-        for _, event in timeline_data.iterrows():
-            pdf.set_fill_color(200, 220, 255)
-            pdf.cell(0, 10, f"{event['DATA INICIAL'].strftime('%d/%m/%Y')} - {event['EQUIPAMENTO']}", 1, 1, 'L', 1)
-            pdf.cell(0, 8, f"Sistema: {event['SISTEMA']} > Conjunto: {event['CONJUNTO']} > Item: {event['ITEM']}", 0, 1)
-            pdf.cell(0, 8, f"Falha: {event['CAUSA']}", 0, 1)
-            pdf.cell(0, 8, f"Duração: {event['DURAÇÃO']} horas | Impacto: {event['Impacto']}", 0, 1)
-            pdf.ln(3)
-    
-    # Recomendações
-    pdf.add_page()
-    pdf.set_font('DejaVu', 'B', 14)
-    pdf.cell(0, 10, 'Recomendações Prioritárias', 0, 1, 'C')
-    pdf.ln(5)
-    
-    if not timeline_data.empty:
-        causas = timeline_data['CAUSA'].value_counts().nlargest(5)
-        for i, (causa, _) in enumerate(causas.items(), 1):
-            pdf.set_font('DejaVu', 'B', 12)
-            pdf.cell(0, 10, f"{i}. {causa}", 0, 1)
-            pdf.set_font('DejaVu', '', 10)
-            # Passa df_conhecimento para a função gerar_recomendacao
-            pdf.multi_cell(0, 8, gerar_recomendacao(causa, df_conhecimento)) 
-            pdf.ln(3)
-    
-    return pdf.output(dest='S').encode('utf-8') # Alterado para utf-8
+# Cache das planilhas já limpas, indexado pelo SHA-256 do arquivo enviado.
+# Reexecuções causadas por widgets reaproveitam os DataFrames sem reler o Excel.
+_cache_planilhas = CacheLRU(max_entradas=4, max_bytes=1024 ** 3)
 
-def clean_duration(value):
-    """Converte valores de duração para float de forma segura"""
-    try:
-        if pd.isna(value):
-            return np.nan
-        if isinstance(value, str):
-            value = value.replace(',', '.').strip()
-            if 'h' in value.lower():
-                value = value.lower().split('h')[0]
-        return float(value)
-    except:
-        return np.nan
-
-def clean_and_convert_column(series):
-    """Limpa e converte uma coluna para string consistente"""
-    return series.astype(str).str.strip()
+# Índices de filtro das planilhas em cache, pela mesma chave; montados uma vez por arquivo/histórico
+_cache_indices = CacheLRU(max_entradas=4)
+
+# Cubos de KPIs por (planilhas, estado dos filtros): voltar a um filtro já usado não reagrupa as falhas
+_cache_cubos = CacheLRU(max_entradas=32, max_bytes=256 * 1024 ** 2)
+
+# Resultados de cada seção da página por (seção, planilhas, filtros que a afetam, parâmetros da seção).
+# Um widget de uma seção só recalcula essa seção; as demais vêm do cache.
+_cache_secoes = CacheLRU(max_entradas=256, max_bytes=512 * 1024 ** 2)
+
+def calcular_secao(tempos, secao, chave, calcular):
+    """Resultado da seção pelo cache; anota em `tempos` quanto levou e se veio do cache."""
+    acertos_antes = _cache_secoes.acertos
+    inicio = time.perf_counter()
+    resultado = _cache_secoes.obter((secao, *chave), calcular)
+    tempos.append({
+        'Seção': secao,
+        'Tempo (ms)': (time.perf_counter() - inicio) * 1000,
+        'Cache': 'sim' if _cache_secoes.acertos > acertos_antes else 'não',
+    })
+    return resultado
 
 def exibir_kpis():
     st.title("📊 Análise Completa de KPIs de Manutenção")
     
-    arquivo = st.file_uploader(
-        "📁 Upload do histórico de manutenção (planilhas 'Falhas' e 'Indicadores' no mesmo arquivo .xlsx)", 
-        type=["xlsx"]
+    fonte_dados = st.radio(
+        "Fonte dos dados",
+        ["Upload de planilha", "Histórico salvo"],
+        horizontal=True,
+        key="fonte_dados_kpi"
     )
-    
-    if not arquivo:
-        st.info("Por favor, faça upload do arquivo Excel para análise")
-        return
+
+    arquivo = None
+    nome_historico = None
+    if fonte_dados == "Upload de planilha":
+        arquivo = st.file_uploader(
+            "📁 Upload do histórico de manutenção (planilhas 'Falhas' e 'Indicadores' no mesmo arquivo .xlsx)", 
+            type=["xlsx"]
+        )
+        
+        if not arquivo:
+            st.info("Por favor, faça upload do arquivo Excel para análise")
+            return
+    else:
+        historicos = listar_historicos()
+        if not historicos:
+            st.info("Nenhum histórico salvo ainda. Faça upload de uma planilha e use 'Salvar como histórico' na barra lateral.")
+            return
+        nome_historico = st.selectbox("Histórico", historicos, key="historico_kpi")
+
+        # Lote de novas falhas: roda antes da carga para que a análise já inclua os registros anexados
+        with st.sidebar.expander("➕ Anexar novas falhas"):
+            arquivo_incremento = st.file_uploader(
+                "Planilha com a aba 'Falhas' contendo apenas os novos registros",
+                type=["xlsx"],
+                key="incremento_falhas"
+            )
+            if arquivo_incremento and st.button("Anexar ao histórico", key="anexar_falhas"):
+                try:
+                    df_novas, avisos_incremento = preparar_falhas(arquivo_incremento.getvalue())
+                    for aviso in avisos_incremento:
+                        st.warning(aviso)
+                    inseridas, descartadas = anexar_falhas(nome_historico, df_novas)
+                    st.success(f"{inseridas} falhas anexadas ao histórico '{nome_historico}' ({descartadas} já existentes ou repetidas foram ignoradas).")
+                except Exception as e:
+                    st.error(f"Não foi possível anexar as falhas: {str(e)}")
+
+        with st.expander("📦 Agregados do histórico completo (sem filtros)"):
+            agregados = carregar_agregados(nome_historico)
+            for coluna, df_agregado in agregados.items():
+                st.write(f"**Por {coluna.capitalize()}**")
+                st.dataframe(
+                    df_agregado.assign(MTTR=df_agregado['Tempo_Total_Parada'] / df_agregado['Ocorrencias'])
+                    .sort_values('Tempo_Total_Parada', ascending=False)
+                    .style.format({'Tempo_Total_Parada': '{:.1f}', 'MTTR': '{:.1f}'}),
+                    use_container_width=True
+                )
+            rollup_historico = carregar_rollup_hierarquia(nome_historico)
+            if rollup_historico is not None:
+                st.write("**Por Sistema**")
+                st.dataframe(
+                    rollup_historico.kpis('SISTEMA').style.format({'Tempo_Total_Parada': '{:.1f}', 'MTTR': '{:.1f}'}),
+                    use_container_width=True
+                )
 
     # Tela de carregamento
     with st.spinner("Realizando análise de dados... Isso pode levar alguns segundos."):
         try:
-            df_conhecimento = carregar_banco_conhecimento()
+            base_conhecimento = carregar_banco_conhecimento()
 
-            # --- Carregamento das duas planilhas ---
-            # Tenta carregar a planilha 'Falhas'
+            # --- Carregamento das duas planilhas (com cache por conteúdo) ---
+            if arquivo:
+                conteudo = arquivo.getvalue()
+                chave_dados = hashlib.sha256(conteudo).hexdigest()
+                carregar = lambda: preparar_dados(conteudo)
+            else:
+                chave_dados = chave_historico(nome_historico)
+                carregar = lambda: carregar_historico(nome_historico)
             try:
-                df_falhas = pd.read_excel(arquivo, sheet_name='Falhas')
-            except ValueError:
-                st.error("A planilha 'Falhas' não foi encontrada no arquivo Excel. Por favor, verifique o nome da aba.")
+                df_falhas, df_indicadores, info_carga = _cache_planilhas.obter(chave_dados, carregar)
+            except ValueError as ve:
+                st.error(str(ve))
                 return
 
-            # Tenta carregar a planilha 'Indicadores'
-            try:
-                df_indicadores = pd.read_excel(arquivo, sheet_name='Indicadores')
-            except ValueError:
-                st.error("A planilha 'Indicadores' não foi encontrada no arquivo Excel. Por favor, verifique o nome da aba.")
-                return
-                
-            # --- Processamento de df_falhas ---
-            
-            # Verificação de colunas obrigatórias para Falhas
-            required_cols_falhas = ['EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO', 'ITEM', 
-                                    'DATA INICIAL', 'DATA FINAL', 'DURAÇÃO', 'CAUSA']
-            missing_cols_falhas = [col for col in required_cols_falhas if col not in df_falhas.columns]
-            if missing_cols_falhas:
-                st.error(f"Colunas obrigatórias faltando na planilha 'Falhas': {', '.join(missing_cols_falhas)}")
-                return
+            for aviso in info_carga['avisos']:
+                st.warning(aviso)
 
-            # Conversão segura de tipos para Falhas
-            df_falhas['DATA INICIAL'] = pd.to_datetime(df_falhas['DATA INICIAL'], errors='coerce')
-            df_falhas['DATA FINAL'] = pd.to_datetime(df_falhas['DATA FINAL'], errors='coerce')
-            df_falhas['DURAÇÃO'] = df_falhas['DURAÇÃO'].apply(clean_duration)
-            
-            # Limpeza das colunas de texto para Falhas
-            text_cols_falhas = ['SISTEMA', 'CONJUNTO', 'ITEM', 'CAUSA', 'EQUIPAMENTO', 'FROTA']
-            for col in text_cols_falhas:
-                df_falhas[col] = clean_and_convert_column(df_falhas[col])
-            
-            # Remoção de registros inválidos em Falhas
-            original_count_falhas = len(df_falhas)
-            df_falhas = df_falhas.dropna(subset=['DATA INICIAL', 'DATA FINAL', 'DURAÇÃO'])
-            if len(df_falhas) < original_count_falhas:
-                st.warning(f"Removidos {original_count_falhas - len(df_falhas)} registros inválidos da planilha 'Falhas'.")
-            
-            if len(df_falhas) == 0:
-                st.error("Nenhum dado válido encontrado na planilha 'Falhas' após a limpeza.")
-                return
+            indice_falhas, indice_indicadores = _cache_indices.obter(
+                chave_dados, lambda: construir_indices(df_falhas, df_indicadores)
+            )
+
+            # --- Conversão do upload em histórico colunar (Feather) ---
+            if arquivo:
+                with st.sidebar.expander("💾 Salvar como histórico"):
+                    nome_novo = st.text_input("Nome do histórico", value=Path(arquivo.name).stem, key="nome_historico_novo")
+                    if st.button("Salvar histórico", key="salvar_historico"):
+                        try:
+                            nome_salvo = salvar_historico(nome_novo, df_falhas, df_indicadores, origem=arquivo.name)
+                            st.success(f"Histórico '{nome_salvo}' salvo. Selecione 'Histórico salvo' para abri-lo sem reprocessar o Excel.")
+                        except Exception as e:
+                            st.error(f"Não foi possível salvar o histórico: {str(e)}")
 
-            # --- Processamento de df_indicadores (NOVO) ---
-            
-            # Padroniza nomes das colunas de df_indicadores para facilitar o acesso
-            df_indicadores.columns = df_indicadores.columns.str.upper().str.replace(' ', '_').str.replace('%', '_PERCENT').str.strip()
-            
-            # Verificação de colunas obrigatórias para Indicadores
-            required_cols_indicadores = ['EQUIPAMENTO', 'FROTA', 'DATA_INICIAL', 'DATA_FINAL', 
-                                        'DISPONIBILIDADE_FISICA', 'MTBF', 'MTTR', 'OEE', 'PRODUTIVIDADE']
-            # CORREÇÃO: Removido o 'col' duplicado aqui
-            missing_cols_indicadores = [col for col in required_cols_indicadores if col not in df_indicadores.columns]
-            if missing_cols_indicadores:
-                st.warning(f"Algumas colunas esperadas na planilha 'Indicadores' não foram encontradas: {', '.join(missing_cols_indicadores)}. Certas análises podem estar incompletas.")
-                
-            # Verifica colunas críticas para correlação
-            if 'EQUIPAMENTO' not in df_indicadores.columns or 'FROTA' not in df_indicadores.columns:
-                 st.error("Colunas 'EQUIPAMENTO' e/ou 'FROTA' ausentes na planilha 'Indicadores'. Não é possível correlacionar os dados.")
-                 return
-
-            # Conversão segura de tipos para Indicadores
-            if 'DATA_INICIAL' in df_indicadores.columns:
-                df_indicadores['DATA_INICIAL'] = pd.to_datetime(df_indicadores['DATA_INICIAL'], errors='coerce')
-            if 'DATA_FINAL' in df_indicadores.columns:
-                df_indicadores['DATA_FINAL'] = pd.to_datetime(df_indicadores['DATA_FINAL'], errors='coerce')
-
-            numeric_cols_indicadores = [
-                'HORAS_CALENDARIO', 'HORAS_DE_MANUTENCAO', 'HORA_DE_MANUTENÇÃO_CORRETIVA', 'HORA_ACIDENTE', 
-                'HORA_DE_MANUTENÇÃO_PREVENTIVA', 'HORA_DE_MANUTENÇÃO_PREVENTIVA_SISTEMÁTICA', 
-                'HORA_DE_MANUTENÇÃO_PREVENTIVA_NÃO_SISTEMÁTICA', 'HORAS_DISPONIVÉIS', 'HORA_OCIOSA', 
-                'HORA_OCIOSA_INTERNA', 'HORA_OCIOSA_EXTERNA', 'HORA_TRABALHADA', 'HORA_TRABALHADA_PRODUTIVA', 
-                'HORA_EFETIVA', 'HORA_DE_ATRASO_OPERACIONAL', 'HORA_TRABALHADA_NÃO_PRODUTIVA', 
-                'HORA_TRABALHADA_DE_INFRA', 'HORA_TRABALHADA_DIVERSA', 
-                'DISPONIBILIDADE_FISICA', 'UTILIZACAO_FISICA', 'RENDIMENTO_OPERACIONAL', 'DI_PERCENT', 'EP', 'OEE',
-                'NUMERO_DE_INTERVEÇÕES_CORRETIVAS', 'IAO', 'TON_HE', 'MTBF', 'MTTR', 'MTBS', 'MTTS', 'NIM', 'FMP',
-                'PRODUÇÃO', 'PRODUTIVIDADE', 'PERCENT_IMPACTO_NO_PAI'
-            ]
-            for col in numeric_cols_indicadores:
-                if col in df_indicadores.columns:
-                    df_indicadores[col] = pd.to_numeric(df_indicadores[col], errors='coerce')
-            
-            # Limpeza das colunas de texto para Indicadores
-            text_cols_indicadores = ['DIRETORIA', 'COMPLEXO', 'UNIDADE', 'FASE_PRODUTIVA', 'SISTEMA_PRODUTIVO', 
-                                     'SUBPROCESSO', 'LINHA', 'CATEGORIA', 'GRUPO_DE_EQUIPAMENTOS', 'FAMÍLIA', 
-                                     'CLASSE', 'PORTE', 'FROTA', 'ROTA', 'EQUIPAMENTO', 'ATIVIDADE', 'STATUS']
-            for col in text_cols_indicadores:
-                if col in df_indicadores.columns:
-                    df_indicadores[col] = clean_and_convert_column(df_indicadores[col])
-            
             # --- Filtros laterais ---
             with st.sidebar:
+                st.caption(f"Cache de planilhas: {_cache_planilhas.resumo()}")
+                st.caption(f"Índices de filtro: {_cache_indices.resumo()}")
+                st.caption("Leitura: " + " · ".join(
+                    f"{aba} {segundos:.2f} s" for aba, segundos in info_carga['tempos_leitura'].items()
+                ))
                 st.header("🔍 Filtros")
                 
                 # Garante que as datas mínimas e máximas sejam válidas
@@ -316,86 +186,77 @@ def exibir_kpis():
                 date_range = st.date_input("Período", [min_date_falhas, max_date_falhas])
                 
                 # Filtro de Frotas
-                frotas_all = ["Todas"] + sorted(list(df_falhas['FROTA'].unique()))
+                frotas_all = ["Todas"] + indice_falhas.valores('FROTA')
                 frota_selecionada = st.multiselect("Frotas", frotas_all, default=["Todas"])
                 
                 # Filtro de Equipamentos (Correlacionado com Frota)
                 equipamentos_disponiveis = []
                 if "Todas" in frota_selecionada:
-                    equipamentos_disponiveis = ["Todos"] + sorted(list(df_falhas['EQUIPAMENTO'].unique()))
+                    equipamentos_disponiveis = ["Todos"] + indice_falhas.valores('EQUIPAMENTO')
                 elif frota_selecionada:
-                    df_temp_equip = df_falhas[df_falhas['FROTA'].isin(frota_selecionada)]
-                    equipamentos_disponiveis = ["Todos"] + sorted(list(df_temp_equip['EQUIPAMENTO'].unique()))
+                    equipamentos_disponiveis = ["Todos"] + indice_falhas.valores('EQUIPAMENTO', {'FROTA': frota_selecionada})
                 
                 equipamento_selecionado = st.multiselect("Equipamentos", equipamentos_disponiveis, default=["Todos"])
                 
                 # Filtro de Sistemas
-                sistemas_all = ["Todos"] + sorted(list(df_falhas['SISTEMA'].unique()))
+                sistemas_all = ["Todos"] + indice_falhas.valores('SISTEMA')
                 sistemas_selecionados = st.multiselect("Sistemas", sistemas_all, default=["Todos"])
 
                 # Filtro de Conjuntos para Pareto e Confiabilidade de Componentes
-                conjuntos_all = ["Todos"] + sorted(list(df_falhas['CONJUNTO'].unique()))
+                conjuntos_all = ["Todos"] + indice_falhas.valores('CONJUNTO')
                 conjunto_selecionado = st.multiselect("Conjuntos", conjuntos_all, default=["Todos"])
 
                 # Filtro de Itens para Confiabilidade de Componentes
-                itens_all = ["Todos"] + sorted(list(df_falhas['ITEM'].unique()))
+                itens_all = ["Todos"] + indice_falhas.valores('ITEM')
                 item_selecionado = st.multiselect("Itens", itens_all, default=["Todos"])
 
 
             # --- Aplicação dos filtros aos DataFrames ---
-            df_falhas_filtrado = df_falhas.copy()
-            df_indicadores_filtrado = df_indicadores.copy() # Copia para filtrar tbm
-
+            # Cada planilha é filtrada de uma vez pelo índice (um único take), sem cópias intermediárias
+            selecoes = {
+                coluna: selecionados for coluna, selecionados in [
+                    ('FROTA', frota_selecionada),
+                    ('EQUIPAMENTO', equipamento_selecionado),
+                    ('SISTEMA', sistemas_selecionados),
+                    ('CONJUNTO', conjunto_selecionado),
+                    ('ITEM', item_selecionado),
+                ] if selecao_ativa(selecionados)
+            }
+            selecoes_planilha_indicadores = selecoes_indicadores(selecoes)
+
+            periodo = None
             if len(date_range) == 2:
                 start_date = pd.Timestamp(date_range[0])
                 end_date = pd.Timestamp(date_range[1])
-                
-                df_falhas_filtrado = df_falhas_filtrado[
-                    (df_falhas_filtrado['DATA INICIAL'] >= start_date) &
-                    (df_falhas_filtrado['DATA INICIAL'] <= end_date)
-                ]
-                
-                # Filtra indicadores pela DATA_FINAL dentro do range
-                if 'DATA_FINAL' in df_indicadores_filtrado.columns:
-                    df_indicadores_filtrado = df_indicadores_filtrado[
-                        (df_indicadores_filtrado['DATA_FINAL'] >= start_date) &
-                        (df_indicadores_filtrado['DATA_FINAL'] <= end_date)
-                    ]
-            
-            if "Todas" not in frota_selecionada and frota_selecionada:
-                df_falhas_filtrado = df_falhas_filtrado[df_falhas_filtrado['FROTA'].isin(frota_selecionada)]
-                df_indicadores_filtrado = df_indicadores_filtrado[df_indicadores_filtrado['FROTA'].isin(frota_selecionada)]
-            
-            if "Todos" not in equipamento_selecionado and equipamento_selecionado:
-                df_falhas_filtrado = df_falhas_filtrado[df_falhas_filtrado['EQUIPAMENTO'].isin(equipamento_selecionado)]
-                df_indicadores_filtrado = df_indicadores_filtrado[df_indicadores_filtrado['EQUIPAMENTO'].isin(equipamento_selecionado)]
-
-            if "Todos" not in sistemas_selecionados and sistemas_selecionados:
-                df_falhas_filtrado = df_falhas_filtrado[df_falhas_filtrado['SISTEMA'].isin(sistemas_selecionados)]
-                # Note: df_indicadores_filtrado não possui 'SISTEMA' padronizado como 'SISTEMA'. Se houver, adicione aqui.
-                # Se for 'SISTEMA_PRODUTIVO' use:
-                if 'SISTEMA_PRODUTIVO' in df_indicadores_filtrado.columns:
-                    df_indicadores_filtrado = df_indicadores_filtrado[df_indicadores_filtrado['SISTEMA_PRODUTIVO'].isin(sistemas_selecionados)]
-            
-            if "Todos" not in conjunto_selecionado and conjunto_selecionado:
-                df_falhas_filtrado = df_falhas_filtrado[df_falhas_filtrado['CONJUNTO'].isin(conjunto_selecionado)]
-
-            if "Todos" not in item_selecionado and item_selecionado:
-                df_falhas_filtrado = df_falhas_filtrado[df_falhas_filtrado['ITEM'].isin(item_selecionado)]
+                periodo = (start_date, end_date)
 
+            df_falhas_filtrado = indice_falhas.filtrar(df_falhas, selecoes, periodo)
+            df_indicadores_filtrado = indice_indicadores.filtrar(df_indicadores, selecoes_planilha_indicadores, periodo)
 
             if len(df_falhas_filtrado) == 0:
                 st.warning("Nenhum dado de falhas encontrado com os filtros aplicados.")
                 return
-            
+
+            # --- Cubo de KPIs: uma única agregação das falhas filtradas, reagrupada por cada seção ---
+            cubo = _cache_cubos.obter(
+                (chave_dados, chave_filtros(selecoes, periodo)), lambda: CuboKPI(df_falhas_filtrado)
+            )
+            # MTBF/MTTR pelos intervalos de falha de cada equipamento e item, na janela do período
+            motor_mtbf = _cache_cubos.obter(
+                ('MTBF', chave_dados, chave_filtros(selecoes, periodo)),
+                lambda: MotorMTBF(df_falhas_filtrado, *janela_periodo(df_falhas, periodo))
+            )
+
+            # Chaves de cache das seções: planilhas + filtros que afetam cada planilha
+            chave_secao = (chave_dados, chave_filtros(selecoes, periodo))
+            chave_secao_indicadores = (chave_dados, chave_filtros(selecoes_planilha_indicadores, periodo))
+            tempos_secoes = []
+
             # --- Agrega indicadores (pega o último registro por equipamento dentro do período) ---
-            # Para pegar o último valor acumulado por equipamento dentro do período filtrado.
-            df_indicadores_agregados = pd.DataFrame()
-            if 'DATA_FINAL' in df_indicadores_filtrado.columns:
-                df_indicadores_agregados = df_indicadores_filtrado.sort_values('DATA_FINAL').groupby(['EQUIPAMENTO', 'FROTA']).last().reset_index()
-            elif not df_indicadores_filtrado.empty:
-                # Se não há coluna de data_final para agregar, usa a última entrada por equipamento/frota (menos ideal, mas tenta continuar)
-                df_indicadores_agregados = df_indicadores_filtrado.groupby(['EQUIPAMENTO', 'FROTA']).last().reset_index()
+            df_indicadores_agregados = calcular_secao(
+                tempos_secoes, 'Indicadores', chave_secao_indicadores,
+                lambda: secoes_kpis.agregar_indicadores(df_indicadores_filtrado)
+            )
             
             if len(df_indicadores_agregados) == 0:
                 st.warning("Nenhum dado de indicadores encontrado com os filtros aplicados. Algumas análises podem estar incompletas.")
@@ -414,12 +275,12 @@ def exibir_kpis():
             
             # Cálculo de KPIs com verificação de dados
             try:
-                kpis = df_falhas_filtrado.groupby(grupo).agg({
-                    'DURAÇÃO': ['mean', 'sum', 'count'],
-                    'EQUIPAMENTO': 'nunique' # Usa EQUIPAMENTO da planilha de Falhas
-                }).sort_values(('DURAÇÃO', 'sum'), ascending=False)
-                
-                kpis.columns = ['MTTR (h)', 'Tempo Total (h)', 'Ocorrências', 'Equip. Afetados']
+                # Troca de nível e detalhamento são consultas ao rollup já materializado com o cubo
+                hierarquia = cubo.hierarquia
+                colunas_hierarquia = secoes_kpis.COLUNAS_HIERARQUIA
+                kpis = calcular_secao(
+                    tempos_secoes, 'Hierarquia', (*chave_secao, grupo), lambda: secoes_kpis.kpis_hierarquia(cubo, grupo)
+                )
                 
                 # Exibição dos resultados
                 col1, col2 = st.columns([1, 2])
@@ -443,6 +304,27 @@ def exibir_kpis():
                         hover_data=['Ocorrências']
                     )
                     st.plotly_chart(fig, use_container_width=True)
+
+                with st.expander("🔽 Detalhar Sistema → Conjunto → Item"):
+                    col_sistema, col_conjunto = st.columns(2)
+                    sistema_detalhe = col_sistema.selectbox("Sistema", hierarquia.valores('SISTEMA'), key="detalhe_sistema")
+                    conjunto_detalhe = col_conjunto.selectbox(
+                        "Conjunto", hierarquia.valores('CONJUNTO', {'SISTEMA': sistema_detalhe}), key="detalhe_conjunto"
+                    )
+                    formato_detalhe = {'MTTR (h)': '{:.1f}', 'Tempo Total (h)': '{:.1f}'}
+                    st.write(f"**Conjuntos de {sistema_detalhe}**")
+                    st.dataframe(
+                        hierarquia.detalhar({'SISTEMA': sistema_detalhe})[list(colunas_hierarquia)]
+                        .rename(columns=colunas_hierarquia).style.format(formato_detalhe),
+                        use_container_width=True
+                    )
+                    if conjunto_detalhe is not None:
+                        st.write(f"**Itens de {conjunto_detalhe}**")
+                        st.dataframe(
+                            hierarquia.detalhar({'SISTEMA': sistema_detalhe, 'CONJUNTO': conjunto_detalhe})[list(colunas_hierarquia)]
+                            .rename(columns=colunas_hierarquia).style.format(formato_detalhe),
+                            use_container_width=True
+                        )
             except Exception as e:
                 st.error(f"Erro na análise hierárquica: {str(e)}")
 
@@ -458,9 +340,10 @@ def exibir_kpis():
             pareto_group_col = {'Item': 'ITEM', 'Conjunto': 'CONJUNTO'}[pareto_nivel]
 
             if not df_falhas_filtrado.empty:
-                df_pareto = df_falhas_filtrado.groupby(pareto_group_col)['DURAÇÃO'].sum().sort_values(ascending=False).reset_index()
-                df_pareto.columns = [pareto_group_col, 'Tempo Total Parada (h)']
-                df_pareto['Porcentagem Cumulativa (%)'] = (df_pareto['Tempo Total Parada (h)'].cumsum() / df_pareto['Tempo Total Parada (h)'].sum()) * 100
+                df_pareto = calcular_secao(
+                    tempos_secoes, 'Pareto', (*chave_secao, pareto_group_col),
+                    lambda: secoes_kpis.pareto(cubo, pareto_group_col)
+                )
 
                 fig_pareto = px.bar(
                     df_pareto,
@@ -491,26 +374,10 @@ def exibir_kpis():
             st.header("🔬 Análise de Confiabilidade Básica de Componentes")
 
             if not df_falhas_filtrado.empty:
-                # Calcular total de horas no período filtrado
-                total_period_seconds = (end_date - start_date).total_seconds() if len(date_range) == 2 else (df_falhas['DATA FINAL'].max() - df_falhas['DATA INICIAL'].min()).total_seconds()
-                total_period_hours = total_period_seconds / 3600
-
-                # Calcular MTTR, Ocorrências e Tempo Total Parada por ITEM
-                df_reliability = df_falhas_filtrado.groupby('ITEM').agg(
-                    Ocorrencias=('ITEM', 'count'),
-                    Tempo_Total_Parada=('DURAÇÃO', 'sum'),
-                    MTTR=('DURAÇÃO', 'mean'),
-                    Ultima_Falha=('DATA FINAL', 'max') # Para previsão de falhas
-                ).reset_index()
-
-                # Calcular MTBF (aproximado): (Total Horas Observadas - Tempo Total Parada) / Ocorrências
-                # Assumindo que todos os itens estavam "disponíveis" durante o período total
-                # Cuidado: Esta é uma simplificação. Um MTBF preciso requer horas de operação exatas por item.
-                df_reliability['MTBF (h)'] = (total_period_hours - df_reliability['Tempo_Total_Parada']) / df_reliability['Ocorrencias']
-                df_reliability.replace([np.inf, -np.inf], np.nan, inplace=True) # Trata divisão por zero se Ocorrencias for 0
-                df_reliability['MTBF (h)'] = df_reliability['MTBF (h)'].fillna(total_period_hours) # Se nunca falhou, MTBF é pelo menos o período total
-
-                df_reliability = df_reliability.sort_values('Ocorrencias', ascending=False)
+                df_reliability = calcular_secao(
+                    tempos_secoes, 'Confiabilidade', chave_secao,
+                    lambda: secoes_kpis.confiabilidade_por_item(cubo, motor_mtbf)
+                )
 
                 st.subheader("Métricas de Confiabilidade por Item")
                 st.dataframe(df_reliability.style.format({
@@ -536,21 +403,14 @@ def exibir_kpis():
             st.info("Esta é uma previsão heurística baseada no MTBF histórico dos itens. Considere um modelo preditivo mais avançado para maior precisão.")
 
             if not df_reliability.empty and 'Ultima_Falha' in df_reliability.columns and 'MTBF (h)' in df_reliability.columns:
-                # Data de referência para calcular o tempo desde a última falha (pode ser a data atual ou a data final dos dados)
-                current_ref_date = end_date if len(date_range) == 2 else datetime.now() # Usar a data final do período filtrado
-                
-                df_reliability['Tempo_Desde_Ultima_Falha (h)'] = (current_ref_date - df_reliability['Ultima_Falha']).dt.total_seconds() / 3600
-                
-                # Flag de risco: Se o tempo desde a última falha é >= 80% do MTBF
-                df_reliability['Risco_Proxima_Falha'] = np.where(
-                    (df_reliability['Tempo_Desde_Ultima_Falha (h)'] >= df_reliability['MTBF (h)'] * 0.8) & (df_reliability['Ocorrencias'] > 0),
-                    'Alto', 'Baixo'
+                # Data de referência para calcular o tempo desde a última falha: a data final do período filtrado
+                current_ref_date = end_date if len(date_range) == 2 else pd.Timestamp(datetime.now().date())
+                df_reliability, risk_items = calcular_secao(
+                    tempos_secoes, 'Risco', (*chave_secao, current_ref_date),
+                    lambda: secoes_kpis.risco_proxima_falha(df_reliability, current_ref_date)
                 )
-                df_reliability['Risco_Proxima_Falha'] = np.where(df_reliability['Ocorrencias'] == 0, 'N/A (Sem Histórico)', df_reliability['Risco_Proxima_Falha'])
-
 
                 st.subheader("Itens com Risco Potencial de Próxima Falha")
-                risk_items = df_reliability[df_reliability['Risco_Proxima_Falha'] == 'Alto'].sort_values('Tempo_Desde_Ultima_Falha (h)', ascending=False)
                 
                 if not risk_items.empty:
                     st.dataframe(risk_items[[
@@ -580,36 +440,10 @@ def exibir_kpis():
             
             if equipamentos_selecionados_comp:
                 try:
-                    df_comp_equip = df_falhas_filtrado[df_falhas_filtrado['EQUIPAMENTO'].isin(equipamentos_selecionados_comp)]
-                    kpis_comp_equip = df_comp_equip.groupby('EQUIPAMENTO').agg(
-                        Tempo_Total_Parada=('DURAÇÃO', 'sum'),
-                        Ocorrencias=('DURAÇÃO', 'count'),
-                        MTTR_h=('DURAÇÃO', 'mean')
-                    ).reset_index()
-
-                    # Merge com MTBF calculado anteriormente, se aplicável
-                    if not df_reliability.empty:
-                        # Criar um DataFrame de resumo de MTBF por equipamento a partir de df_reliability
-                        # Primeiro, mapeie os ITENS para seus EQUIPAMENTOS originais se a falha estiver ligada
-                        # ou calcule MTBF por EQUIPAMENTO diretamente da falhas filtradas.
-                        # Para manter a lógica anterior de MTBF por ITEM, vamos agrupar o resultado de MTBF por ITEM pelo EQUIPAMENTO
-                        
-                        # Para isso, precisamos da ligação EQUIPAMENTO-ITEM.
-                        # Agrupe df_falhas_filtrado por EQUIPAMENTO e ITEM para obter as ocorrências por item em cada equipamento
-                        df_equip_item_summary = df_falhas_filtrado.groupby(['EQUIPAMENTO', 'ITEM']).agg(
-                            Ocorrencias_Item=('ITEM', 'count')
-                        ).reset_index()
-
-                        # Juntar com df_reliability para obter o MTBF de cada ITEM no EQUIPAMENTO
-                        df_equip_item_reliability = pd.merge(df_equip_item_summary, df_reliability[['ITEM', 'MTBF (h)']], on='ITEM', how='left')
-                        
-                        # Agora podemos calcular um MTBF médio (ponderado ou simples) por EQUIPAMENTO
-                        # Uma média simples é um bom começo
-                        df_reliability_equip_summary = df_equip_item_reliability.groupby('EQUIPAMENTO')['MTBF (h)'].mean().reset_index()
-                        df_reliability_equip_summary.rename(columns={'MTBF (h)': 'MTBF_h'}, inplace=True) # Renomeia para merge
-                        
-                        kpis_comp_equip = pd.merge(kpis_comp_equip, df_reliability_equip_summary, on='EQUIPAMENTO', how='left')
-
+                    kpis_comp_equip = calcular_secao(
+                        tempos_secoes, 'Comparação por equipamento', (*chave_secao, tuple(sorted(map(str, equipamentos_selecionados_comp)))),
+                        lambda: secoes_kpis.comparacao_equipamentos(cubo, motor_mtbf, equipamentos_selecionados_comp)
+                    )
 
                     st.dataframe(kpis_comp_equip.style.format({
                         'Tempo_Total_Parada': '{:.1f}',
@@ -634,31 +468,20 @@ def exibir_kpis():
             else:
                 st.warning("Selecione pelo menos um equipamento para comparação")
 
+            if not equipamentos_selecionados_comp:
+                kpis_comp_equip = None
+
             # Nova Comparação por Frota
             st.subheader("Comparação de KPIs por Frota")
             
             # Garante que há mais de uma frota no filtro ou para comparar
             if len(frota_selecionada) > 1 and "Todas" not in frota_selecionada or ("Todas" in frota_selecionada and len(df_falhas_filtrado['FROTA'].unique()) > 1):
-                df_comp_frota = df_falhas_filtrado
-                if "Todas" not in frota_selecionada: # Aplica filtro se "Todas" não estiver selecionado
-                     df_comp_frota = df_comp_frota[df_comp_frota['FROTA'].isin(frota_selecionada)]
-
-                kpis_comp_frota = df_comp_frota.groupby('FROTA').agg(
-                    Tempo_Total_Parada=('DURAÇÃO', 'sum'),
-                    Ocorrencias=('DURAÇÃO', 'count'),
-                    MTTR_h=('DURAÇÃO', 'mean')
-                ).reset_index()
-                
-                # Para MTBF por frota, precisaríamos de uma agregação do MTBF dos itens/equipamentos dentro da frota.
-                # Aqui faremos uma média simples do MTBF médio dos equipamentos da frota.
-                if 'MTBF_h' in kpis_comp_equip.columns: # Reusa o cálculo de MTBF_h do df kpis_comp_equip se disponível
-                    df_equip_mtbf_frota = kpis_comp_equip[['EQUIPAMENTO', 'MTBF_h']].dropna()
-                    df_equip_frota_link = df_falhas_filtrado[['EQUIPAMENTO', 'FROTA']].drop_duplicates()
-                    df_merged_mtbf_frota = pd.merge(df_equip_mtbf_frota, df_equip_frota_link, on='EQUIPAMENTO', how='inner')
-                    
-                    mtbf_frota = df_merged_mtbf_frota.groupby('FROTA')['MTBF_h'].mean().reset_index()
-                    kpis_comp_frota = pd.merge(kpis_comp_frota, mtbf_frota, on='FROTA', how='left')
-
+                frotas_comp = None if "Todas" in frota_selecionada else frota_selecionada
+                kpis_comp_frota = calcular_secao(
+                    tempos_secoes, 'Comparação por frota',
+                    (*chave_secao, None if frotas_comp is None else tuple(sorted(map(str, frotas_comp)))),
+                    lambda: secoes_kpis.comparacao_frotas(cubo, frotas_comp, motor_mtbf)
+                )
 
                 st.dataframe(kpis_comp_frota.style.format({
                     'Tempo_Total_Parada': '{:.1f}',
@@ -686,31 +509,18 @@ def exibir_kpis():
             st.info("Identifica padrões de falha por dia da semana e mês, ou por hora e dia da semana.")
 
             if not df_falhas_filtrado.empty:
-                df_falhas_filtrado['Dia da Semana'] = df_falhas_filtrado['DATA INICIAL'].dt.day_name(locale='pt_BR')
-                df_falhas_filtrado['Mês'] = df_falhas_filtrado['DATA INICIAL'].dt.month_name(locale='pt_BR')
-                df_falhas_filtrado['Hora'] = df_falhas_filtrado['DATA INICIAL'].dt.hour
-
-                # Ordenar dias da semana e meses para o heatmap
-                ordem_dias = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
-                ordem_meses = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
-
                 heatmap_option = st.radio(
                     "Tipo de Heatmap:",
                     ["Falhas por Dia da Semana e Mês", "Falhas por Hora do Dia e Dia da Semana"],
                     horizontal=True,
                     key="heatmap_option"
                 )
+                df_heatmap = calcular_secao(
+                    tempos_secoes, 'Heatmap', (*chave_secao, heatmap_option),
+                    lambda: secoes_kpis.heatmap_falhas(df_falhas_filtrado, heatmap_option)
+                )
 
                 if heatmap_option == "Falhas por Dia da Semana e Mês":
-                    df_heatmap = df_falhas_filtrado.groupby(['Dia da Semana', 'Mês']).agg(
-                        Total_Duracao=('DURAÇÃO', 'sum'),
-                        Contagem_Falhas=('DURAÇÃO', 'count')
-                    ).reset_index()
-
-                    df_heatmap['Dia da Semana'] = pd.Categorical(df_heatmap['Dia da Semana'], categories=ordem_dias, ordered=True)
-                    df_heatmap['Mês'] = pd.Categorical(df_heatmap['Mês'], categories=ordem_meses, ordered=True)
-                    df_heatmap = df_heatmap.sort_values(['Dia da Semana', 'Mês'])
-
                     metric_to_show = st.radio("Mostrar no Heatmap:", ["Tempo de Parada (h)", "Contagem de Falhas"], horizontal=True, key="heatmap_metric_month_day")
                     z_col = 'Total_Duracao' if metric_to_show == "Tempo de Parada (h)" else 'Contagem_Falhas'
                     title_text = f'Heatmap de {metric_to_show} por Dia da Semana e Mês'
@@ -726,20 +536,12 @@ def exibir_kpis():
                     st.plotly_chart(fig_heatmap, use_container_width=True)
 
                 elif heatmap_option == "Falhas por Hora do Dia e Dia da Semana":
-                    df_heatmap_hora = df_falhas_filtrado.groupby(['Hora', 'Dia da Semana']).agg(
-                        Total_Duracao=('DURAÇÃO', 'sum'),
-                        Contagem_Falhas=('DURAÇÃO', 'count')
-                    ).reset_index()
-
-                    df_heatmap_hora['Dia da Semana'] = pd.Categorical(df_heatmap_hora['Dia da Semana'], categories=ordem_dias, ordered=True)
-                    df_heatmap_hora = df_heatmap_hora.sort_values(['Hora', 'Dia da Semana'])
-
                     metric_to_show_hour = st.radio("Mostrar no Heatmap:", ["Tempo de Parada (h)", "Contagem de Falhas"], horizontal=True, key="heatmap_metric_hour_day")
                     z_col_hour = 'Total_Duracao' if metric_to_show_hour == "Tempo de Parada (h)" else 'Contagem_Falhas'
                     title_text_hour = f'Heatmap de {metric_to_show_hour} por Hora do Dia e Dia da Semana'
 
                     fig_heatmap_hora = px.density_heatmap(
-                        df_heatmap_hora,
+                        df_heatmap,
                         x='Hora',
                         y='Dia da Semana',
                         z=z_col_hour,
@@ -755,91 +557,36 @@ def exibir_kpis():
             st.info("Identifica equipamentos que consistentemente apresentam o pior desempenho em múltiplos KPIs.")
 
             if not df_falhas_filtrado.empty:
-                # Re-calcular KPIs por equipamento (garantindo que estão atualizados com o filtro)
-                kpis_equipamento = df_falhas_filtrado.groupby('EQUIPAMENTO').agg(
-                    Tempo_Total_Parada=('DURAÇÃO', 'sum'),
-                    Ocorrencias=('DURAÇÃO', 'count'),
-                    MTTR=('DURAÇÃO', 'mean')
-                ).reset_index()
-
-                # Merge com o MTBF calculado anteriormente (por item, agregado por equipamento)
-                # kpis_comp_equip é o dataframe que contém o MTBF_h por equipamento
-                if 'MTBF_h' in kpis_comp_equip.columns: 
-                    kpis_equipamento = pd.merge(kpis_equipamento, kpis_comp_equip[['EQUIPAMENTO', 'MTBF_h']], on='EQUIPAMENTO', how='left')
-                else:
-                    kpis_equipamento['MTBF_h'] = np.nan # Garante que a coluna existe
-
-                if kpis_equipamento.empty:
-                    st.info("Nenhum equipamento para análise de Bad Actors com os filtros atuais.")
-                    return
-
-                # Normalização Min-Max para criar um "Índice de Criticidade"
-                # Quanto MAIOR o valor do índice, PIOR o equipamento.
-                
-                # Inicia o dataframe de scores
-                df_scores = kpis_equipamento[['EQUIPAMENTO']].copy()
-
-                # Tempo Total de Parada (maior é pior)
-                if kpis_equipamento['Tempo_Total_Parada'].max() > 0:
-                    df_scores['Score_Tempo_Parada'] = (kpis_equipamento['Tempo_Total_Parada'] - kpis_equipamento['Tempo_Total_Parada'].min()) / \
-                                                     (kpis_equipamento['Tempo_Total_Parada'].max() - kpis_equipamento['Tempo_Total_Parada'].min())
-                else:
-                    df_scores['Score_Tempo_Parada'] = 0 # Se todos têm tempo de parada zero
-
-                # Ocorrências (maior é pior)
-                if kpis_equipamento['Ocorrencias'].max() > 0:
-                    df_scores['Score_Ocorrencias'] = (kpis_equipamento['Ocorrencias'] - kpis_equipamento['Ocorrencias'].min()) / \
-                                                    (kpis_equipamento['Ocorrencias'].max() - kpis_equipamento['Ocorrencias'].min())
-                else:
-                    df_scores['Score_Ocorrencias'] = 0 # Se todos têm zero ocorrências
+                try:
+                    df_bad_actors = calcular_secao(
+                        tempos_secoes, "Bad actors", chave_secao,
+                        lambda: secoes_kpis.piores_ativos(cubo, motor_mtbf)
+                    )
 
-                # MTTR (maior é pior)
-                if kpis_equipamento['MTTR'].max() > 0:
-                    df_scores['Score_MTTR'] = (kpis_equipamento['MTTR'] - kpis_equipamento['MTTR'].min()) / \
-                                             (kpis_equipamento['MTTR'].max() - kpis_equipamento['MTTR'].min())
-                else:
-                    df_scores['Score_MTTR'] = 0 # Se todos têm MTTR zero ou NaN
-
-                # MTBF (menor é pior, então inverta a lógica: (max_val - val) / (max_val - min_val))
-                if 'MTBF_h' in kpis_equipamento.columns and kpis_equipamento['MTBF_h'].count() > 1: # Precisa de pelo menos 2 valores não NaN
-                    # Trata NaNs no MTBF para que não afetem min/max
-                    mtbf_valid = kpis_equipamento['MTBF_h'].dropna()
-                    if not mtbf_valid.empty and mtbf_valid.max() > mtbf_valid.min():
-                        df_scores['Score_MTBF'] = (mtbf_valid.max() - kpis_equipamento['MTBF_h']) / \
-                                                  (mtbf_valid.max() - mtbf_valid.min())
+                    if df_bad_actors.empty:
+                        st.info("Nenhum equipamento para análise de Bad Actors com os filtros atuais.")
                     else:
-                        df_scores['Score_MTBF'] = 0
-                else:
-                    df_scores['Score_MTBF'] = 0 # Se MTBF não é aplicável ou não varia
-
-                df_scores = df_scores.fillna(0) # Trata quaisquer NaNs resultantes da normalização (ex: se min=max)
-
-                # Combina os scores (peso igual por padrão, pode ser ajustado com st.slider futuramente)
-                df_scores['Indice_Criticidade'] = df_scores[['Score_Tempo_Parada', 'Score_Ocorrencias', 'Score_MTTR', 'Score_MTBF']].sum(axis=1)
-
-                # Adiciona as colunas originais de KPI para visualização
-                df_bad_actors = pd.merge(df_scores, kpis_equipamento, on='EQUIPAMENTO', how='left')
-                df_bad_actors = df_bad_actors.sort_values('Indice_Criticidade', ascending=False)
-                
-                st.subheader("Ranking de Piores Ativos (Bad Actors)")
-                st.dataframe(df_bad_actors[[
-                    'EQUIPAMENTO', 'Indice_Criticidade', 'Tempo_Total_Parada', 'Ocorrencias', 'MTTR', 'MTBF_h'
-                ]].style.format({
-                    'Indice_Criticidade': '{:.2f}',
-                    'Tempo_Total_Parada': '{:.1f}',
-                    'MTTR': '{:.1f}',
-                    'MTBF_h': '{:.1f}'
-                }).background_gradient(cmap='Reds', subset=['Indice_Criticidade']),
-                use_container_width=True)
-
-                fig_bad_actors = px.bar(
-                    df_bad_actors.head(10), # Mostra os top 10
-                    x='EQUIPAMENTO',
-                    y='Indice_Criticidade',
-                    title='Top 10 Piores Ativos por Índice de Criticidade',
-                    hover_data=['Tempo_Total_Parada', 'Ocorrencias', 'MTTR', 'MTBF_h']
-                )
-                st.plotly_chart(fig_bad_actors, use_container_width=True)
+                        st.subheader("Ranking de Piores Ativos (Bad Actors)")
+                        st.dataframe(df_bad_actors[[
+                            'EQUIPAMENTO', 'Indice_Criticidade', 'Tempo_Total_Parada', 'Ocorrencias', 'MTTR', 'MTBF_h'
+                        ]].style.format({
+                            'Indice_Criticidade': '{:.2f}',
+                            'Tempo_Total_Parada': '{:.1f}',
+                            'MTTR': '{:.1f}',
+                            'MTBF_h': '{:.1f}'
+                        }).background_gradient(cmap='Reds', subset=['Indice_Criticidade']),
+                        use_container_width=True)
+
+                        fig_bad_actors = px.bar(
+                            df_bad_actors.head(10), # Mostra os top 10
+                            x='EQUIPAMENTO',
+                            y='Indice_Criticidade',
+                            title='Top 10 Piores Ativos por Índice de Criticidade',
+                            hover_data=['Tempo_Total_Parada', 'Ocorrencias', 'MTTR', 'MTBF_h']
+                        )
+                        st.plotly_chart(fig_bad_actors, use_container_width=True)
+                except Exception as e:
+                    st.error(f"Erro na análise de Bad Actors: {str(e)}")
 
             else:
                 st.info("Nenhum dado para análise de 'Bad Actors'.")
@@ -850,8 +597,9 @@ def exibir_kpis():
             
             try:
                 # Agrupamento para evolucao temporal por data (diário ou semanal)
-                df_falhas_filtrado['DATA_DIA'] = df_falhas_filtrado['DATA INICIAL'].dt.to_period('D').dt.to_timestamp()
-                df_temporal = df_falhas_filtrado.groupby(['DATA_DIA', 'EQUIPAMENTO'])['DURAÇÃO'].sum().reset_index()
+                df_temporal = calcular_secao(
+                    tempos_secoes, 'Evolução temporal', chave_secao, lambda: secoes_kpis.evolucao_temporal(df_falhas_filtrado)
+                )
                 
                 fig_temporal = px.line(
                     df_temporal,
@@ -871,15 +619,12 @@ def exibir_kpis():
             
             if len(df_falhas_filtrado) > 10:
                 try:
-                    model = IsolationForest(contamination=0.1, random_state=42)
-                    features = df_falhas_filtrado[['DURAÇÃO']].values
-                    df_falhas_filtrado['Anomalia'] = model.fit_predict(features)
-                    
-                    # Converte -1 para 'Anomalia' e 1 para 'Normal'
-                    df_falhas_filtrado['Anomalia_Label'] = df_falhas_filtrado['Anomalia'].map({-1: 'Anomalia', 1: 'Normal'})
+                    df_anomalias = calcular_secao(
+                        tempos_secoes, 'Anomalias', chave_secao, lambda: secoes_kpis.detectar_anomalias(df_falhas_filtrado)
+                    )
 
                     fig_anomalias = px.scatter(
-                        df_falhas_filtrado,
+                        df_anomalias,
                         x='DATA INICIAL',
                         y='DURAÇÃO',
                         color='Anomalia_Label', # Usa a nova coluna para cor
@@ -897,7 +642,9 @@ def exibir_kpis():
             st.header("🛠️ Análise de Causas e Recomendações")
             
             try:
-                causas = df_falhas_filtrado['CAUSA'].value_counts().nlargest(5)
+                causas, equipamentos_por_causa = calcular_secao(
+                    tempos_secoes, 'Causas', chave_secao, lambda: secoes_kpis.principais_causas(cubo)
+                )
                 
                 if not causas.empty:
                     tab1, tab2 = st.tabs(["Frequência", "Ações Recomendadas"])
@@ -914,17 +661,12 @@ def exibir_kpis():
                     
                     with tab2:
                         st.subheader("Top 5 Causas e Recomendações Personalizadas")
-                        for causa, count in causas.items():
+                        recomendacoes = base_conhecimento.recomendar(causas.index)
+                        for (causa, count), recomendacao in zip(causas.items(), recomendacoes):
                             with st.expander(f"**{causa}** ({count} ocorrências)"):
-                                recomendacao = gerar_recomendacao(causa, df_conhecimento)
                                 st.write(f"**Ação recomendada:** {recomendacao}")
                                 st.write("**Equipamentos mais afetados por esta causa:**")
-                                st.table(
-                                    df_falhas_filtrado[df_falhas_filtrado['CAUSA'] == causa]['EQUIPAMENTO']
-                                    .value_counts()
-                                    .head(3)
-                                    .reset_index()
-                                )
+                                st.table(equipamentos_por_causa[causa])
                 else:
                     st.warning("Nenhuma causa registrada nos dados filtrados.")
             except Exception as e:
@@ -967,25 +709,11 @@ def exibir_kpis():
             # --- Quadro estilo MCS ---
             st.subheader("📋 Quadro MCS (Motivo, Causa, Solução) e Performance")
             
-            df_display_performance = pd.DataFrame()
-            if not df_indicadores_agregados.empty and 'DISPONIBILIDADE_FISICA' in df_indicadores_agregados.columns:
-                df_display_performance = df_indicadores_agregados[['EQUIPAMENTO', 'FROTA', 'DISPONIBILIDADE_FISICA']].copy()
-                df_display_performance.rename(columns={'DISPONIBILIDADE_FISICA': 'DF_Alcancada_Indicadores (%)'}, inplace=True)
-            
-            # Cálculo de DF baseada em paradas (aproximação se não tiver dados de horas totais)
-            if 'DATA INICIAL' in df_falhas_filtrado.columns and 'DATA FINAL' in df_falhas_filtrado.columns:
-                total_days_in_period = (end_date - start_date).days + 1
-                if total_days_in_period > 0:
-                    total_period_hours = total_days_in_period * 24
-                    downtime_per_equip = df_falhas_filtrado.groupby('EQUIPAMENTO')['DURAÇÃO'].sum().reset_index()
-                    downtime_per_equip['DF_Alcancada_Calculada (%)'] = (1 - (downtime_per_equip['DURAÇÃO'] / total_period_hours)) * 100
-                    downtime_per_equip['DF_Alcancada_Calculada (%)'] = downtime_per_equip['DF_Alcancada_Calculada (%)'].apply(lambda x: max(0, x)) # Garante que DF não é negativa
-                    
-                    # Merge com df_display_performance se ela existe, ou cria se não
-                    if not df_display_performance.empty:
-                        df_display_performance = pd.merge(df_display_performance, downtime_per_equip[['EQUIPAMENTO', 'DF_Alcancada_Calculada (%)']], on='EQUIPAMENTO', how='left')
-                    else:
-                        df_display_performance = downtime_per_equip[['EQUIPAMENTO', 'DURAÇÃO', 'DF_Alcancada_Calculada (%)']].rename(columns={'DURAÇÃO': 'Tempo Total Parada (h)'})
+            # A meta é aplicada na exibição: mudar a meta não recalcula a DF
+            df_display_performance = calcular_secao(
+                tempos_secoes, 'Disponibilidade', (*chave_secao, *chave_secao_indicadores[1:]),
+                lambda: secoes_kpis.disponibilidade_por_equipamento(df_falhas_filtrado, df_indicadores_agregados, periodo)
+            ).copy()
 
             if not df_display_performance.empty:
                 df_meta_input = st.number_input("Insira a DF Meta (%) para os equipamentos:", min_value=0.0, max_value=100.0, value=90.0, step=0.1, key="df_meta_input")
@@ -1011,32 +739,53 @@ def exibir_kpis():
             else:
                 st.warning("Dados insuficientes para exibir a Disponibilidade Física dos equipamentos.")
 
+            # --- Evolução da DF calculada: matriz equipamento × dia montada uma vez por filtro ---
+            if periodo is not None:
+                st.subheader("Evolução da DF Calculada por Equipamento")
+                matriz_disponibilidade = _cache_cubos.obter(
+                    ('Disponibilidade', chave_dados, chave_filtros(selecoes, periodo)),
+                    lambda: MatrizDisponibilidade(df_falhas_filtrado, *janela_dias(periodo))
+                )
+                frequencia_df = st.radio("Agrupar por", list(FREQUENCIAS_DISPONIBILIDADE), horizontal=True, key="frequencia_df")
+                equipamentos_matriz = list(matriz_disponibilidade.equipamentos.astype(str))
+                # Padrão: os 5 equipamentos com mais horas paradas no período
+                mais_parados = np.argsort(-matriz_disponibilidade.parada.sum(axis=1), kind='stable')[:5]
+                equipamentos_serie_df = st.multiselect(
+                    "Equipamentos", equipamentos_matriz, default=[equipamentos_matriz[i] for i in mais_parados], key="equip_serie_df"
+                )
+
+                frequencia = FREQUENCIAS_DISPONIBILIDADE[frequencia_df]
+                fig_serie_df = px.line(
+                    matriz_disponibilidade.serie(frequencia, equipamentos_serie_df),
+                    x='Período', y='DF (%)', color='EQUIPAMENTO', markers=frequencia != 'D',
+                    title=f"DF Calculada por {frequencia_df}"
+                )
+                serie_frota_df = matriz_disponibilidade.serie_frota(frequencia)
+                fig_serie_df.add_scatter(
+                    x=serie_frota_df['Período'], y=serie_frota_df['DF (%)'], mode='lines',
+                    name='Todos os equipamentos', line=dict(dash='dash', color='black')
+                )
+                st.plotly_chart(fig_serie_df, use_container_width=True)
+                st.caption("DF calculada = 1 - horas paradas (falhas sobrepostas unidas) / horas do período. 'Todos os equipamentos' considera os equipamentos com falhas nos filtros atuais.")
+
             st.markdown("---")
             st.subheader("Análise MCS das Principais Causas (Detalhamento)")
             # Pega as 10 principais falhas para detalhamento MCS
-            top_failures_for_mcs = df_falhas_filtrado.groupby(['EQUIPAMENTO', 'CAUSA']).agg(
-                Tempo_Parada=('DURAÇÃO', 'sum'),
-                Ocorrencias=('DURAÇÃO', 'count')
-            ).reset_index().sort_values('Tempo_Parada', ascending=False).head(10)
+            top_failures_for_mcs = calcular_secao(
+                tempos_secoes, 'MCS', chave_secao, lambda: secoes_kpis.principais_falhas_mcs(cubo)
+            )
 
-            mcs_data = []
             if not top_failures_for_mcs.empty:
-                for index, row in top_failures_for_mcs.iterrows():
-                    equip = row['EQUIPAMENTO']
-                    causa = row['CAUSA']
-                    tempo_parada = row['Tempo_Parada']
-                    ocorrencias = row['Ocorrencias']
-                    recomendacao = gerar_recomendacao(causa, df_conhecimento)
-
-                    mcs_data.append({
-                        "Equipamento": equip,
-                        "Motivo (Causa Principal)": causa, 
-                        "Causa Detalhada": causa, 
-                        "Solução/Ação Recomendada": recomendacao,
-                        "Tempo de Parada (h)": f"{tempo_parada:.1f}",
-                        "Ocorrências": ocorrencias
-                    })
-                st.dataframe(pd.DataFrame(mcs_data), use_container_width=True)
+                # Todas as causas do quadro resolvidas em um único lote
+                mcs_data = pd.DataFrame({
+                    "Equipamento": top_failures_for_mcs['EQUIPAMENTO'].to_numpy(),
+                    "Motivo (Causa Principal)": top_failures_for_mcs['CAUSA'].to_numpy(),
+                    "Causa Detalhada": top_failures_for_mcs['CAUSA'].to_numpy(),
+                    "Solução/Ação Recomendada": base_conhecimento.recomendar(top_failures_for_mcs['CAUSA']),
+                    "Tempo de Parada (h)": top_failures_for_mcs['Tempo_Parada'].map('{:.1f}'.format).to_numpy(),
+                    "Ocorrências": top_failures_for_mcs['Ocorrencias'].to_numpy()
+                })
+                st.dataframe(mcs_data, use_container_width=True)
             else:
                 st.warning("Não há principais causas de falha para exibir no quadro MCS com os filtros atuais.")
 
@@ -1075,13 +824,9 @@ def exibir_kpis():
             # Top 10 Equipamentos Críticos
             st.subheader("🏆 Top 10 Equipamentos Mais Críticos")
             try:
-                top_equipments = df_falhas_filtrado.groupby(['EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO']).agg({
-                    'DURAÇÃO': ['sum', 'count'],
-                    'ITEM': lambda x: x.value_counts().index[0] if len(x.value_counts()) > 0 else 'N/A'
-                }).reset_index()
-                
-                top_equipments.columns = ['EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO', 'Tempo Total (h)', 'Ocorrências', 'Item Mais Frequente']
-                top_equipments = top_equipments.sort_values('Tempo Total (h)', ascending=False).head(10)
+                top_equipments = calcular_secao(
+                    tempos_secoes, 'Top 10 equipamentos', chave_secao, lambda: secoes_kpis.top_equipamentos_criticos(cubo)
+                )
                 
                 if not top_equipments.empty:
                     st.dataframe(
@@ -1096,11 +841,8 @@ def exibir_kpis():
             # Linha do Tempo das Falhas Mais Impactantes
             st.subheader("🕒 Linha do Tempo das Falhas Mais Impactantes")
             try:
-                timeline_data = df_falhas_filtrado.sort_values('DURAÇÃO', ascending=False).head(20).copy()
-                timeline_data['Impacto'] = pd.cut(
-                    timeline_data['DURAÇÃO'],
-                    bins=[0, 8, 24, float('inf')],
-                    labels=['Baixo', 'Médio', 'Alto']
+                timeline_data = calcular_secao(
+                    tempos_secoes, 'Linha do tempo', chave_secao, lambda: secoes_kpis.falhas_mais_impactantes(df_falhas_filtrado)
                 )
                 
                 fig_timeline = px.scatter(
@@ -1120,15 +862,9 @@ def exibir_kpis():
             # KPIs por todos os níveis hierárquicos para o relatório
             kpis_hierarquia = {}
             try:
-                for nivel, col in [('Sistema', 'SISTEMA'), ('Conjunto', 'CONJUNTO'), ('Item', 'ITEM')]:
-                    df_kpi = df_falhas_filtrado.groupby(col).agg({
-                        'DURAÇÃO': ['sum', 'mean', 'count'],
-                        'EQUIPAMENTO': 'nunique' # Usa EQUIPAMENTO da planilha de Falhas
-                    }).sort_values(('DURAÇÃO', 'sum'), ascending=False).head(10)
-                    
-                    if not df_kpi.empty:
-                        df_kpi.columns = ['Tempo Total (h)', 'MTTR (h)', 'Ocorrências', 'Equip. Afetados']
-                        kpis_hierarquia[nivel] = df_kpi
+                kpis_hierarquia = calcular_secao(
+                    tempos_secoes, 'Hierarquia (relatório)', chave_secao, lambda: secoes_kpis.kpis_hierarquia_relatorio(cubo)
+                )
             except Exception as e:
                 st.warning(f"Erro ao preparar dados para relatório: {str(e)}")
             
@@ -1137,15 +873,81 @@ def exibir_kpis():
             if st.button("📄 Gerar Relatório PDF Completo"):
                 with st.spinner("Gerando relatório..."):
                     try:
-                        if not top_equipments.empty and not timeline_data.empty and kpis_hierarquia:
-                            pdf_report = generate_pdf_report(df_falhas_filtrado, top_equipments, timeline_data, kpis_hierarquia, df_conhecimento)
-                            st.markdown(create_download_link(pdf_report, "relatorio_manutencao.pdf"), unsafe_allow_html=True)
+                        if relatorio_suficiente(top_equipments, timeline_data, kpis_hierarquia):
+                            st.session_state['relatorio_pdf'] = gerar_relatorio_pdf_temporario(
+                                df_falhas_filtrado, top_equipments, timeline_data, kpis_hierarquia, base_conhecimento,
+                                anterior=st.session_state.get('relatorio_pdf')
+                            )
                             st.success("Relatório gerado com sucesso!")
                         else:
                             st.warning("Dados insuficientes para gerar o relatório completo")
                     except Exception as e:
                         st.error(f"Erro ao gerar relatório PDF: {str(e)}")
 
+            # O relatório fica em disco entre as execuções (pasta temporária com validade, ver relatorios.py);
+            # ao montar o botão, o Streamlit lê o arquivo inteiro para a memória do servidor
+            caminho_pdf = st.session_state.get('relatorio_pdf')
+            if caminho_pdf and os.path.exists(caminho_pdf):
+                with open(caminho_pdf, 'rb') as arquivo_pdf:
+                    st.download_button(
+                        "⬇️ Download Relatório PDF",
+                        data=arquivo_pdf,
+                        file_name="relatorio_manutencao.pdf",
+                        mime="application/pdf"
+                    )
+                st.caption(
+                    "O PDF é montado inteiro em memória (fpdf 1.7) e servido a partir da memória do servidor; "
+                    "os arquivos temporários são apagados depois de algumas horas ou ao encerrar o app."
+                )
+
+            # Relatórios em lote: um PDF por frota ou equipamento dos dados filtrados, gerados em paralelo
+            with st.expander("📦 Relatórios em lote"):
+                colunas_lote = [col for col in COLUNAS_LOTE if col in df_falhas_filtrado.columns]
+                coluna_lote = st.radio("Um relatório por", colunas_lote, horizontal=True, key='coluna_lote')
+                opcoes_lote = sorted(df_falhas_filtrado[coluna_lote].dropna().astype(str).unique()) if coluna_lote else []
+                valores_lote = st.multiselect("Incluir", opcoes_lote, default=opcoes_lote, key=f'valores_lote_{coluna_lote}')
+
+                if st.button("Gerar relatórios em lote", disabled=not valores_lote):
+                    progresso = st.progress(0.0, text=f"Gerando {len(valores_lote)} relatórios...")
+
+                    def ao_progredir(concluidos, total, resultado):
+                        progresso.progress(concluidos / total, text=f"{concluidos}/{total} · {resultado['Relatório']}: {resultado['Status']}")
+
+                    try:
+                        inicio_lote = time.perf_counter()
+                        st.session_state['relatorios_lote'] = gerar_lote_zip_temporario(
+                            df_falhas_filtrado, especificacoes_por_coluna(df_falhas_filtrado, coluna_lote, valores_lote),
+                            base_conhecimento, anterior=st.session_state.get('relatorios_lote', (None,))[0],
+                            ao_progredir=ao_progredir
+                        )
+                        st.success(f"Lote concluído em {time.perf_counter() - inicio_lote:.1f} s")
+                    except Exception as e:
+                        st.error(f"Erro ao gerar relatórios em lote: {str(e)}")
+
+                caminho_zip, resultados_lote = st.session_state.get('relatorios_lote', (None, None))
+                if caminho_zip and os.path.exists(caminho_zip):
+                    st.dataframe(
+                        pd.DataFrame(resultados_lote).style.format({'Tempo (s)': '{:.2f}'}, na_rep='-'),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    with open(caminho_zip, 'rb') as arquivo_zip:
+                        st.download_button(
+                            "⬇️ Download Relatórios (zip)",
+                            data=arquivo_zip,
+                            file_name="relatorios_manutencao.zip",
+                            mime="application/zip"
+                        )
+
+            # --- Painel de depuração: tempo de cada seção nesta execução ---
+            with st.sidebar.expander("⏱️ Tempos por seção"):
+                st.caption(f"Cache de seções: {_cache_secoes.resumo()}")
+                st.dataframe(
+                    pd.DataFrame(tempos_secoes).style.format({'Tempo (ms)': '{:.1f}'}),
+                    use_container_width=True,
+                    hide_index=True
+                )
+
         except Exception as e:
             st.error(f"Erro ao processar os dados: {str(e)}")
             st.exception(e)
@@ -0,0 +1,167 @@
+# modules/motor_kpis.py
+
+import numpy as np
+import pandas as pd
+
+# Dimensões do cubo de KPIs, da mais ampla para a mais detalhada
+DIMENSOES_CUBO = ['FROTA', 'EQUIPAMENTO', 'SISTEMA', 'CONJUNTO', 'ITEM', 'CAUSA']
+
+# Hierarquia da análise de falhas, do nível mais alto ao mais baixo
+NIVEIS_HIERARQUIA = ['SISTEMA', 'CONJUNTO', 'ITEM']
+
+# Agrupamentos materializados pelo rollup: os caminhos da hierarquia e a visão de cada nível isolado
+AGRUPAMENTOS_ROLLUP = [('SISTEMA',), ('SISTEMA', 'CONJUNTO'), ('SISTEMA', 'CONJUNTO', 'ITEM'), ('CONJUNTO',), ('ITEM',)]
+
+class CuboKPI:
+    """Agregado único das falhas filtradas por todas as dimensões da hierarquia.
+
+    O DataFrame de falhas é percorrido uma só vez; as tabelas por equipamento, frota,
+    sistema, conjunto, item ou causa saem do reagrupamento desse cubo (bem menor que
+    as falhas), pois soma, contagem e máximo podem ser combinados sem perda.
+    """
+
+    def __init__(self, df_falhas):
+        self.dimensoes = [col for col in DIMENSOES_CUBO if col in df_falhas.columns]
+        # dropna=False: uma falha sem CAUSA ainda conta para o equipamento, o item etc.
+        self.tabela = df_falhas.groupby(self.dimensoes, observed=True, dropna=False, sort=False).agg(
+            Tempo_Total_Parada=('DURAÇÃO', 'sum'),
+            Ocorrencias=('DURAÇÃO', 'count'),
+            Ultima_Falha=('DATA FINAL', 'max')
+        ).reset_index()
+        self.hierarquia = RollupHierarquia.de_tabela(self.tabela)
+
+    @property
+    def nbytes(self):
+        return int(self.tabela.memory_usage(deep=True).sum()) + self.hierarquia.nbytes
+
+    def agregar(self, niveis):
+        """KPIs por nível (ou lista de níveis), indexados pelos níveis e em ordem crescente deles.
+
+        Colunas: Tempo_Total_Parada, Ocorrencias, Ultima_Falha e MTTR (tempo total / ocorrências).
+        """
+        niveis = [niveis] if isinstance(niveis, str) else list(niveis)
+        agregado = self.tabela.groupby(niveis, observed=True).agg(
+            Tempo_Total_Parada=('Tempo_Total_Parada', 'sum'),
+            Ocorrencias=('Ocorrencias', 'sum'),
+            Ultima_Falha=('Ultima_Falha', 'max')
+        )
+        agregado['MTTR'] = agregado['Tempo_Total_Parada'] / agregado['Ocorrencias']
+        return agregado
+
+    def mais_frequente(self, niveis, coluna):
+        """Valor de `coluna` com mais ocorrências em cada grupo de `niveis` (empate: o menor, como Series.mode)."""
+        niveis = list(niveis)
+        contagens = self.tabela.groupby([*niveis, coluna], observed=True)['Ocorrencias'].sum().reset_index()
+        contagens = contagens.sort_values(
+            [*niveis, 'Ocorrencias', coluna], ascending=[True] * len(niveis) + [False, True], kind='stable'
+        )
+        return contagens.drop_duplicates(niveis).set_index(niveis)[coluna]
+
+def _agrupar_mapas(chaves, somas, mapas, colunas):
+    """Agrupa linhas por `colunas`: soma as colunas de `somas` e faz OR dos mapas de bits."""
+    grupos = chaves.groupby(colunas, observed=True, dropna=False, sort=True).ngroup().to_numpy()
+    ordem = np.argsort(grupos, kind='stable')
+    inicios = np.flatnonzero(np.r_[True, grupos[ordem][1:] != grupos[ordem][:-1]]) if len(ordem) else ordem
+    tabela = chaves[colunas].iloc[ordem[inicios]].reset_index(drop=True)
+    for col in somas.columns:
+        tabela[col] = np.add.reduceat(somas[col].to_numpy()[ordem], inicios) if len(ordem) else somas[col].iloc[:0]
+    mapas = np.bitwise_or.reduceat(mapas[ordem], inicios, axis=0) if len(ordem) else mapas[:0]
+    return tabela, mapas
+
+class RollupHierarquia:
+    """Rollup materializado SISTEMA → CONJUNTO → ITEM.
+
+    Cada nó guarda tempo total de parada, ocorrências e um mapa de bits dos equipamentos
+    afetados (bit i = equipamentos[i]). Somas e mapas de bits são combináveis (soma e OR),
+    então os níveis superiores saem dos inferiores, dois rollups podem ser unidos sem
+    voltar às falhas e a contagem de equipamentos distintos continua exata.
+    """
+
+    def __init__(self, folhas, mapas, equipamentos):
+        self.equipamentos = pd.Index(equipamentos)
+        self._niveis = {}
+        for colunas in AGRUPAMENTOS_ROLLUP:
+            tabela, mapas_nivel = _agrupar_mapas(
+                folhas, folhas[['Tempo_Total_Parada', 'Ocorrencias']], mapas, list(colunas)
+            )
+            tabela['MTTR'] = tabela['Tempo_Total_Parada'] / tabela['Ocorrencias']
+            tabela['Equip_Afetados'] = np.unpackbits(mapas_nivel, axis=1).sum(axis=1) if len(tabela) else 0
+            self._niveis[colunas] = (tabela, mapas_nivel)
+
+    @classmethod
+    def de_tabela(cls, tabela):
+        """Monta o rollup a partir de falhas (ou de um CuboKPI.tabela) com DURAÇÃO/Tempo_Total_Parada e EQUIPAMENTO."""
+        if 'Tempo_Total_Parada' not in tabela.columns:
+            tabela = tabela.assign(Tempo_Total_Parada=tabela['DURAÇÃO'], Ocorrencias=tabela['DURAÇÃO'].notna().astype('int64'))
+        equipamentos = tabela['EQUIPAMENTO'].astype('category')
+        codigos = equipamentos.cat.codes.to_numpy().astype(np.int64)
+
+        # Um mapa de bits por linha, com só o bit do equipamento da linha ligado
+        n_bytes = (len(equipamentos.cat.categories) + 7) // 8
+        mapas = np.zeros((len(tabela), n_bytes), dtype=np.uint8)
+        validos = codigos >= 0
+        mapas[np.flatnonzero(validos), codigos[validos] >> 3] = 0x80 >> (codigos[validos] & 7)
+
+        folhas = tabela[NIVEIS_HIERARQUIA].reset_index(drop=True)
+        folhas['Tempo_Total_Parada'] = tabela['Tempo_Total_Parada'].to_numpy()
+        folhas['Ocorrencias'] = tabela['Ocorrencias'].to_numpy()
+        folhas, mapas = _agrupar_mapas(folhas, folhas[['Tempo_Total_Parada', 'Ocorrencias']], mapas, NIVEIS_HIERARQUIA)
+        return cls(folhas, mapas, equipamentos.cat.categories)
+
+    @property
+    def nbytes(self):
+        return sum(int(tabela.memory_usage(deep=True).sum()) + mapas.nbytes for tabela, mapas in self._niveis.values())
+
+    def folhas(self):
+        """Nós do nível ITEM com os mapas de bits serializados (um bytes por linha), para gravação."""
+        tabela, mapas = self._niveis[tuple(NIVEIS_HIERARQUIA)]
+        tabela = tabela[[*NIVEIS_HIERARQUIA, 'Tempo_Total_Parada', 'Ocorrencias']].copy()
+        tabela['Equipamentos'] = [linha.tobytes() for linha in mapas]
+        return tabela
+
+    @classmethod
+    def de_folhas(cls, folhas, equipamentos):
+        """Inverso de folhas(): reconstrói o rollup a partir dos nós ITEM gravados."""
+        n_bytes = (len(equipamentos) + 7) // 8
+        mapas = np.frombuffer(b''.join(folhas['Equipamentos']), dtype=np.uint8).reshape(len(folhas), n_bytes)
+        return cls(folhas.drop(columns='Equipamentos'), mapas, equipamentos)
+
+    def _mapas_em(self, equipamentos):
+        # Reposiciona os bits deste rollup segundo outra lista (que contém todos os equipamentos deste)
+        tabela, mapas = self._niveis[tuple(NIVEIS_HIERARQUIA)]
+        bits = np.unpackbits(mapas, axis=1, count=len(self.equipamentos)).astype(bool)
+        novos = np.zeros((len(tabela), len(equipamentos)), dtype=bool)
+        novos[:, equipamentos.get_indexer(self.equipamentos)] = bits
+        return tabela, np.packbits(novos, axis=1)
+
+    def combinar(self, outro):
+        """Rollup da união dos dois conjuntos de falhas."""
+        equipamentos = self.equipamentos.union(outro.equipamentos)
+        partes = [rollup._mapas_em(equipamentos) for rollup in (self, outro)]
+        folhas = pd.concat([tabela for tabela, _ in partes], ignore_index=True)
+        for col in NIVEIS_HIERARQUIA:
+            folhas[col] = folhas[col].astype(str)
+        mapas = np.concatenate([mapas for _, mapas in partes])
+        folhas, mapas = _agrupar_mapas(folhas, folhas[['Tempo_Total_Parada', 'Ocorrencias']], mapas, NIVEIS_HIERARQUIA)
+        return RollupHierarquia(folhas, mapas, equipamentos)
+
+    def kpis(self, nivel):
+        """KPIs de um nível da hierarquia, indexados pelo nível, do maior tempo de parada ao menor."""
+        tabela, _ = self._niveis[(nivel,)]
+        return tabela.set_index(nivel).sort_values('Tempo_Total_Parada', ascending=False)
+
+    def detalhar(self, caminho):
+        """Filhos de um nó: caminho={'SISTEMA': s} lista os conjuntos de s; com 'CONJUNTO', os itens."""
+        colunas = NIVEIS_HIERARQUIA[:len(caminho) + 1]
+        tabela, _ = self._niveis[tuple(colunas)]
+        selecionados = np.ones(len(tabela), dtype=bool)
+        for col in colunas[:-1]:
+            selecionados &= (tabela[col] == caminho[col]).to_numpy()
+        return (tabela[selecionados].drop(columns=colunas[:-1]).set_index(colunas[-1])
+                .sort_values('Tempo_Total_Parada', ascending=False))
+
+    def valores(self, nivel, caminho=None):
+        """Valores de `nivel` presentes sob o caminho informado (ou em toda a hierarquia)."""
+        if caminho:
+            return list(self.detalhar(caminho).index)
+        return list(self._niveis[(nivel,)][0][nivel])
@@ -0,0 +1,241 @@
+# modules/motor_mtbf.py
+
+import numpy as np
+import pandas as pd
+
+# Colunas das tabelas de MTBF/MTTR, em qualquer nível
+COLUNAS_MTBF = ['Ocorrencias', 'Tempo_Parada (h)', 'Tempo_Operacao (h)', 'MTBF (h)', 'MTTR (h)']
+
+_NS_POR_HORA = 3600 * 10 ** 9
+
+def episodios_unidos(codigos, inicio, fim, janela):
+    """Paradas unidas por grupo: (grupo, início, fim) de episódios disjuntos, em ns, recortados à janela.
+
+    codigos: grupo de cada falha (negativos são ignorados); inicio/fim: datetime64[ns];
+    janela: (início, fim) do período. Com as falhas ordenadas por (grupo, início), uma falha abre
+    episódio novo quando começa depois do maior fim anterior do grupo (máximo acumulado
+    segmentado); senão, estende o episódio corrente. O(n log n) pela ordenação.
+    """
+    ini_janela, fim_janela = (np.datetime64(pd.Timestamp(data), 'ns').astype(np.int64) for data in janela)
+    a = np.clip(inicio.astype('datetime64[ns]').astype(np.int64), ini_janela, fim_janela)
+    b = np.clip(fim.astype('datetime64[ns]').astype(np.int64), ini_janela, fim_janela)
+    validos = (codigos >= 0) & (b > a) & ~np.isnat(inicio) & ~np.isnat(fim)
+    codigos, a, b = codigos[validos], a[validos], b[validos]
+
+    # Ordem por (grupo, início): ordenação estável pelo grupo sobre a ordem cronológica
+    # (as falhas já chegam ordenadas por DATA INICIAL, o que torna a primeira passagem quase linear);
+    # a chave grupo * n + posição é única e dispensa o argsort estável, bem mais lento em int64
+    ordem = np.argsort(a, kind='stable')
+    ordem = ordem[np.argsort(codigos[ordem] * len(ordem) + np.arange(len(ordem)))]
+    codigos, a, b = codigos[ordem], a[ordem], b[ordem]
+    maior_fim = pd.Series(b).groupby(codigos).cummax().to_numpy()
+
+    novo = np.ones(len(codigos), dtype=bool)
+    novo[1:] = (codigos[1:] != codigos[:-1]) | (a[1:] > maior_fim[:-1])
+    aberturas = np.flatnonzero(novo)
+    # O episódio termina no maior fim acumulado da sua última falha
+    ultimas = np.r_[aberturas[1:], len(codigos)][:len(aberturas)] - 1
+    return codigos[aberturas], a[aberturas], maior_fim[ultimas]
+
+def parada_unida_por_grupo(codigos, inicio, fim, n_grupos, janela):
+    """Horas de parada por grupo: união dos intervalos [inicio, fim] recortados à janela (ver episodios_unidos)."""
+    grupos, a, b = episodios_unidos(codigos, inicio, fim, janela)
+    return np.bincount(grupos, weights=b - a, minlength=n_grupos) / _NS_POR_HORA
+
+def codigos_grupo(df, colunas):
+    """Código de grupo de cada linha (-1 com algum valor nulo) e as chaves dos grupos, em ordem.
+
+    Combina os códigos das categorias (ou de pd.factorize) numa chave inteira e a compacta
+    para os grupos presentes: O(n + produto das cardinalidades), sem a ordenação do groupby.
+    """
+    codigos = np.zeros(len(df), dtype=np.int64)
+    niveis = []
+    for col in colunas:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos_col, valores = serie.cat.codes.to_numpy(np.int64), serie.cat.categories
+        else:
+            codigos_col, valores = pd.factorize(serie, sort=True)
+        codigos = np.where((codigos < 0) | (codigos_col < 0), -1, codigos * len(valores) + codigos_col)
+        niveis.append((col, serie.dtype, valores))
+
+    combinacoes = int(np.prod([len(valores) for _, _, valores in niveis]))
+    validos = codigos >= 0
+    if combinacoes <= 4 * len(df) + 1024:
+        presentes = np.flatnonzero(np.bincount(codigos[validos], minlength=combinacoes))
+        compactado = np.full(combinacoes, -1, dtype=np.int64)
+        compactado[presentes] = np.arange(len(presentes))
+        codigos = np.where(validos, compactado[np.where(validos, codigos, 0)], -1)
+    else:
+        presentes, codigos[validos] = np.unique(codigos[validos], return_inverse=True)
+
+    chaves = {}
+    for col, dtype, valores in reversed(niveis):
+        presentes, codigos_col = np.divmod(presentes, len(valores))
+        if isinstance(dtype, pd.CategoricalDtype):
+            chaves[col] = pd.Categorical.from_codes(codigos_col, dtype=dtype)
+        else:
+            chaves[col] = valores.take(codigos_col)
+    return codigos, pd.DataFrame({col: chaves[col] for col in colunas})
+
+def parada_unida(df_falhas, colunas, inicio, fim):
+    """Horas de parada por grupo de `colunas`, com as falhas sobrepostas unidas e recortadas a [inicio, fim].
+
+    Retorna as chaves dos grupos e a coluna 'Tempo_Parada (h)', que nunca passa das horas do período.
+    """
+    codigos, chaves = codigos_grupo(df_falhas, colunas)
+    chaves['Tempo_Parada (h)'] = parada_unida_por_grupo(
+        codigos, df_falhas['DATA INICIAL'].to_numpy(dtype='datetime64[ns]'),
+        df_falhas['DATA FINAL'].to_numpy(dtype='datetime64[ns]'), len(chaves), (inicio, fim)
+    )
+    return chaves
+
+def _tabela_mtbf(chaves, ocorrencias, parada, horas_janela):
+    tabela = chaves.copy()
+    tabela['Ocorrencias'] = ocorrencias
+    tabela['Tempo_Parada (h)'] = parada
+    tabela['Tempo_Operacao (h)'] = np.maximum(horas_janela - parada, 0)
+    return _completar_mtbf(tabela)
+
+def _completar_mtbf(tabela):
+    # MTBF = horas de operação / falhas e MTTR = horas de parada (unidas) / falhas
+    falhas = tabela['Ocorrencias'].where(tabela['Ocorrencias'] > 0)
+    tabela['MTBF (h)'] = tabela['Tempo_Operacao (h)'] / falhas
+    tabela['MTTR (h)'] = tabela['Tempo_Parada (h)'] / falhas
+    return tabela
+
+class MotorMTBF:
+    """MTBF e MTTR pelo tempo de operação real, a partir dos intervalos de falha (DATA INICIAL → DATA FINAL).
+
+    Para cada (EQUIPAMENTO, ITEM), as paradas são recortadas ao período e unidas (sobreposições
+    contam uma vez) e o tempo de operação é o período menos essa união; o MTBF é operação / falhas.
+    Os níveis superiores são combinados sem perder essa exatidão: um ITEM soma operação e falhas
+    dos equipamentos em que aparece; um EQUIPAMENTO usa a união das paradas de todos os seus itens
+    (ele está parado se qualquer item estiver), em qualquer frota; uma FROTA soma seus equipamentos,
+    cada um com as falhas registradas naquela frota.
+
+    Só os pares (EQUIPAMENTO, ITEM) presentes nas falhas entram: itens que nunca falharam em um
+    equipamento não são conhecidos pelo histórico. A janela é [inicio, fim), a mesma do filtro de
+    datas (ver pipeline_kpis.janela_periodo).
+    """
+
+    def __init__(self, df_falhas, inicio=None, fim=None):
+        inicio_falhas = df_falhas['DATA INICIAL'].to_numpy(dtype='datetime64[ns]')
+        fim_falhas = df_falhas['DATA FINAL'].to_numpy(dtype='datetime64[ns]')
+        self.inicio = pd.Timestamp(df_falhas['DATA INICIAL'].min() if inicio is None else inicio)
+        self.fim = pd.Timestamp(df_falhas['DATA FINAL'].max() if fim is None else fim)
+        self.horas_janela = max((self.fim - self.inicio).total_seconds() / 3600, 0)
+        janela = (self.inicio, self.fim)
+
+        # Falhas do período: as que começam dentro da janela (mesmo critério do filtro de datas)
+        no_periodo = (inicio_falhas >= np.datetime64(self.inicio, 'ns')) & (inicio_falhas < np.datetime64(self.fim, 'ns'))
+
+        # Uma passagem por agrupamento: EQUIPAMENTO × ITEM para os itens, EQUIPAMENTO sozinho para a
+        # união das paradas de cada equipamento (mesmo que apareça em mais de uma frota) e
+        # FROTA × EQUIPAMENTO para a soma das frotas
+        self._tabelas = {}
+        for colunas in (['EQUIPAMENTO', 'ITEM'], ['EQUIPAMENTO'], ['FROTA', 'EQUIPAMENTO']):
+            if not set(colunas) <= set(df_falhas.columns):
+                continue
+            codigos, chaves = codigos_grupo(df_falhas, colunas)
+            ocorrencias = np.bincount(codigos[no_periodo & (codigos >= 0)], minlength=len(chaves))
+            parada = parada_unida_por_grupo(codigos, inicio_falhas, fim_falhas, len(chaves), janela)
+            self._tabelas[tuple(colunas)] = _tabela_mtbf(chaves, ocorrencias, parada, self.horas_janela)
+
+    @property
+    def nbytes(self):
+        return sum(int(tabela.memory_usage(deep=True).sum()) for tabela in self._tabelas.values())
+
+    def agregar(self, nivel):
+        """COLUNAS_MTBF por 'ITEM', 'EQUIPAMENTO', 'FROTA' ou ['EQUIPAMENTO', 'ITEM'], indexadas pelo nível."""
+        niveis = [nivel] if isinstance(nivel, str) else list(nivel)
+        if niveis == ['EQUIPAMENTO', 'ITEM']:
+            return self._tabelas[('EQUIPAMENTO', 'ITEM')].set_index(niveis)
+        if niveis == ['EQUIPAMENTO']:
+            return self._tabelas[('EQUIPAMENTO',)].set_index('EQUIPAMENTO')
+
+        # ITEM (sobre os pares equipamento-item) e FROTA (sobre os equipamentos): somas de horas e falhas
+        base = self._tabelas[('EQUIPAMENTO', 'ITEM')] if niveis == ['ITEM'] else self._tabelas[('FROTA', 'EQUIPAMENTO')]
+        somas = base.groupby(niveis, observed=True)[['Ocorrencias', 'Tempo_Parada (h)', 'Tempo_Operacao (h)']].sum()
+        return _completar_mtbf(somas)
+
+# Frequências da série de disponibilidade (rótulo exibido: frequência de pd.Period)
+FREQUENCIAS_DISPONIBILIDADE = {'Dia': 'D', 'Semana': 'W', 'Mês': 'M'}
+
+class MatrizDisponibilidade:
+    """DF (%) de cada equipamento em cada dia do período, guardada como matriz equipamento × dia.
+
+    As paradas de cada equipamento são unidas (episodios_unidos) e repartidas entre os dias que
+    tocam: o primeiro e o último dia de um episódio recebem a fração dentro deles e os dias
+    inteiros no meio são marcados por um vetor de diferenças acumulado, tudo em O(n + equipamentos × dias).
+    Semanas e meses saem da matriz diária somando colunas, sem voltar às falhas.
+    """
+
+    def __init__(self, df_falhas, inicio, fim):
+        self.dias = pd.period_range(pd.Timestamp(inicio), pd.Timestamp(fim) - pd.Timedelta(1, 'ns'), freq='D')
+        limites = np.r_[self.dias.start_time.to_numpy('datetime64[ns]').astype(np.int64), self.dias[-1].end_time.value + 1]
+        limites[0], limites[-1] = pd.Timestamp(inicio).value, pd.Timestamp(fim).value
+        self.horas = np.diff(limites) / _NS_POR_HORA
+
+        codigos, chaves = codigos_grupo(df_falhas, ['EQUIPAMENTO'])
+        self.equipamentos = pd.Index(chaves['EQUIPAMENTO'])
+        grupos, a, b = episodios_unidos(
+            codigos, df_falhas['DATA INICIAL'].to_numpy(dtype='datetime64[ns]'),
+            df_falhas['DATA FINAL'].to_numpy(dtype='datetime64[ns]'), (inicio, fim)
+        )
+
+        n_dias = len(self.dias)
+        dia_a = np.searchsorted(limites, a, side='right') - 1
+        dia_b = np.searchsorted(limites, b, side='left') - 1
+        colunas = n_dias + 1
+        mesmo_dia = dia_a == dia_b
+        # Trechos parciais: o episódio inteiro (mesmo dia) ou suas pontas no primeiro e no último dia
+        parcial = np.bincount(grupos * colunas + dia_a, weights=np.where(mesmo_dia, b, limites[dia_a + 1]) - a,
+                              minlength=len(chaves) * colunas)
+        parcial += np.bincount((grupos * colunas + dia_b)[~mesmo_dia], weights=(b - limites[dia_b])[~mesmo_dia],
+                               minlength=len(chaves) * colunas)
+        # Dias inteiros entre as pontas: +1 no dia seguinte ao primeiro, -1 no último
+        cobertura = np.bincount((grupos * colunas + dia_a + 1)[~mesmo_dia], minlength=len(chaves) * colunas)
+        cobertura -= np.bincount((grupos * colunas + dia_b)[~mesmo_dia], minlength=len(chaves) * colunas)
+
+        parcial = parcial.reshape(len(chaves), colunas)[:, :n_dias] / _NS_POR_HORA
+        cobertura = np.cumsum(cobertura.reshape(len(chaves), colunas)[:, :n_dias], axis=1)
+        # Horas paradas por equipamento e dia (float32: 2000 equipamentos × 3 anos ≈ 9 MB)
+        self.parada = (parcial + cobertura * self.horas).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.parada.nbytes + self.horas.nbytes
+
+    def agrupar(self, frequencia='D', linhas=None):
+        """(períodos, horas paradas, horas do período) por 'D', 'W' ou 'M', somando as colunas diárias.
+
+        linhas: posições dos equipamentos a devolver (None: todos).
+        """
+        parada = self.parada if linhas is None else self.parada[linhas]
+        if frequencia == 'D':
+            return self.dias, parada, self.horas
+        periodos = self.dias.asfreq(frequencia)
+        inicios = np.flatnonzero(np.r_[True, periodos[1:] != periodos[:-1]])
+        return (periodos[inicios], np.add.reduceat(parada, inicios, axis=1) if parada.size else parada[:, :len(inicios)],
+                np.add.reduceat(self.horas, inicios))
+
+    def serie(self, frequencia='D', equipamentos=None):
+        """DF (%) em formato longo (EQUIPAMENTO, Período, DF (%)) para os equipamentos pedidos (None: todos)."""
+        linhas = np.arange(len(self.equipamentos)) if equipamentos is None else self.equipamentos.get_indexer(equipamentos)
+        linhas = linhas[linhas >= 0]
+        periodos, parada, horas = self.agrupar(frequencia, linhas)
+        df = (1 - parada / horas) * 100
+        return pd.DataFrame({
+            'EQUIPAMENTO': np.repeat(self.equipamentos[linhas].astype(str), len(periodos)),
+            'Período': np.tile(periodos.start_time, len(linhas)),
+            'DF (%)': df.ravel(),
+        })
+
+    def serie_frota(self, frequencia='D'):
+        """DF (%) do conjunto dos equipamentos com falhas, por período: 1 - horas paradas / horas disponíveis."""
+        periodos, parada, horas = self.agrupar(frequencia)
+        return pd.DataFrame({
+            'Período': periodos.start_time,
+            'DF (%)': (1 - parada.sum(axis=0, dtype=np.float64) / (horas * max(len(self.equipamentos), 1))) * 100,
+        })
@@ -0,0 +1,334 @@
+# modules/pipeline_kpis.py
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from modules.conhecimento import ARQUIVO_BANCO_CONHECIMENTO, BaseConhecimento, carregar_base_conhecimento
+from modules.filtros import IndiceFiltros, janela_dias, ordenar_por_data
+from modules.historico import carregar_historico
+from modules.motor_kpis import CuboKPI, NIVEIS_HIERARQUIA
+from modules.motor_mtbf import MotorMTBF
+from modules.relatorios import dados_relatorio, relatorio_suficiente, generate_pdf_report
+from modules import secoes_kpis
+from modules.utils import ler_planilhas_xlsx, clean_duration_series, clean_and_convert_column, unificar_categorias
+
+# Pipeline de KPIs sem interface: leitura e limpeza das planilhas, filtros e todas as tabelas
+# da página de KPIs, usados tanto pela página (modules/kpis.py) quanto pela linha de comando:
+#   python -m modules.pipeline_kpis --input hist.xlsx --out resultados/
+
+# Colunas lidas de cada aba do histórico de manutenção
+REQUIRED_COLS_FALHAS = ['EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO', 'ITEM',
+                        'DATA INICIAL', 'DATA FINAL', 'DURAÇÃO', 'CAUSA']
+TEXT_COLS_FALHAS = ['SISTEMA', 'CONJUNTO', 'ITEM', 'CAUSA', 'EQUIPAMENTO', 'FROTA']
+
+REQUIRED_COLS_INDICADORES = ['EQUIPAMENTO', 'FROTA', 'DATA_INICIAL', 'DATA_FINAL',
+                             'DISPONIBILIDADE_FISICA', 'MTBF', 'MTTR', 'OEE', 'PRODUTIVIDADE']
+NUMERIC_COLS_INDICADORES = [
+    'HORAS_CALENDARIO', 'HORAS_DE_MANUTENCAO', 'HORA_DE_MANUTENÇÃO_CORRETIVA', 'HORA_ACIDENTE',
+    'HORA_DE_MANUTENÇÃO_PREVENTIVA', 'HORA_DE_MANUTENÇÃO_PREVENTIVA_SISTEMÁTICA',
+    'HORA_DE_MANUTENÇÃO_PREVENTIVA_NÃO_SISTEMÁTICA', 'HORAS_DISPONIVÉIS', 'HORA_OCIOSA',
+    'HORA_OCIOSA_INTERNA', 'HORA_OCIOSA_EXTERNA', 'HORA_TRABALHADA', 'HORA_TRABALHADA_PRODUTIVA',
+    'HORA_EFETIVA', 'HORA_DE_ATRASO_OPERACIONAL', 'HORA_TRABALHADA_NÃO_PRODUTIVA',
+    'HORA_TRABALHADA_DE_INFRA', 'HORA_TRABALHADA_DIVERSA',
+    'DISPONIBILIDADE_FISICA', 'UTILIZACAO_FISICA', 'RENDIMENTO_OPERACIONAL', 'DI_PERCENT', 'EP', 'OEE',
+    'NUMERO_DE_INTERVEÇÕES_CORRETIVAS', 'IAO', 'TON_HE', 'MTBF', 'MTTR', 'MTBS', 'MTTS', 'NIM', 'FMP',
+    'PRODUÇÃO', 'PRODUTIVIDADE', 'PERCENT_IMPACTO_NO_PAI'
+]
+TEXT_COLS_INDICADORES = ['DIRETORIA', 'COMPLEXO', 'UNIDADE', 'FASE_PRODUTIVA', 'SISTEMA_PRODUTIVO',
+                         'SUBPROCESSO', 'LINHA', 'CATEGORIA', 'GRUPO_DE_EQUIPAMENTOS', 'FAMÍLIA',
+                         'CLASSE', 'PORTE', 'FROTA', 'ROTA', 'EQUIPAMENTO', 'ATIVIDADE', 'STATUS']
+
+def normalizar_colunas_indicadores(colunas):
+    """Padroniza nomes das colunas da planilha 'Indicadores' para facilitar o acesso"""
+    return colunas.str.upper().str.replace(' ', '_').str.replace('%', '_PERCENT').str.strip()
+
+COLUNAS_FILTRO_FALHAS = ['FROTA', 'EQUIPAMENTO', 'SISTEMA', 'CONJUNTO', 'ITEM']
+COLUNAS_FILTRO_INDICADORES = ['FROTA', 'EQUIPAMENTO', 'SISTEMA_PRODUTIVO']
+
+def construir_indices(df_falhas, df_indicadores):
+    """Índices de filtro das duas planilhas: (índice de falhas, índice de indicadores)."""
+    return (
+        IndiceFiltros(df_falhas, COLUNAS_FILTRO_FALHAS, coluna_data='DATA INICIAL'),
+        IndiceFiltros(df_indicadores, COLUNAS_FILTRO_INDICADORES, coluna_data='DATA_FINAL'),
+    )
+
+def limpar_falhas(df_falhas):
+    """Valida e limpa a planilha 'Falhas'. Retorna (df_falhas, avisos); lança ValueError se não houver dados válidos."""
+    avisos = []
+
+    # Verificação de colunas obrigatórias para Falhas
+    missing_cols_falhas = [col for col in REQUIRED_COLS_FALHAS if col not in df_falhas.columns]
+    if missing_cols_falhas:
+        raise ValueError(f"Colunas obrigatórias faltando na planilha 'Falhas': {', '.join(missing_cols_falhas)}")
+
+    # Conversão segura de tipos para Falhas
+    df_falhas['DATA INICIAL'] = pd.to_datetime(df_falhas['DATA INICIAL'], errors='coerce')
+    df_falhas['DATA FINAL'] = pd.to_datetime(df_falhas['DATA FINAL'], errors='coerce')
+    df_falhas['DURAÇÃO'] = clean_duration_series(df_falhas['DURAÇÃO'])
+
+    # Limpeza das colunas de texto para Falhas
+    for col in TEXT_COLS_FALHAS:
+        df_falhas[col] = clean_and_convert_column(df_falhas[col])
+
+    # Remoção de registros inválidos em Falhas
+    original_count_falhas = len(df_falhas)
+    df_falhas = df_falhas.dropna(subset=['DATA INICIAL', 'DATA FINAL', 'DURAÇÃO'])
+    if len(df_falhas) < original_count_falhas:
+        avisos.append(f"Removidos {original_count_falhas - len(df_falhas)} registros inválidos da planilha 'Falhas'.")
+
+    if len(df_falhas) == 0:
+        raise ValueError("Nenhum dado válido encontrado na planilha 'Falhas' após a limpeza.")
+
+    return df_falhas, avisos
+
+def preparar_falhas(conteudo):
+    """Lê e limpa apenas a planilha 'Falhas' de um .xlsx (lote de novas falhas para um histórico salvo)."""
+    planilhas, _ = ler_planilhas_xlsx(conteudo, {'Falhas': REQUIRED_COLS_FALHAS})
+    return limpar_falhas(planilhas['Falhas'])
+
+def preparar_dados(conteudo):
+    """Lê e limpa as planilhas 'Falhas' e 'Indicadores' a partir dos bytes do arquivo .xlsx.
+
+    Retorna (df_falhas, df_indicadores, info_carga), onde info_carga traz os avisos
+    e o tempo de leitura de cada aba. Erros que impedem a análise são lançados
+    como ValueError com a mensagem a ser exibida ao usuário.
+    """
+    # --- Carregamento das duas planilhas (uma única abertura do arquivo) ---
+    planilhas, tempos_leitura = ler_planilhas_xlsx(
+        conteudo,
+        {
+            'Falhas': REQUIRED_COLS_FALHAS,
+            'Indicadores': set(REQUIRED_COLS_INDICADORES + NUMERIC_COLS_INDICADORES + TEXT_COLS_INDICADORES),
+        },
+        normalizadores={'Indicadores': normalizar_colunas_indicadores},
+    )
+    df_falhas = planilhas['Falhas']
+    df_indicadores = planilhas['Indicadores']
+
+    # --- Processamento de df_falhas ---
+    df_falhas, avisos = limpar_falhas(df_falhas)
+
+    # --- Processamento de df_indicadores ---
+
+    # Verificação de colunas obrigatórias para Indicadores
+    missing_cols_indicadores = [col for col in REQUIRED_COLS_INDICADORES if col not in df_indicadores.columns]
+    if missing_cols_indicadores:
+        avisos.append(f"Algumas colunas esperadas na planilha 'Indicadores' não foram encontradas: {', '.join(missing_cols_indicadores)}. Certas análises podem estar incompletas.")
+
+    # Verifica colunas críticas para correlação
+    if 'EQUIPAMENTO' not in df_indicadores.columns or 'FROTA' not in df_indicadores.columns:
+        raise ValueError("Colunas 'EQUIPAMENTO' e/ou 'FROTA' ausentes na planilha 'Indicadores'. Não é possível correlacionar os dados.")
+
+    # Conversão segura de tipos para Indicadores
+    if 'DATA_INICIAL' in df_indicadores.columns:
+        df_indicadores['DATA_INICIAL'] = pd.to_datetime(df_indicadores['DATA_INICIAL'], errors='coerce')
+    if 'DATA_FINAL' in df_indicadores.columns:
+        df_indicadores['DATA_FINAL'] = pd.to_datetime(df_indicadores['DATA_FINAL'], errors='coerce')
+
+    for col in NUMERIC_COLS_INDICADORES:
+        if col in df_indicadores.columns:
+            df_indicadores[col] = pd.to_numeric(df_indicadores[col], errors='coerce')
+
+    # Limpeza das colunas de texto para Indicadores
+    for col in TEXT_COLS_INDICADORES:
+        if col in df_indicadores.columns:
+            df_indicadores[col] = clean_and_convert_column(df_indicadores[col])
+
+    # Equipamento e frota compartilham o mesmo dicionário de categorias nas duas planilhas
+    unificar_categorias([df_falhas, df_indicadores], ['EQUIPAMENTO', 'FROTA'])
+
+    # Planilhas mantidas em ordem cronológica: o período vira uma fatia por busca binária
+    df_falhas = ordenar_por_data(df_falhas, 'DATA INICIAL')
+    df_indicadores = ordenar_por_data(df_indicadores, 'DATA_FINAL')
+
+    return df_falhas, df_indicadores, {'avisos': avisos, 'tempos_leitura': tempos_leitura}
+
+def selecoes_indicadores(selecoes):
+    """Seleções dos filtros traduzidas para a planilha de Indicadores, que registra o sistema em 'SISTEMA_PRODUTIVO'."""
+    return {('SISTEMA_PRODUTIVO' if coluna == 'SISTEMA' else coluna): valores for coluna, valores in selecoes.items()}
+
+def janela_periodo(df_falhas, periodo):
+    """Janela [início, fim) analisada: os dias inteiros do período (janela_dias, a mesma do filtro de datas)
+    ou, sem período, da primeira falha ao fim da última."""
+    if periodo is not None:
+        return janela_dias(periodo)
+    return df_falhas['DATA INICIAL'].min(), df_falhas['DATA FINAL'].max()
+
+def _etapa(tempos, nome, calcular):
+    inicio = time.perf_counter()
+    resultado = calcular()
+    tempos[nome] = time.perf_counter() - inicio
+    return resultado
+
+def calcular_tabelas(df_falhas, df_indicadores, base_conhecimento=None, selecoes=None, periodo=None, tempos=None, erros=None):
+    """Todas as tabelas da página de KPIs para um estado dos filtros, sem Streamlit.
+
+    Usa os mesmos cálculos da página (secoes_kpis) com os parâmetros padrão das seções:
+    todos os níveis da hierarquia, os dois heatmaps e comparação por frota sem seleção de equipamentos.
+    Retorna (tabelas, entradas do relatório PDF, falhas filtradas); tabelas é {nome: DataFrame}.
+    Os tempos de cada etapa, em segundos, são anotados em `tempos` quando informado. Com `erros`
+    informado, uma tabela que falha é anotada nele ({nome: mensagem}) e as demais seguem, como na página.
+    """
+    tempos = {} if tempos is None else tempos
+    selecoes = selecoes or {}
+    base_conhecimento = base_conhecimento if base_conhecimento is not None else BaseConhecimento()
+
+    indice_falhas, indice_indicadores = _etapa(tempos, 'Índices de filtro', lambda: construir_indices(df_falhas, df_indicadores))
+    df_falhas_filtrado = _etapa(tempos, 'Filtro falhas', lambda: indice_falhas.filtrar(df_falhas, selecoes, periodo))
+    df_indicadores_filtrado = _etapa(
+        tempos, 'Filtro indicadores', lambda: indice_indicadores.filtrar(df_indicadores, selecoes_indicadores(selecoes), periodo)
+    )
+    if len(df_falhas_filtrado) == 0:
+        raise ValueError("Nenhum dado de falhas encontrado com os filtros aplicados.")
+
+    cubo = _etapa(tempos, 'Cubo de KPIs', lambda: CuboKPI(df_falhas_filtrado))
+    motor_mtbf = _etapa(tempos, 'Motor de MTBF', lambda: MotorMTBF(df_falhas_filtrado, *janela_periodo(df_falhas, periodo)))
+    data_referencia = periodo[1] if periodo is not None else pd.Timestamp(datetime.now().date())
+
+    tabelas = {}
+    def tabela(nome, calcular):
+        try:
+            tabelas[nome] = _etapa(tempos, nome, calcular)
+        except Exception as e:
+            if erros is None:
+                raise
+            erros[nome] = str(e)
+        return tabelas.get(nome)
+
+    indicadores = tabela('indicadores_agregados', lambda: secoes_kpis.agregar_indicadores(df_indicadores_filtrado))
+    for nivel in NIVEIS_HIERARQUIA:
+        tabela(f'hierarquia_{nivel.lower()}', lambda: secoes_kpis.kpis_hierarquia(cubo, nivel))
+    for coluna in ['CONJUNTO', 'ITEM']:
+        tabela(f'pareto_{coluna.lower()}', lambda: secoes_kpis.pareto(cubo, coluna))
+    confiabilidade = tabela('confiabilidade_itens', lambda: secoes_kpis.risco_proxima_falha(
+        secoes_kpis.confiabilidade_por_item(cubo, motor_mtbf), data_referencia
+    )[0])
+    if confiabilidade is not None:
+        tabelas['itens_risco_alto'] = confiabilidade[confiabilidade['Risco_Proxima_Falha'] == 'Alto'].sort_values(
+            'Tempo_Desde_Ultima_Falha (h)', ascending=False
+        )
+    tabela('comparacao_frotas', lambda: secoes_kpis.comparacao_frotas(cubo, None, motor_mtbf))
+    tabela('heatmap_dia_mes', lambda: secoes_kpis.heatmap_falhas(df_falhas_filtrado, "Falhas por Dia da Semana e Mês"))
+    tabela('heatmap_hora_dia', lambda: secoes_kpis.heatmap_falhas(df_falhas_filtrado, "Falhas por Hora do Dia e Dia da Semana"))
+    tabela('piores_ativos', lambda: secoes_kpis.piores_ativos(cubo, motor_mtbf))
+    tabela('evolucao_temporal', lambda: secoes_kpis.evolucao_temporal(df_falhas_filtrado))
+    tabela('anomalias', lambda: secoes_kpis.detectar_anomalias(df_falhas_filtrado))
+    tabela('principais_causas', lambda: secoes_kpis.principais_causas(cubo)[0].rename('Ocorrencias').reset_index())
+    if indicadores is not None:
+        tabela('disponibilidade', lambda: secoes_kpis.disponibilidade_por_equipamento(df_falhas_filtrado, indicadores, periodo))
+    tabela('mcs', lambda: secoes_kpis.principais_falhas_mcs(cubo).pipe(
+        lambda mcs: mcs.assign(**{'Solução/Ação Recomendada': base_conhecimento.recomendar(mcs['CAUSA'])})
+    ))
+
+    dados = _etapa(tempos, 'Entradas do relatório', lambda: dados_relatorio(df_falhas_filtrado, cubo))
+    tabelas['top_equipamentos'], tabelas['falhas_mais_impactantes'], kpis_hierarquia = dados
+    for nivel, df_kpi in kpis_hierarquia.items():
+        tabelas[f'relatorio_hierarquia_{nivel.lower()}'] = df_kpi
+
+    return tabelas, dados, df_falhas_filtrado
+
+def gravar_tabelas(tabelas, pasta, formato='parquet'):
+    """Grava cada tabela em pasta/<nome>.parquet ou .csv e retorna os caminhos.
+
+    Índices nomeados (ex.: o nível da hierarquia) viram colunas; os demais são descartados.
+    """
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    caminhos = []
+    for nome, df in tabelas.items():
+        if any(nome is not None for nome in df.index.names):
+            df = df.reset_index()
+        caminho = pasta / f"{nome}.{formato}"
+        if formato == 'csv':
+            df.to_csv(caminho, index=False, encoding='utf-8-sig')
+        else:
+            df.to_parquet(caminho, index=False)
+        caminhos.append(caminho)
+    return caminhos
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m modules.pipeline_kpis',
+        description="Calcula as tabelas de KPIs de manutenção e o relatório PDF sem abrir o dashboard."
+    )
+    fonte = parser.add_mutually_exclusive_group(required=True)
+    fonte.add_argument('--input', type=Path, help="Planilha .xlsx com as abas 'Falhas' e 'Indicadores'")
+    fonte.add_argument('--historico', help="Nome de um histórico salvo pelo dashboard")
+    parser.add_argument('--out', type=Path, required=True, help="Pasta de saída")
+    parser.add_argument('--formato', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--frota', nargs='+', help="Filtra as frotas informadas")
+    parser.add_argument('--equipamento', nargs='+', help="Filtra os equipamentos informados")
+    parser.add_argument('--inicio', type=pd.Timestamp, help="Início do período (AAAA-MM-DD)")
+    parser.add_argument('--fim', type=pd.Timestamp, help="Fim do período (AAAA-MM-DD)")
+    parser.add_argument('--banco-conhecimento', type=Path, default=Path(ARQUIVO_BANCO_CONHECIMENTO))
+    parser.add_argument('--sem-pdf', action='store_true', help="Não gera o relatório PDF")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Linha de comando do pipeline; retorna o código de saída."""
+    args = _argumentos(argv)
+    tempos = {}
+
+    try:
+        if args.input is not None:
+            df_falhas, df_indicadores, info_carga = _etapa(tempos, 'Leitura', lambda: preparar_dados(args.input.read_bytes()))
+        else:
+            df_falhas, df_indicadores, info_carga = _etapa(tempos, 'Leitura', lambda: carregar_historico(args.historico))
+    except (OSError, ValueError) as e:
+        print(f"Erro ao carregar os dados: {e}", file=sys.stderr)
+        return 1
+    for aviso in info_carga['avisos']:
+        print(f"Aviso: {aviso}", file=sys.stderr)
+
+    try:
+        base_conhecimento = _etapa(tempos, 'Banco de conhecimento', lambda: carregar_base_conhecimento(args.banco_conhecimento))
+    except Exception as e:
+        print(f"Aviso: banco de conhecimento indisponível ({e}); recomendações genéricas.", file=sys.stderr)
+        base_conhecimento = BaseConhecimento()
+
+    selecoes = {coluna: valores for coluna, valores in [('FROTA', args.frota), ('EQUIPAMENTO', args.equipamento)] if valores}
+    periodo = None
+    if args.inicio is not None or args.fim is not None:
+        periodo = (
+            args.inicio if args.inicio is not None else df_falhas['DATA INICIAL'].min().normalize(),
+            args.fim if args.fim is not None else df_falhas['DATA INICIAL'].max().normalize(),
+        )
+
+    erros = {}
+    try:
+        tabelas, dados, df_falhas_filtrado = calcular_tabelas(
+            df_falhas, df_indicadores, base_conhecimento, selecoes, periodo, tempos, erros
+        )
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    for nome, mensagem in erros.items():
+        print(f"Aviso: tabela '{nome}' não calculada: {mensagem}", file=sys.stderr)
+
+    caminhos = _etapa(tempos, 'Gravação das tabelas', lambda: gravar_tabelas(tabelas, args.out, args.formato))
+    print(f"{len(caminhos)} tabelas gravadas em {args.out}")
+
+    if not args.sem_pdf:
+        if relatorio_suficiente(*dados):
+            caminho_pdf = args.out / 'relatorio_manutencao.pdf'
+            try:
+                _etapa(tempos, 'Relatório PDF', lambda: generate_pdf_report(df_falhas_filtrado, *dados, base_conhecimento, caminho_pdf))
+                print(f"Relatório gravado em {caminho_pdf}")
+            except Exception as e:
+                caminho_pdf.unlink(missing_ok=True)
+                print(f"Erro ao gerar relatório PDF: {e}", file=sys.stderr)
+        else:
+            print("Dados insuficientes para gerar o relatório completo", file=sys.stderr)
+
+    df_tempos = pd.DataFrame({'Etapa': list(tempos), 'Tempo (s)': list(tempos.values())})
+    df_tempos.to_csv(args.out / 'tempos_etapas.csv', index=False, encoding='utf-8-sig')
+    print(df_tempos.to_string(index=False, float_format='{:.3f}'.format))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
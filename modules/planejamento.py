@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 
 def exibir_planejamento():
     st.title("📘 Planejamento Estratégico Técnico")
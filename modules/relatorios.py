@@ -0,0 +1,389 @@
+# modules/relatorios.py
+
+import atexit
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fpdf import FPDF
+
+from modules.filtros import IndiceFiltros
+from modules.motor_kpis import CuboKPI
+from modules import secoes_kpis
+
+def _formatar_coluna(valores, formato=None):
+    """Textos de uma coluna inteira (Series ou Index): str() de cada valor ou o formato informado (ex.: '{:.1f}')."""
+    valores = valores.tolist()
+    if formato is None:
+        return list(map(str, valores))
+    return list(map(formato.format, valores))
+
+# Colunas das tabelas do relatório: (título, coluna do DataFrame ou None para o índice, largura, formato, alinhamento)
+COLUNAS_TOP_EQUIPAMENTOS = [
+    ('Equipamento', 'EQUIPAMENTO', 30, None, ''),
+    ('Frota', 'FROTA', 25, None, ''),
+    ('Tempo Total (h)', 'Tempo Total (h)', 25, '{:.1f}', 'C'),
+    ('Ocorrências', 'Ocorrências', 25, None, 'C'),
+    ('Sistema', 'SISTEMA', 25, None, ''),
+    ('Conjunto', 'CONJUNTO', 25, None, ''),
+]
+COLUNAS_KPIS_HIERARQUIA = [
+    ('Tempo Total (h)', 'Tempo Total (h)', 25, '{:.1f}', 'C'),
+    ('MTTR (h)', 'MTTR (h)', 25, '{:.1f}', 'C'),
+    ('Ocorrências', 'Ocorrências', 25, None, 'C'),
+    ('Equip. Afetados', 'Equip. Afetados', 25, None, 'C'),
+]
+
+class PDFReport(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 10, 'Relatório de Análise de Manutenção', 0, 1, 'C')
+        self.ln(5)
+    
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+    def garantir_espaco(self, altura):
+        """Abre uma nova página se um bloco da altura informada não couber no restante da atual."""
+        if self.y + altura > self.page_break_trigger and not self.in_footer and self.accept_page_break():
+            self.add_page(self.cur_orientation)
+            return True
+        return False
+
+    def _quebrar_texto(self, texto, largura):
+        """Divide o texto em linhas que cabem na largura, quebrando nos espaços (palavras longas são cortadas)."""
+        linhas, atual = [], ''
+        for palavra in texto.split(' '):
+            candidato = f"{atual} {palavra}" if atual else palavra
+            if self.get_string_width(candidato) <= largura:
+                atual = candidato
+                continue
+            if atual:
+                linhas.append(atual)
+            atual = palavra
+            while len(atual) > 1 and self.get_string_width(atual) > largura:
+                corte = len(atual) - 1
+                while corte > 1 and self.get_string_width(atual[:corte]) > largura:
+                    corte -= 1
+                linhas.append(atual[:corte])
+                atual = atual[corte:]
+        linhas.append(atual)
+        return linhas
+
+    def _cabecalho_tabela(self, colunas, altura):
+        for titulo, _, largura, _, _ in colunas:
+            self.cell(largura, altura, titulo, 1, 0, 'C')
+        self.ln()
+
+    def tabela(self, df, colunas, altura=10):
+        """Desenha o DataFrame como tabela com bordas, repetindo o cabeçalho a cada nova página.
+
+        colunas: lista de (título, coluna, largura, formato, alinhamento); coluna None usa o índice
+        e formato None usa str(). Cada coluna é formatada de uma vez antes do desenho. Textos mais
+        largos que a coluna são quebrados em várias linhas e a linha da tabela cresce para contê-los.
+        """
+        textos = [_formatar_coluna(df.index if col is None else df[col], formato) for _, col, _, formato, _ in colunas]
+        larguras = [largura for _, _, largura, _, _ in colunas]
+        alinhamentos = [alinhamento for _, _, _, _, alinhamento in colunas]
+        altura_texto = self.font_size * 1.5
+
+        # Cada texto distinto é medido uma vez; só os que não cabem na coluna precisam de quebra
+        largos = [
+            {texto for texto in set(textos_coluna) if self.get_string_width(texto) > largura - 2 * self.c_margin}
+            for textos_coluna, largura in zip(textos, larguras)
+        ]
+
+        self.garantir_espaco(2 * altura)
+        self._cabecalho_tabela(colunas, altura)
+        for linha in zip(*textos):
+            if not any(texto in largos_coluna for texto, largos_coluna in zip(linha, largos)):
+                if self.garantir_espaco(altura):
+                    self._cabecalho_tabela(colunas, altura)
+                for texto, largura, alinhamento in zip(linha, larguras, alinhamentos):
+                    self.cell(largura, altura, texto, 1, 0, alinhamento)
+                self.ln()
+                continue
+
+            linhas_texto = [
+                self._quebrar_texto(texto, largura - 2 * self.c_margin) if texto in largos_coluna else [texto]
+                for texto, largura, largos_coluna in zip(linha, larguras, largos)
+            ]
+            altura_linha = max(altura, max(map(len, linhas_texto)) * altura_texto)
+            if self.garantir_espaco(altura_linha):
+                self._cabecalho_tabela(colunas, altura)
+            x, y = self.x, self.y
+            for linhas_celula, largura, alinhamento in zip(linhas_texto, larguras, alinhamentos):
+                self.rect(x, y, largura, altura_linha)
+                for i, texto in enumerate(linhas_celula):
+                    self.set_xy(x, y + i * altura_texto)
+                    self.cell(largura, altura_texto, texto, 0, 0, alinhamento)
+                x += largura
+            self.set_xy(self.l_margin, y + altura_linha)
+
+# --- Arquivos temporários das sessões ---
+
+# PDFs e zips gerados para download ficam numa pasta própria. Uma sessão abandonada não chega a remover
+# o seu último arquivo; por isso cada nova geração apaga o que estiver na pasta há mais de VALIDADE_TEMPORARIOS
+# segundos, e ao encerrar o processo remove os arquivos que ele mesmo criou
+PASTA_TEMPORARIOS = os.path.join(tempfile.gettempdir(), 'relatorios_manutencao')
+VALIDADE_TEMPORARIOS = 2 * 3600
+
+_temporarios_processo = set()
+
+def limpar_temporarios_antigos(validade=VALIDADE_TEMPORARIOS, pasta=PASTA_TEMPORARIOS):
+    """Remove da pasta os arquivos e pastas modificados há mais de `validade` segundos; retorna quantos removeu."""
+    limite = time.time() - validade
+    removidos = 0
+    try:
+        entradas = list(os.scandir(pasta))
+    except FileNotFoundError:
+        return 0
+    for entrada in entradas:
+        try:
+            if entrada.stat(follow_symlinks=False).st_mtime >= limite:
+                continue
+            if entrada.is_dir(follow_symlinks=False):
+                shutil.rmtree(entrada.path)
+            else:
+                os.remove(entrada.path)
+            _temporarios_processo.discard(entrada.path)
+            removidos += 1
+        except OSError:
+            # Outro processo pode ter removido ou ainda estar usando o arquivo
+            continue
+    return removidos
+
+def _novo_temporario(prefixo, sufixo):
+    os.makedirs(PASTA_TEMPORARIOS, exist_ok=True)
+    limpar_temporarios_antigos(VALIDADE_TEMPORARIOS, PASTA_TEMPORARIOS)
+    with tempfile.NamedTemporaryFile(prefix=prefixo, suffix=sufixo, dir=PASTA_TEMPORARIOS, delete=False) as arquivo:
+        caminho = arquivo.name
+    _temporarios_processo.add(caminho)
+    return caminho
+
+def _remover_temporario(caminho):
+    _temporarios_processo.discard(caminho)
+    if caminho and os.path.exists(caminho):
+        os.remove(caminho)
+
+@atexit.register
+def _remover_temporarios_processo():
+    for caminho in list(_temporarios_processo):
+        try:
+            _remover_temporario(caminho)
+        except OSError:
+            pass
+
+def gerar_relatorio_pdf_temporario(*dados_relatorio, anterior=None):
+    """Gera o relatório em um arquivo temporário e retorna o caminho; remove o relatório anterior da sessão."""
+    caminho = _novo_temporario('relatorio_manutencao_', '.pdf')
+    try:
+        generate_pdf_report(*dados_relatorio, caminho)
+    except Exception:
+        _remover_temporario(caminho)
+        raise
+    if anterior and anterior != caminho:
+        _remover_temporario(anterior)
+    return caminho
+
+def generate_pdf_report(df_falhas_filtrado, top_equipments, timeline_data, kpis_hierarquia, base_conhecimento, caminho):
+    """Monta o relatório e o grava no arquivo `caminho`.
+
+    O fpdf 1.7 não grava página a página: o documento inteiro é montado em memória e só
+    vai para o disco no output() final, então o pico de memória cresce com o relatório
+    (aqui proporcional aos nós da hierarquia e às tabelas de top N, não ao número de falhas).
+    """
+    pdf = PDFReport()
+    # Adicionando fonte que suporte caracteres UTF-8
+    pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
+    pdf.add_font('DejaVu', 'B', 'DejaVuSansCondensed-Bold.ttf', uni=True)
+    
+    pdf.add_page()
+    pdf.set_font('DejaVu', 'B', 16)
+    pdf.cell(0, 10, 'Relatório de Análise de Manutenção', 0, 1, 'C')
+    pdf.ln(10)
+    
+    if not top_equipments.empty:
+        # Top 10 Equipamentos Críticos
+        pdf.set_font('DejaVu', 'B', 14)
+        pdf.cell(0, 10, 'Top 10 Equipamentos Críticos', 0, 1)
+        pdf.ln(5)
+        
+        pdf.set_font('DejaVu', '', 10)
+        pdf.tabela(top_equipments, COLUNAS_TOP_EQUIPAMENTOS)
+    
+    # KPIs Hierárquicos
+    pdf.add_page()
+    pdf.set_font('DejaVu', 'B', 14)
+    pdf.cell(0, 10, 'Análise Hierárquica de Falhas', 0, 1, 'C')
+    pdf.ln(5)
+    
+    for nivel, df_kpi in kpis_hierarquia.items():
+        if not df_kpi.empty:
+            pdf.set_font('DejaVu', 'B', 12)
+            pdf.cell(0, 10, f'Nível: {nivel}', 0, 1)
+            pdf.ln(3)
+            
+            pdf.set_font('DejaVu', '', 10)
+            pdf.tabela(df_kpi, [(nivel, None, 50, None, ''), *COLUNAS_KPIS_HIERARQUIA])
+            pdf.ln(10)
+    
+    # Linha do Tempo de Falhas
+    pdf.add_page()
+    pdf.set_font('DejaVu', 'B', 14)
+    pdf.cell(0, 10, 'Linha do Tempo das Falhas Mais Impactantes', 0, 1, 'C')
+    pdf.ln(5)
+    
+    if not timeline_data.empty:
+        pdf.set_font('DejaVu', '', 10)
+        pdf.set_fill_color(200, 220, 255)
+        # Textos de todos os eventos montados coluna a coluna; cada evento fica inteiro em uma página
+        colunas = {col: timeline_data[col].tolist() for col in ['EQUIPAMENTO', 'SISTEMA', 'CONJUNTO', 'ITEM', 'CAUSA', 'DURAÇÃO', 'Impacto']}
+        datas = timeline_data['DATA INICIAL'].dt.strftime('%d/%m/%Y').tolist()
+        for data, equipamento, sistema, conjunto, item, causa, duracao, impacto in zip(datas, *colunas.values()):
+            pdf.garantir_espaco(10 + 3 * 8 + 3)
+            pdf.cell(0, 10, f"{data} - {equipamento}", 1, 1, 'L', 1)
+            pdf.cell(0, 8, f"Sistema: {sistema} > Conjunto: {conjunto} > Item: {item}", 0, 1)
+            pdf.cell(0, 8, f"Falha: {causa}", 0, 1)
+            pdf.cell(0, 8, f"Duração: {duracao} horas | Impacto: {impacto}", 0, 1)
+            pdf.ln(3)
+    
+    # Recomendações
+    pdf.add_page()
+    pdf.set_font('DejaVu', 'B', 14)
+    pdf.cell(0, 10, 'Recomendações Prioritárias', 0, 1, 'C')
+    pdf.ln(5)
+    
+    if not timeline_data.empty:
+        causas = timeline_data['CAUSA'].value_counts().loc[lambda c: c > 0].nlargest(5)
+        recomendacoes = base_conhecimento.recomendar(causas.index)
+        for i, (causa, recomendacao) in enumerate(zip(causas.index, recomendacoes), 1):
+            pdf.set_font('DejaVu', 'B', 12)
+            pdf.cell(0, 10, f"{i}. {causa}", 0, 1)
+            pdf.set_font('DejaVu', '', 10)
+            pdf.multi_cell(0, 8, recomendacao) 
+            pdf.ln(3)
+    
+    pdf.output(caminho, 'F')
+
+# --- Relatórios em lote ---
+
+# Colunas que podem definir os relatórios de um lote (um relatório por valor)
+COLUNAS_LOTE = ['FROTA', 'EQUIPAMENTO']
+
+def dados_relatorio(df_falhas, cubo=None):
+    """Top equipamentos, linha do tempo e KPIs hierárquicos do relatório para um conjunto de falhas.
+
+    cubo: CuboKPI já calculado sobre as mesmas falhas, se houver.
+    """
+    if cubo is None:
+        cubo = CuboKPI(df_falhas)
+    return (
+        secoes_kpis.top_equipamentos_criticos(cubo),
+        secoes_kpis.falhas_mais_impactantes(df_falhas),
+        secoes_kpis.kpis_hierarquia_relatorio(cubo),
+    )
+
+def relatorio_suficiente(top_equipments, timeline_data, kpis_hierarquia):
+    """Indica se há dados para montar o relatório completo."""
+    return not top_equipments.empty and not timeline_data.empty and bool(kpis_hierarquia)
+
+def especificacoes_por_coluna(df_falhas, coluna, valores=None):
+    """Uma especificação de relatório por valor da coluna: {'nome': valor, 'selecoes': {coluna: [valor]}}."""
+    if valores is None:
+        valores = sorted(df_falhas[coluna].dropna().astype(str).unique())
+    return [{'nome': str(valor), 'selecoes': {coluna: [valor]}} for valor in valores]
+
+def _nomes_arquivos(especificacoes):
+    # Nomes de arquivo seguros e sem repetição dentro do zip
+    nomes, usados = [], set()
+    for espec in especificacoes:
+        base = re.sub(r'[^\w.-]+', '_', espec['nome']).strip('_') or 'relatorio'
+        nome, n = f"{base}.pdf", 1
+        while nome in usados:
+            n += 1
+            nome = f"{base}_{n}.pdf"
+        usados.add(nome)
+        nomes.append(nome)
+    return nomes
+
+# Banco de conhecimento de cada processo do lote, enviado uma vez na criação do processo
+_base_processo = None
+
+def _iniciar_processo(base_conhecimento):
+    global _base_processo
+    _base_processo = base_conhecimento
+
+def _gerar_relatorio_lote(df_falhas, caminho):
+    """Executado nos processos do lote: calcula as entradas e grava um relatório. Retorna (gravado, segundos)."""
+    inicio = time.perf_counter()
+    dados = dados_relatorio(df_falhas)
+    if not relatorio_suficiente(*dados):
+        return False, time.perf_counter() - inicio
+    generate_pdf_report(df_falhas, *dados, _base_processo, caminho)
+    return True, time.perf_counter() - inicio
+
+def gerar_relatorios_em_lote(df_falhas, especificacoes, base_conhecimento, destino_zip, max_processos=None, ao_progredir=None):
+    """Gera um PDF por especificação em processos paralelos e os reúne em um arquivo zip.
+
+    especificacoes: lista de {'nome': ..., 'selecoes': {coluna: valores}} (ver especificacoes_por_coluna).
+    ao_progredir(concluidos, total, resultado) é chamado no processo principal a cada relatório terminado.
+    Retorna uma linha por especificação, na ordem recebida, com status e tempo de geração.
+    """
+    colunas = sorted({col for espec in especificacoes for col in espec['selecoes']})
+    indice = IndiceFiltros(df_falhas, colunas)
+    nomes = _nomes_arquivos(especificacoes)
+    resultados = [None] * len(especificacoes)
+
+    # 'spawn': os processos não herdam as threads e o estado do servidor Streamlit
+    contexto = multiprocessing.get_context('spawn')
+    os.makedirs(PASTA_TEMPORARIOS, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='relatorios_lote_', dir=PASTA_TEMPORARIOS) as pasta, \
+            zipfile.ZipFile(destino_zip, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip, \
+            ProcessPoolExecutor(max_workers=max_processos, mp_context=contexto,
+                                initializer=_iniciar_processo, initargs=(base_conhecimento,)) as executor:
+        futuros = {
+            executor.submit(_gerar_relatorio_lote, indice.filtrar(df_falhas, espec['selecoes']), os.path.join(pasta, nome)): i
+            for i, (espec, nome) in enumerate(zip(especificacoes, nomes))
+        }
+        for concluidos, futuro in enumerate(as_completed(futuros), 1):
+            i = futuros[futuro]
+            resultado = {'Relatório': especificacoes[i]['nome'], 'Arquivo': nomes[i], 'Tempo (s)': None}
+            try:
+                gravado, segundos = futuro.result()
+                resultado['Tempo (s)'] = segundos
+                if gravado:
+                    caminho = os.path.join(pasta, nomes[i])
+                    arquivo_zip.write(caminho, nomes[i])
+                    os.remove(caminho)
+                    resultado['Status'] = 'Gerado'
+                else:
+                    resultado['Arquivo'] = None
+                    resultado['Status'] = 'Dados insuficientes'
+            except Exception as e:
+                resultado['Arquivo'] = None
+                resultado['Status'] = f"Erro: {str(e)}"
+            resultados[i] = resultado
+            if ao_progredir is not None:
+                ao_progredir(concluidos, len(futuros), resultado)
+
+    return resultados
+
+def gerar_lote_zip_temporario(df_falhas, especificacoes, base_conhecimento, anterior=None, **opcoes):
+    """Gera o lote em um zip temporário; retorna (caminho, resultados) e remove o zip anterior da sessão."""
+    caminho = _novo_temporario('relatorios_manutencao_', '.zip')
+    try:
+        resultados = gerar_relatorios_em_lote(df_falhas, especificacoes, base_conhecimento, caminho, **opcoes)
+    except Exception:
+        _remover_temporario(caminho)
+        raise
+    if anterior and anterior != caminho:
+        _remover_temporario(anterior)
+    return caminho, resultados
@@ -0,0 +1,256 @@
+# modules/secoes_kpis.py
+
+import numpy as np
+import pandas as pd
+
+from modules.filtros import janela_dias
+from modules.motor_mtbf import parada_unida
+
+# Cálculos de cada seção da página de KPIs, sem Streamlit: recebem os dados já filtrados
+# (DataFrame ou CuboKPI) e os parâmetros da seção e devolvem DataFrames prontos para exibir.
+# Por não terem efeitos colaterais, seus resultados podem ser guardados em cache.
+
+ORDEM_DIAS = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+ORDEM_MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+
+COLUNAS_HIERARQUIA = {'MTTR': 'MTTR (h)', 'Tempo_Total_Parada': 'Tempo Total (h)',
+                      'Ocorrencias': 'Ocorrências', 'Equip_Afetados': 'Equip. Afetados'}
+
+def agregar_indicadores(df_indicadores):
+    """Último registro de cada equipamento/frota no período.
+
+    Pressupõe a planilha em ordem de DATA_FINAL, como deixam ordenar_por_data (preparar_dados,
+    carregar_historico) e o filtro, que preserva a ordem: assim o último é o de DATA_FINAL mais recente.
+    """
+    if not df_indicadores.empty:
+        return df_indicadores.groupby(['EQUIPAMENTO', 'FROTA'], observed=True).last().reset_index()
+    return pd.DataFrame()
+
+def kpis_hierarquia(cubo, nivel):
+    """KPIs de um nível da hierarquia com os nomes de coluna exibidos na página."""
+    return cubo.hierarquia.kpis(nivel)[list(COLUNAS_HIERARQUIA)].rename(columns=COLUNAS_HIERARQUIA)
+
+def pareto(cubo, coluna):
+    """Tempo de parada por CONJUNTO ou ITEM, decrescente, com a porcentagem cumulativa."""
+    df_pareto = cubo.agregar(coluna)['Tempo_Total_Parada'].sort_values(ascending=False).reset_index()
+    df_pareto.columns = [coluna, 'Tempo Total Parada (h)']
+    df_pareto['Porcentagem Cumulativa (%)'] = (df_pareto['Tempo Total Parada (h)'].cumsum() / df_pareto['Tempo Total Parada (h)'].sum()) * 100
+    return df_pareto
+
+def confiabilidade_por_item(cubo, motor_mtbf):
+    """MTTR, ocorrências, tempo de parada, última falha e MTBF por ITEM.
+
+    O MTBF vem do MotorMTBF: horas de operação do item em cada equipamento onde falhou (período
+    menos as paradas unidas daquele item) somadas e divididas pelo total de falhas.
+    """
+    df_reliability = cubo.agregar('ITEM')[['Ocorrencias', 'Tempo_Total_Parada', 'MTTR', 'Ultima_Falha']].reset_index()
+
+    mtbf_itens = motor_mtbf.agregar('ITEM')['MTBF (h)']
+    df_reliability['MTBF (h)'] = mtbf_itens.reindex(df_reliability['ITEM'].astype(str)).to_numpy()
+    df_reliability['MTBF (h)'] = df_reliability['MTBF (h)'].fillna(motor_mtbf.horas_janela) # Se nunca falhou, MTBF é pelo menos o período total
+
+    return df_reliability.sort_values('Ocorrencias', ascending=False)
+
+def risco_proxima_falha(df_reliability, data_referencia):
+    """Acrescenta tempo desde a última falha e risco à confiabilidade; retorna (tabela, itens de risco alto)."""
+    df_reliability = df_reliability.copy()
+    df_reliability['Tempo_Desde_Ultima_Falha (h)'] = (data_referencia - df_reliability['Ultima_Falha']).dt.total_seconds() / 3600
+
+    # Flag de risco: Se o tempo desde a última falha é >= 80% do MTBF
+    df_reliability['Risco_Proxima_Falha'] = np.where(
+        (df_reliability['Tempo_Desde_Ultima_Falha (h)'] >= df_reliability['MTBF (h)'] * 0.8) & (df_reliability['Ocorrencias'] > 0),
+        'Alto', 'Baixo'
+    )
+    df_reliability['Risco_Proxima_Falha'] = np.where(df_reliability['Ocorrencias'] == 0, 'N/A (Sem Histórico)', df_reliability['Risco_Proxima_Falha'])
+
+    risk_items = df_reliability[df_reliability['Risco_Proxima_Falha'] == 'Alto'].sort_values('Tempo_Desde_Ultima_Falha (h)', ascending=False)
+    return df_reliability, risk_items
+
+def comparacao_equipamentos(cubo, motor_mtbf, equipamentos):
+    """Tempo de parada, ocorrências, MTTR e MTBF (MotorMTBF) para os equipamentos escolhidos."""
+    kpis_equipamento = cubo.agregar('EQUIPAMENTO')
+    kpis_comp_equip = (
+        kpis_equipamento[kpis_equipamento.index.isin(equipamentos)]
+        [['Tempo_Total_Parada', 'Ocorrencias', 'MTTR']]
+        .rename(columns={'MTTR': 'MTTR_h'})
+        .reset_index()
+    )
+
+    # MTBF por equipamento: horas em que nenhum item estava parado / falhas do equipamento
+    mtbf_equipamentos = motor_mtbf.agregar('EQUIPAMENTO')['MTBF (h)']
+    kpis_comp_equip['MTBF_h'] = mtbf_equipamentos.reindex(kpis_comp_equip['EQUIPAMENTO'].astype(str)).to_numpy()
+
+    return kpis_comp_equip
+
+def comparacao_frotas(cubo, frotas, motor_mtbf=None):
+    """KPIs por frota (frotas=None para todas), com o MTBF da frota pelo MotorMTBF quando informado."""
+    kpis_comp_frota = cubo.agregar('FROTA')
+    if frotas is not None:
+        kpis_comp_frota = kpis_comp_frota[kpis_comp_frota.index.isin(frotas)]
+    kpis_comp_frota = kpis_comp_frota[['Tempo_Total_Parada', 'Ocorrencias', 'MTTR']].rename(columns={'MTTR': 'MTTR_h'}).reset_index()
+
+    # MTBF da frota: horas de operação somadas dos equipamentos / falhas somadas
+    if motor_mtbf is not None:
+        mtbf_frotas = motor_mtbf.agregar('FROTA')['MTBF (h)']
+        kpis_comp_frota['MTBF_h'] = mtbf_frotas.reindex(kpis_comp_frota['FROTA'].astype(str)).to_numpy()
+
+    return kpis_comp_frota
+
+def heatmap_falhas(df_falhas, tipo):
+    """Tempo total e contagem de falhas por (Dia da Semana, Mês) ou por (Hora, Dia da Semana)."""
+    datas = df_falhas['DATA INICIAL']
+    if tipo == "Falhas por Dia da Semana e Mês":
+        chaves = {'Dia da Semana': datas.dt.day_name(locale='pt_BR'), 'Mês': datas.dt.month_name(locale='pt_BR')}
+    else:
+        chaves = {'Hora': datas.dt.hour, 'Dia da Semana': datas.dt.day_name(locale='pt_BR')}
+
+    df_heatmap = df_falhas[['DURAÇÃO']].assign(**chaves).groupby(list(chaves)).agg(
+        Total_Duracao=('DURAÇÃO', 'sum'),
+        Contagem_Falhas=('DURAÇÃO', 'count')
+    ).reset_index()
+
+    df_heatmap['Dia da Semana'] = pd.Categorical(df_heatmap['Dia da Semana'], categories=ORDEM_DIAS, ordered=True)
+    if 'Mês' in df_heatmap.columns:
+        df_heatmap['Mês'] = pd.Categorical(df_heatmap['Mês'], categories=ORDEM_MESES, ordered=True)
+    return df_heatmap.sort_values(list(chaves))
+
+def piores_ativos(cubo, motor_mtbf):
+    """Ranking de 'bad actors': soma dos scores min-max de parada, ocorrências, MTTR e MTBF (invertido).
+
+    Tempo de parada e MTBF vêm do MotorMTBF: paradas sobrepostas do mesmo equipamento contam uma vez.
+    """
+    kpis_equipamento = cubo.agregar('EQUIPAMENTO')[['Ocorrencias', 'MTTR']].reset_index()
+
+    kpis_mtbf = motor_mtbf.agregar('EQUIPAMENTO').reindex(kpis_equipamento['EQUIPAMENTO'].astype(str))
+    kpis_equipamento.insert(1, 'Tempo_Total_Parada', kpis_mtbf['Tempo_Parada (h)'].to_numpy())
+    kpis_equipamento['MTBF_h'] = kpis_mtbf['MTBF (h)'].to_numpy()
+
+    if kpis_equipamento.empty:
+        return kpis_equipamento
+
+    # Normalização Min-Max para criar um "Índice de Criticidade"
+    # Quanto MAIOR o valor do índice, PIOR o equipamento.
+    df_scores = kpis_equipamento[['EQUIPAMENTO']].copy()
+
+    # Tempo Total de Parada, Ocorrências e MTTR (maior é pior)
+    for coluna, score in [('Tempo_Total_Parada', 'Score_Tempo_Parada'), ('Ocorrencias', 'Score_Ocorrencias'), ('MTTR', 'Score_MTTR')]:
+        if kpis_equipamento[coluna].max() > 0:
+            df_scores[score] = (kpis_equipamento[coluna] - kpis_equipamento[coluna].min()) / \
+                               (kpis_equipamento[coluna].max() - kpis_equipamento[coluna].min())
+        else:
+            df_scores[score] = 0 # Se todos têm valor zero (ou NaN)
+
+    # MTBF (menor é pior, então inverta a lógica: (max_val - val) / (max_val - min_val))
+    if kpis_equipamento['MTBF_h'].count() > 1: # Precisa de pelo menos 2 valores não NaN
+        mtbf_valid = kpis_equipamento['MTBF_h'].dropna()
+        if mtbf_valid.max() > mtbf_valid.min():
+            df_scores['Score_MTBF'] = (mtbf_valid.max() - kpis_equipamento['MTBF_h']) / (mtbf_valid.max() - mtbf_valid.min())
+        else:
+            df_scores['Score_MTBF'] = 0
+    else:
+        df_scores['Score_MTBF'] = 0 # Se MTBF não é aplicável ou não varia
+
+    score_cols = ['Score_Tempo_Parada', 'Score_Ocorrencias', 'Score_MTTR', 'Score_MTBF']
+    df_scores[score_cols] = df_scores[score_cols].fillna(0) # Trata quaisquer NaNs resultantes da normalização (ex: se min=max)
+
+    # Combina os scores (peso igual)
+    df_scores['Indice_Criticidade'] = df_scores[score_cols].sum(axis=1)
+
+    df_bad_actors = pd.merge(df_scores, kpis_equipamento, on='EQUIPAMENTO', how='left')
+    return df_bad_actors.sort_values('Indice_Criticidade', ascending=False)
+
+def evolucao_temporal(df_falhas):
+    """Tempo de parada por dia e equipamento."""
+    datas_dia = df_falhas['DATA INICIAL'].dt.to_period('D').dt.to_timestamp()
+    return df_falhas[['EQUIPAMENTO', 'DURAÇÃO']].assign(DATA_DIA=datas_dia).groupby(
+        ['DATA_DIA', 'EQUIPAMENTO'], observed=True
+    )['DURAÇÃO'].sum().reset_index()
+
+def detectar_anomalias(df_falhas):
+    """Marca cada falha como 'Anomalia' ou 'Normal' por Isolation Forest sobre a DURAÇÃO."""
+    from sklearn.ensemble import IsolationForest
+
+    colunas = ['DATA INICIAL', 'DURAÇÃO', 'EQUIPAMENTO', 'SISTEMA', 'CONJUNTO', 'ITEM', 'CAUSA']
+    df_anomalias = df_falhas[colunas].copy()
+    model = IsolationForest(contamination=0.1, random_state=42)
+    df_anomalias['Anomalia'] = model.fit_predict(df_anomalias[['DURAÇÃO']].values)
+
+    # Converte -1 para 'Anomalia' e 1 para 'Normal'
+    df_anomalias['Anomalia_Label'] = df_anomalias['Anomalia'].map({-1: 'Anomalia', 1: 'Normal'})
+    return df_anomalias
+
+def principais_causas(cubo, n=5, n_equipamentos=3):
+    """As n causas mais frequentes e, para cada uma, os equipamentos mais afetados: (causas, {causa: tabela})."""
+    causas = cubo.agregar('CAUSA')['Ocorrencias'].rename('count').nlargest(n)
+    por_causa = cubo.agregar(['CAUSA', 'EQUIPAMENTO'])['Ocorrencias']
+    equipamentos = {
+        causa: por_causa.xs(causa, level='CAUSA').rename('count').nlargest(n_equipamentos).reset_index()
+        for causa in causas.index
+    }
+    return causas, equipamentos
+
+def disponibilidade_por_equipamento(df_falhas, df_indicadores_agregados, periodo):
+    """DF da planilha de Indicadores e DF estimada pelo tempo de parada no período, por equipamento.
+
+    A DF calculada só existe com período selecionado, contado em dias inteiros (a data final entra
+    inteira). O tempo de parada é a união das falhas de cada equipamento recortada ao período,
+    então falhas sobrepostas não contam em dobro e a DF fica entre 0 e 100%.
+    """
+    df_display_performance = pd.DataFrame()
+    if not df_indicadores_agregados.empty and 'DISPONIBILIDADE_FISICA' in df_indicadores_agregados.columns:
+        df_display_performance = df_indicadores_agregados[['EQUIPAMENTO', 'FROTA', 'DISPONIBILIDADE_FISICA']].copy()
+        df_display_performance = df_display_performance.rename(columns={'DISPONIBILIDADE_FISICA': 'DF_Alcancada_Indicadores (%)'})
+
+    # Cálculo de DF baseada em paradas (aproximação se não tiver dados de horas totais)
+    if periodo is not None:
+        inicio, fim = janela_dias(periodo)
+        total_period_hours = (fim - inicio).total_seconds() / 3600
+        downtime_per_equip = parada_unida(df_falhas, ['EQUIPAMENTO'], inicio, fim).rename(columns={'Tempo_Parada (h)': 'DURAÇÃO'})
+        downtime_per_equip['DF_Alcancada_Calculada (%)'] = (1 - (downtime_per_equip['DURAÇÃO'] / total_period_hours)) * 100
+
+        if not df_display_performance.empty:
+            df_display_performance = pd.merge(df_display_performance, downtime_per_equip[['EQUIPAMENTO', 'DF_Alcancada_Calculada (%)']], on='EQUIPAMENTO', how='left')
+        else:
+            df_display_performance = downtime_per_equip[['EQUIPAMENTO', 'DURAÇÃO', 'DF_Alcancada_Calculada (%)']].rename(columns={'DURAÇÃO': 'Tempo Total Parada (h)'})
+
+    return df_display_performance
+
+def principais_falhas_mcs(cubo, n=10):
+    """Pares (equipamento, causa) com maior tempo de parada, para o quadro MCS."""
+    return (
+        cubo.agregar(['EQUIPAMENTO', 'CAUSA'])[['Tempo_Total_Parada', 'Ocorrencias']]
+        .rename(columns={'Tempo_Total_Parada': 'Tempo_Parada'})
+        .reset_index()
+        .sort_values('Tempo_Parada', ascending=False)
+        .head(n)
+    )
+
+def top_equipamentos_criticos(cubo, n=10):
+    """Equipamento/frota/sistema/conjunto com maior tempo de parada e o item que mais falhou em cada um."""
+    niveis_top = ['EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO']
+    top_equipments = cubo.agregar(niveis_top)[['Tempo_Total_Parada', 'Ocorrencias']]
+    top_equipments['ITEM'] = cubo.mais_frequente(niveis_top, 'ITEM')
+    top_equipments = top_equipments.reset_index()
+
+    top_equipments.columns = ['EQUIPAMENTO', 'FROTA', 'SISTEMA', 'CONJUNTO', 'Tempo Total (h)', 'Ocorrências', 'Item Mais Frequente']
+    return top_equipments.sort_values('Tempo Total (h)', ascending=False).head(n)
+
+def falhas_mais_impactantes(df_falhas, n=20):
+    """As n falhas mais longas, classificadas em impacto Baixo/Médio/Alto."""
+    timeline_data = df_falhas.nlargest(n, 'DURAÇÃO').copy()
+    timeline_data['Impacto'] = pd.cut(
+        timeline_data['DURAÇÃO'],
+        bins=[0, 8, 24, float('inf')],
+        labels=['Baixo', 'Médio', 'Alto']
+    )
+    return timeline_data
+
+def kpis_hierarquia_relatorio(cubo, n=10):
+    """Top n de cada nível da hierarquia, no formato usado pelo relatório PDF."""
+    tabelas = {}
+    for nivel, col in [('Sistema', 'SISTEMA'), ('Conjunto', 'CONJUNTO'), ('Item', 'ITEM')]:
+        df_kpi = cubo.hierarquia.kpis(col)[['Tempo_Total_Parada', 'MTTR', 'Ocorrencias', 'Equip_Afetados']].head(n)
+        if not df_kpi.empty:
+            df_kpi.columns = ['Tempo Total (h)', 'MTTR (h)', 'Ocorrências', 'Equip. Afetados']
+            tabelas[nivel] = df_kpi
+    return tabelas
@@ -1,54 +1,150 @@
 # modules/utils.py
 
-import streamlit as st
 import pandas as pd
 import numpy as np
-from fpdf import FPDF
-import base64
 from io import BytesIO
+from collections import OrderedDict
+from operator import itemgetter
+import threading
+import time
 import warnings
 
 warnings.filterwarnings('ignore')
 
-# --- Funções de Carregamento e Recomendação do Banco de Conhecimento ---
+# --- Cache LRU em memória ---
 
-def carregar_banco_conhecimento():
-    """Carrega o banco de conhecimento de falhas, causas e soluções de 'banco_conhecimento.xlsx'."""
+def tamanho_em_bytes(valor):
+    """Estima a memória ocupada por DataFrames/Series/arrays (isolados ou dentro de tuplas, listas e dicionários)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict):
+        return sum(tamanho_em_bytes(v) for v in valor.values())
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho_em_bytes(v) for v in valor)
+    if isinstance(valor, np.ndarray) or hasattr(valor, 'nbytes'):
+        return int(valor.nbytes)
+    return 0
+
+class CacheLRU:
+    """Cache LRU compartilhado pelo processo, limitado por número de entradas e por tamanho total em bytes."""
+
+    def __init__(self, max_entradas=8, max_bytes=None, medir_tamanho=tamanho_em_bytes):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.medir_tamanho = medir_tamanho
+        self.acertos = 0
+        self.faltas = 0
+        self.total_bytes = 0
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, chave):
+        return chave in self._dados
+
+    def obter(self, chave, calcular):
+        """Retorna o valor da chave; em caso de falta, executa calcular() e armazena o resultado."""
+        with self._lock:
+            if chave in self._dados:
+                self._dados.move_to_end(chave)
+                self.acertos += 1
+                return self._dados[chave][0]
+
+        # O cálculo roda fora do lock para não bloquear outras sessões
+        valor = calcular()
+        tamanho = self.medir_tamanho(valor)
+
+        with self._lock:
+            self.faltas += 1
+            if chave in self._dados:
+                self.total_bytes -= self._dados.pop(chave)[1]
+            self._dados[chave] = (valor, tamanho)
+            self.total_bytes += tamanho
+            self._remover_excedentes()
+        return valor
+
+    def _remover_excedentes(self):
+        # Remove as entradas menos usadas recentemente, preservando sempre a mais nova
+        while len(self._dados) > 1 and (
+            len(self._dados) > self.max_entradas or
+            (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            _, (_, tamanho) = self._dados.popitem(last=False)
+            self.total_bytes -= tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+            self.total_bytes = 0
+
+    def resumo(self):
+        """Texto curto com acertos, faltas e ocupação, para exibição na barra lateral."""
+        return (f"{self.acertos} acertos / {self.faltas} faltas · "
+                f"{len(self._dados)} entradas · {self.total_bytes / 1024 ** 2:.1f} MB")
+
+# --- Leitura de Planilhas ---
+
+def ler_planilhas_xlsx(arquivo, colunas_por_aba, normalizadores=None):
+    """Lê várias abas de um .xlsx abrindo o arquivo uma única vez (openpyxl em modo read-only).
+
+    colunas_por_aba: {aba: colunas a manter, ou None para todas}. A seleção é feita
+    sobre o cabeçalho já normalizado por normalizadores[aba] (função sobre pd.Index),
+    de modo que as colunas descartadas nunca chegam a ser materializadas.
+
+    Retorna ({aba: DataFrame}, {aba: segundos de leitura}).
+    """
+    from openpyxl import load_workbook
+
+    normalizadores = normalizadores or {}
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = BytesIO(arquivo)
+
+    workbook = load_workbook(arquivo, read_only=True, data_only=True)
     try:
-        df_conhecimento = pd.read_excel("banco_conhecimento.xlsx", sheet_name="Falhas")
-        df_conhecimento['TipoFalha'] = df_conhecimento['TipoFalha'].str.lower().str.strip()
-        df_conhecimento['Causa'] = df_conhecimento['Causa'].str.lower().str.strip()
-        df_conhecimento['AcaoRecomendada'] = df_conhecimento['AcaoRecomendada'].astype(str)
-        return df_conhecimento
-    except Exception as e:
-        st.warning(f"Não foi possível carregar o banco de conhecimento (banco_conhecimento.xlsx): {str(e)}. Verifique se o arquivo está na pasta raiz do projeto.")
-        return pd.DataFrame(columns=['TipoFalha', 'Causa', 'AcaoRecomendada'])
-
-def gerar_recomendacao(causa, df_conhecimento):
-    """Gera recomendações baseadas no banco de conhecimento ou em padrões genéricos."""
-    causa = str(causa).lower().strip()
-    
-    recomendacoes = df_conhecimento[df_conhecimento['Causa'].str.contains(causa, case=False, na=False)]
-    
-    if not recomendacoes.empty:
-        return "\n".join([f"• {rec}" for rec in recomendacoes['AcaoRecomendada'].head(3).tolist()])
-    
-    padroes = {
-        "desgaste": "Implementar programa de lubrificação preventiva e inspeção periódica",
-        "vazamento": "Substituição programada de selos e juntas conforme vida útil",
-        "elétric": "Realizar termografia periódica e análise de vibração",
-        "hidráulic": "Monitoramento contínuo de pressão e vazão",
-        "corrosão": "Aplicação de proteção superficial e controle ambiental",
-        "sobreaquecimento": "Verificação do sistema de refrigeração e limpeza de radiadores",
-        "alinhamento": "Realizar alinhamento a laser trimestral",
-        "contaminaç": "Melhorar filtragem e controle de qualidade dos fluidos"
-    }
-    
-    for palavra_chave, acao in padroes.items():
-        if palavra_chave.lower() in causa:
-            return acao
-    
-    return "Realizar análise de causa raiz com a equipe técnica"
+        for aba in colunas_por_aba:
+            if aba not in workbook.sheetnames:
+                raise ValueError(f"A planilha '{aba}' não foi encontrada no arquivo Excel. Por favor, verifique o nome da aba.")
+
+        planilhas, tempos = {}, {}
+        for aba, colunas in colunas_por_aba.items():
+            inicio = time.perf_counter()
+            linhas = workbook[aba].iter_rows(values_only=True)
+
+            cabecalho = pd.Index([
+                str(nome) if nome is not None else f"Unnamed: {i}"
+                for i, nome in enumerate(next(linhas, ()))
+            ])
+            if aba in normalizadores:
+                cabecalho = normalizadores[aba](cabecalho)
+
+            posicoes = [i for i, nome in enumerate(cabecalho) if colunas is None or nome in colunas]
+            # Mantém a primeira ocorrência quando o cabeçalho tem nomes repetidos
+            vistos = set()
+            posicoes = [i for i in posicoes if not (cabecalho[i] in vistos or vistos.add(cabecalho[i]))]
+            nomes = [cabecalho[i] for i in posicoes]
+
+            if posicoes:
+                ultima = max(posicoes)
+                pegar = itemgetter(*posicoes) if len(posicoes) > 1 else (lambda linha: (linha[posicoes[0]],))
+                dados = [
+                    pegar(linha) if len(linha) > ultima
+                    else tuple(linha[i] if i < len(linha) else None for i in posicoes)
+                    for linha in linhas
+                ]
+            else:
+                dados = []
+
+            df = pd.DataFrame(dados, columns=nomes).dropna(how='all').reset_index(drop=True)
+            planilhas[aba] = df
+            tempos[aba] = time.perf_counter() - inicio
+    finally:
+        workbook.close()
+
+    return planilhas, tempos
 
 # --- Funções de Limpeza de Dados ---
 
@@ -65,111 +161,97 @@ def clean_duration(value):
     except:
         return np.nan
 
+# Formatos de duração aceitos além do número simples: "HH:MM[:SS]" e "1h30" / "1h30min"
+# (minutos e segundos de 0 a 59: "10:75" é rejeitado, não vira 11,25 h)
+_PADRAO_HH_MM = r'^(\d+):([0-5]?\d)(?::([0-5]?\d(?:\.\d+)?))?$'
+_PADRAO_H_MIN = r'^(\d+(?:\.\d+)?)\s*h\s*([0-5]?\d)\s*(?:min|m)?$'
+
+def _numeros_ou_nan(series):
+    """Converte para float; se algum valor não for numérico, recorre a pd.to_numeric com coerção."""
+    try:
+        return series.astype(float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(series, errors='coerce').astype(float)
+
+def _float_legado(valor):
+    # Mesma conversão final de clean_duration: float() do Python, que aceita "1_000" ao contrário de pd.to_numeric
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+def clean_duration_series(series):
+    """Versão vetorizada de clean_duration para uma coluna inteira (horas em float).
+
+    Aceita os mesmos valores que clean_duration (números, vírgula decimal, sufixo "h",
+    NaN, separador "_" de milhar) e também os formatos "HH:MM[:SS]" e "1h30"/"1h30min".
+    Onde clean_duration dá NaN ou trunca na hora ("1:30", "1h30", células de hora),
+    o resultado aqui é a duração completa; nos demais valores os dois coincidem.
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype(float)
+
+    # Caminho rápido: coluna só com células numéricas ou texto numérico simples
+    try:
+        return series.astype(float)
+    except (TypeError, ValueError):
+        pass
+
+    # Colunas de texto repetem poucos valores distintos: cada um é convertido uma vez só
+    codigos, valores = pd.factorize(series)
+    horas = _converter_duracoes(pd.Series(np.asarray(valores, dtype=object))).to_numpy()
+    # Código -1 (valor nulo) pega o NaN acrescentado no fim
+    return pd.Series(np.append(horas, np.nan)[codigos], index=series.index, name=series.name)
+
+def _converter_duracoes(series):
+    """Horas de cada valor de uma coluna object que não passou no caminho rápido de clean_duration_series."""
+    e_texto = series.map(type).eq(str)
+    horas = pd.to_numeric(series.where(~e_texto), errors='coerce').astype(float)
+
+    # Vírgula decimal e sufixo "h" ("5,5h", "7 H") resolvidos com duas passagens de texto
+    texto = series[e_texto].str.replace(',', '.', regex=False).str.rstrip(' hH')
+    horas[e_texto] = _numeros_ou_nan(texto)
+
+    # Sobram textos como "1:30", "1h30", "6 horas" e valores inválidos, além de
+    # objetos não numéricos (ex.: datetime.time de células formatadas como hora)
+    pendentes = horas.isna() & series.notna()
+    if not pendentes.any():
+        return horas
+
+    resto = series[pendentes].astype(str).str.replace(',', '.', regex=False).str.strip().str.lower()
+
+    hh_mm = resto.str.extract(_PADRAO_HH_MM).astype(float)
+    valor_hh_mm = hh_mm[0] + hh_mm[1] / 60 + hh_mm[2].fillna(0) / 3600
+
+    h_min = resto.str.extract(_PADRAO_H_MIN).astype(float)
+    valor_h_min = h_min[0] + h_min[1] / 60
+
+    # Regra original: tudo antes do primeiro "h" ("2h", "1.5 horas"), convertido como em clean_duration
+    antes_do_h = resto.str.split('h', n=1).str[0]
+    valor_legado = antes_do_h.map({valor: _float_legado(valor) for valor in antes_do_h.unique()}).astype(float)
+
+    horas[pendentes] = valor_hh_mm.fillna(valor_h_min).fillna(valor_legado)
+    return horas
+
 def clean_and_convert_column(series):
-    """Limpa e converte uma coluna para string consistente."""
-    return series.astype(str).str.strip()
-
-# --- Funções de Geração de Relatórios PDF ---
-
-class PDFReport(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'Relatório de Análise de Manutenção', 0, 1, 'C')
-        self.ln(5)
-    
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-
-def create_download_link(val, filename):
-    b64 = base64.b64encode(val)
-    return f'<a href="data:application/octet-stream;base64,{b64.decode()}" download="{filename}">Download Relatório PDF</a>'
-
-def generate_pdf_report(df, top_equipments, timeline_data, kpis_hierarquia, df_conhecimento):
-    pdf = PDFReport()
-    pdf.add_page()
-    pdf.set_font('Arial', 'B', 16)
-    pdf.cell(0, 10, 'Relatório de Análise de Manutenção', 0, 1, 'C')
-    pdf.ln(10)
-    
-    if not top_equipments.empty:
-        pdf.set_font('Arial', 'B', 14)
-        pdf.cell(0, 10, 'Top 10 Equipamentos Críticos', 0, 1)
-        pdf.ln(5)
-        
-        pdf.set_font('Arial', '', 10)
-        col_widths = [30, 25, 25, 25, 25, 25]
-        headers = ['Equipamento', 'Frota', 'Tempo Total (h)', 'Falhas', 'Sistema', 'Conjunto']
-        
-        for i, header in enumerate(headers):
-            pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-        pdf.ln()
-        
-        for _, row in top_equipments.iterrows():
-            pdf.cell(col_widths[0], 10, str(row['EQUIPAMENTO']), 1)
-            pdf.cell(col_widths[1], 10, str(row['FROTA']), 1)
-            pdf.cell(col_widths[2], 10, f"{row['Tempo Total (h)']:.1f}", 1, 0, 'C')
-            pdf.cell(col_widths[3], 10, str(row['Ocorrências']), 1, 0, 'C')
-            pdf.cell(col_widths[4], 10, str(row['SISTEMA']), 1)
-            pdf.cell(col_widths[5], 10, str(row['CONJUNTO']), 1)
-            pdf.ln()
-    
-    pdf.add_page()
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, 'Análise Hierárquica de Falhas', 0, 1)
-    pdf.ln(5)
-    
-    for nivel, df_kpi in kpis_hierarquia.items():
-        if not df_kpi.empty:
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, f'Nível: {nivel}', 0, 1)
-            pdf.ln(3)
-            
-            pdf.set_font('Arial', '', 10)
-            col_widths = [50, 25, 25, 25, 25]
-            headers = [nivel, 'Tempo Total (h)', 'MTTR (h)', 'Ocorrências', 'Equip. Afetados']
-            
-            for i, header in enumerate(headers):
-                pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-            pdf.ln()
-            
-            for _, row in df_kpi.iterrows():
-                pdf.cell(col_widths[0], 10, str(row.name), 1)
-                pdf.cell(col_widths[1], 10, f"{row['Tempo Total (h)']:.1f}", 1, 0, 'C')
-                pdf.cell(col_widths[2], 10, f"{row['MTTR (h)']:.1f}", 1, 0, 'C')
-                pdf.cell(col_widths[3], 10, str(row['Ocorrências']), 1, 0, 'C')
-                pdf.cell(col_widths[4], 10, str(row['Equip. Afetados']), 1, 0, 'C')
-                pdf.ln()
-            pdf.ln(10)
-    
-    pdf.add_page()
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, 'Linha do Tempo das Falhas Mais Impactantes', 0, 1)
-    pdf.ln(5)
-    
-    if not timeline_data.empty:
-        pdf.set_font('Arial', '', 10)
-        for _, event in timeline_data.iterrows():
-            pdf.set_fill_color(200, 220, 255)
-            pdf.cell(0, 10, f"{event['DATA INICIAL'].strftime('%d/%m/%Y')} - {event['EQUIPAMENTO']}", 1, 1, 'L', 1)
-            pdf.cell(0, 8, f"Sistema: {event['SISTEMA']} > Conjunto: {event['CONJUNTO']} > Item: {event['ITEM']}", 0, 1)
-            pdf.cell(0, 8, f"Falha: {event['CAUSA']}", 0, 1)
-            pdf.cell(0, 8, f"Duração: {event['DURAÇÃO']} horas | Impacto: {event['Impacto']}", 0, 1)
-            pdf.ln(3)
-    
-    pdf.add_page()
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, 'Recomendações Prioritárias', 0, 1)
-    pdf.ln(5)
-    
-    if not timeline_data.empty:
-        causas = timeline_data['CAUSA'].value_counts().nlargest(5)
-        for i, (causa, _) in enumerate(causas.items(), 1):
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, f"{i}. {causa}", 0, 1)
-            pdf.set_font('Arial', '', 10)
-            pdf.multi_cell(0, 8, gerar_recomendacao(causa, df_conhecimento))
-            pdf.ln(3)
-    
-    return pdf.output(dest='S').encode('latin1')
\ No newline at end of file
+    """Limpa e converte uma coluna para texto consistente, codificada como category.
+
+    As categorias ficam em ordem alfabética, de modo que o mesmo conjunto de valores
+    sempre produz o mesmo dicionário. A limpeza (str/strip) é feita só sobre os
+    valores distintos, não sobre cada linha.
+    """
+    codigos, valores = pd.factorize(series, use_na_sentinel=False)
+    valores = pd.Index(valores).astype(str).str.strip()
+    categorias = pd.Index(valores.unique()).sort_values()
+    codigos = categorias.get_indexer(valores)[codigos]
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=categorias), index=series.index, name=series.name)
+
+def unificar_categorias(frames, colunas):
+    """Faz a coluna usar o mesmo dicionário ordenado de categorias em todos os DataFrames (altera in place)."""
+    for col in colunas:
+        presentes = [df for df in frames if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)]
+        if not presentes:
+            continue
+        categorias = pd.Index(sorted(set().union(*(df[col].cat.categories for df in presentes))))
+        for df in presentes:
+            df[col] = df[col].cat.set_categories(categorias)
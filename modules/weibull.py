@@ -0,0 +1,368 @@
+# modules/weibull.py
+
+import hashlib
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import CacheLRU
+
+# Métodos de ajuste disponíveis: MLE próprio em NumPy ou lifelines.WeibullFitter (mais lento para importar e ajustar)
+METODOS_AJUSTE = ('numpy', 'lifelines')
+
+class AjusteWeibull:
+    """Weibull ajustada por máxima verossimilhança: R(t) = exp(-((t - gama) / eta) ** beta), t >= gama.
+
+    beta (forma) e eta (vida característica) correspondem a rho_ e lambda_ do lifelines.WeibullFitter;
+    a localização gama só é diferente de 0 no ajuste de 3 parâmetros (ajustar_weibull_3p).
+    n conta todos os tempos, inclusive os n_censurados (unidades ainda operando no fim da observação).
+    """
+
+    def __init__(self, beta, eta, n, metodo, iteracoes=None, gama=0.0, n_censurados=0):
+        self.beta = float(beta)
+        self.eta = float(eta)
+        self.gama = float(gama)
+        self.n = int(n)
+        self.n_censurados = int(n_censurados)
+        self.metodo = metodo
+        self.iteracoes = iteracoes
+
+    def __repr__(self):
+        gama = f", gama={self.gama:.4f}" if self.gama else ""
+        censurados = f", n_censurados={self.n_censurados}" if self.n_censurados else ""
+        return (f"AjusteWeibull(beta={self.beta:.4f}, eta={self.eta:.4f}{gama}, n={self.n}{censurados}, "
+                f"metodo='{self.metodo}')")
+
+    def confiabilidade(self, t):
+        """R(t): probabilidade de não falhar até t."""
+        return np.exp(-(np.maximum(np.asarray(t, dtype=float) - self.gama, 0) / self.eta) ** self.beta)
+
+def validar_tempos(tempos, censurados=None):
+    """Tempos (float) e máscara de falhas observadas, sem NaN; censurados=None: nenhum tempo censurado.
+
+    Lança ValueError se houver menos de 2 falhas, tempos não positivos ou falhas todas iguais.
+    """
+    tempos = np.asarray(tempos, dtype=float).ravel()
+    falhas = np.ones(len(tempos), dtype=bool) if censurados is None else ~np.asarray(censurados, dtype=bool).ravel()
+    validos = ~np.isnan(tempos)
+    tempos, falhas = tempos[validos], falhas[validos]
+    if falhas.sum() < 2:
+        raise ValueError("Número insuficiente de dados (mínimo 2 registros) para realizar a análise de confiabilidade.")
+    if not np.isfinite(tempos).all() or (tempos <= 0).any():
+        raise ValueError("Os tempos entre falhas devem ser números positivos.")
+    if tempos[falhas].min() == tempos[falhas].max():
+        raise ValueError("Os tempos entre falhas são todos iguais: a forma da Weibull não pode ser estimada.")
+    return tempos, falhas
+
+def _mle_numpy(tempos, falhas, tol=1e-10, max_iter=100):
+    """MLE com censura à direita: Newton sobre a equação de perfil da forma, com eta em forma fechada.
+
+    Com r falhas entre os n tempos (os demais censurados), para beta fixo eta = (sum(t ** beta) / r) ** (1 / beta),
+    somando todos os tempos, e beta é a raiz (única) de
+        g(beta) = sum(t^b ln t) / sum(t^b) - 1 / beta - (soma de ln t das falhas) / r,
+    função crescente. Sem censura é o MLE usual. Os tempos são divididos pelo maior deles para
+    t ** beta não estourar.
+    """
+    escala = tempos.max()
+    log_t = np.log(tempos / escala)  # <= 0
+    log_falhas = log_t[falhas]
+    r = len(log_falhas)
+    media_log = log_falhas.mean()
+
+    # Chute inicial pelos momentos de ln t das falhas (Menon): desvio de ln t = pi / (beta * sqrt(6))
+    beta = np.pi / (np.sqrt(6) * log_falhas.std())
+    baixo, alto = 0.0, np.inf  # intervalo que contém a raiz, para proteger o passo de Newton
+
+    for iteracao in range(1, max_iter + 1):
+        pesos = np.exp(beta * log_t)
+        s0 = pesos.sum()
+        s1 = pesos @ log_t
+        s2 = pesos @ (log_t * log_t)
+        g = s1 / s0 - 1 / beta - media_log
+        derivada = (s2 * s0 - s1 * s1) / (s0 * s0) + 1 / (beta * beta)
+
+        if g > 0:
+            alto = beta
+        else:
+            baixo = beta
+        novo = beta - g / derivada
+        if not (baixo < novo < alto):
+            novo = (baixo + alto) / 2 if np.isfinite(alto) else 2 * beta
+        if abs(novo - beta) <= tol * beta:
+            beta = novo
+            break
+        beta = novo
+
+    eta = escala * (np.exp(beta * log_t).sum() / r) ** (1 / beta)
+    return beta, eta, iteracao
+
+def _mle_lifelines(tempos, falhas):
+    from lifelines import WeibullFitter
+
+    wf = WeibullFitter().fit(tempos, event_observed=falhas)
+    return wf.rho_, wf.lambda_
+
+def ajustar_weibull(tempos, metodo='numpy', censurados=None):
+    """Ajusta a Weibull de 2 parâmetros aos tempos entre falhas (sem cache).
+
+    censurados: máscara booleana alinhada com os tempos (True: a unidade ainda operava no fim da
+    observação; o tempo é um limite inferior da vida). NaN são ignorados; lança ValueError como
+    validar_tempos.
+    """
+    if metodo not in METODOS_AJUSTE:
+        raise ValueError(f"Método de ajuste desconhecido: {metodo}. Use um de {METODOS_AJUSTE}.")
+    tempos, falhas = validar_tempos(tempos, censurados)
+    n_censurados = len(tempos) - int(falhas.sum())
+    if metodo == 'lifelines':
+        beta, eta = _mle_lifelines(tempos, falhas)
+        return AjusteWeibull(beta, eta, len(tempos), metodo, n_censurados=n_censurados)
+    beta, eta, iteracoes = _mle_numpy(tempos, falhas)
+    return AjusteWeibull(beta, eta, len(tempos), metodo, iteracoes, n_censurados=n_censurados)
+
+def _perfil_gama(tempos, falhas, gamas, max_elementos=4_000_000):
+    """beta, eta e log-verossimilhança do ajuste de 2 parâmetros a tempos - gama, para cada gama.
+
+    Cada candidato é um grupo de _mle_numpy_grupos; os candidatos são processados em blocos para
+    a matriz candidatos × tempos não passar de max_elementos. Tempos censurados até gama ficam fora
+    do grupo: antes da localização R = 1 e eles não contribuem para a verossimilhança.
+    """
+    n, r = len(tempos), int(falhas.sum())
+    por_bloco = max(1, max_elementos // n)
+    betas, etas, verossimilhancas = [], [], []
+    for inicio in range(0, len(gamas), por_bloco):
+        bloco = gamas[inicio:inicio + por_bloco]
+        x = tempos[None, :] - bloco[:, None]
+        validos = x > 0
+        escala = x.max(axis=1)
+        contagens = validos.sum(axis=1)
+        inicios = np.r_[0, np.cumsum(contagens)[:-1]]
+        if validos.all():
+            log_x, falhas_bloco = np.log(x / escala[:, None]).ravel(), np.tile(falhas, len(bloco))
+        else:
+            log_x, falhas_bloco = np.log((x / escala[:, None])[validos]), np.broadcast_to(falhas, x.shape)[validos]
+        beta, s0 = _mle_numpy_grupos(log_x, inicios, contagens, falhas_bloco)
+        log_eta = np.log(escala) + np.log(s0 / r) / beta
+        soma_log_x = np.log(x[:, falhas]).sum(axis=1)
+        # Log-verossimilhança no ótimo: sum((x / eta) ** beta) = r
+        betas.append(beta)
+        etas.append(np.exp(log_eta))
+        verossimilhancas.append(r * np.log(beta) - r * beta * log_eta + (beta - 1) * soma_log_x - r)
+    return np.concatenate(betas), np.concatenate(etas), np.concatenate(verossimilhancas)
+
+def ajustar_weibull_3p(tempos, n_candidatos=32, censurados=None):
+    """Weibull de 3 parâmetros (localização gama em [0, menor tempo de falha)) por verossimilhança perfilada.
+
+    Para cada gama candidato a Weibull de 2 parâmetros de t - gama é ajustada (todos os candidatos
+    de uma vez) e fica o de maior log-verossimilhança; a busca é refinada uma vez entre os vizinhos
+    do melhor. Candidatos com beta < 1 são descartados: com eles a verossimilhança cresce sem limite
+    quando gama se aproxima do menor tempo. Se só sobrar gama = 0, o resultado é o ajuste de 2 parâmetros.
+    Tempos censurados menores que gama são permitidos (a unidade saiu de observação antes de poder falhar).
+    """
+    tempos, falhas = validar_tempos(tempos, censurados)
+    menor = tempos[falhas].min()
+    # Frações do menor tempo, mais densas perto dele, onde a verossimilhança varia mais
+    fracoes = 1 - np.geomspace(1, 1e-4, n_candidatos)
+
+    for refinamento in range(2):
+        beta, eta, verossimilhanca = _perfil_gama(tempos, falhas, fracoes * menor)
+        aceitos = np.flatnonzero((beta >= 1) | (fracoes == 0))
+        melhor = aceitos[np.argmax(verossimilhanca[aceitos])]
+        if refinamento == 0:
+            vizinhos = fracoes[max(melhor - 1, 0)], fracoes[min(melhor + 1, len(fracoes) - 1)]
+            fracoes = np.union1d(np.linspace(*vizinhos, n_candidatos), [fracoes[melhor]])
+
+    return AjusteWeibull(beta[melhor], eta[melhor], len(tempos), 'numpy', gama=fracoes[melhor] * menor,
+                         n_censurados=len(tempos) - int(falhas.sum()))
+
+# Colunas da tabela de ajustes por grupo, além das colunas de agrupamento
+COLUNAS_AJUSTE_GRUPO = ['Amostras', 'Censurados', 'Beta', 'Eta', 'Beta_Inf', 'Beta_Sup', 'Eta_Inf', 'Eta_Sup']
+
+def _somas_por_grupo(valores, inicios):
+    return np.add.reduceat(valores, inicios) if len(valores) else np.zeros(0)
+
+def _mle_numpy_grupos(log_t, inicios, contagens, falhas, tol=1e-10, max_iter=100):
+    """Mesmo Newton de _mle_numpy, feito de uma vez para todos os grupos.
+
+    log_t: ln(t / maior t do grupo), com as linhas agrupadas de forma contígua a partir de `inicios`;
+    falhas: máscara das linhas que são falhas (as demais são censuradas). Cada iteração são somas
+    segmentadas (reduceat) sobre o array inteiro; grupos já convergidos seguem no cálculo, mas seu
+    passo é nulo. Retorna beta e sum((t / maior t) ** beta) por grupo.
+    """
+    r = _somas_por_grupo(falhas.astype(float), inicios)
+    media_log = _somas_por_grupo(log_t * falhas, inicios) / r
+    desvio = np.sqrt(_somas_por_grupo(falhas * (log_t - np.repeat(media_log, contagens)) ** 2, inicios) / r)
+    beta = np.pi / (np.sqrt(6) * desvio)
+    baixo, alto = np.zeros_like(beta), np.full_like(beta, np.inf)
+
+    for _ in range(max_iter):
+        pesos = np.exp(np.repeat(beta, contagens) * log_t)
+        s0 = _somas_por_grupo(pesos, inicios)
+        s1 = _somas_por_grupo(pesos * log_t, inicios)
+        s2 = _somas_por_grupo(pesos * log_t * log_t, inicios)
+        g = s1 / s0 - 1 / beta - media_log
+        derivada = (s2 * s0 - s1 * s1) / (s0 * s0) + 1 / (beta * beta)
+
+        alto = np.where(g > 0, beta, alto)
+        baixo = np.where(g > 0, baixo, beta)
+        novo = beta - g / derivada
+        fora = ~((novo > baixo) & (novo < alto))
+        novo[fora] = np.where(np.isfinite(alto), (baixo + alto) / 2, 2 * beta)[fora]
+        convergiu = np.abs(novo - beta) <= tol * beta
+        beta = novo
+        if convergiu.all():
+            break
+
+    return beta, _somas_por_grupo(np.exp(np.repeat(beta, contagens) * log_t), inicios)
+
+def ajustar_weibull_por_grupo(df, colunas_grupo, coluna_tempo='Tempo entre falhas (h)', nivel_confianca=0.95,
+                              coluna_censura=None):
+    """Weibull de 2 parâmetros ajustada a cada grupo de `colunas_grupo` (ex.: EQUIPAMENTO × ITEM).
+
+    Todos os grupos são resolvidos juntos por um Newton vetorizado (ver _mle_numpy_grupos), sem um
+    ajuste por grupo. Os intervalos de confiança são assintóticos, pela informação de Fisher
+    observada, e calculados em escala log (nunca ficam negativos). coluna_censura (opcional) marca
+    com True os tempos censurados à direita.
+
+    Retorna um DataFrame com as colunas de agrupamento e COLUNAS_AJUSTE_GRUPO, uma linha por grupo.
+    Tempos vazios ou não positivos são ignorados; grupos com menos de 2 falhas, ou com as falhas
+    todas iguais, ficam com beta/eta NaN.
+    """
+    colunas_grupo = list(colunas_grupo)
+    agrupado = df.groupby(colunas_grupo, observed=True, sort=True)
+    codigos = agrupado.ngroup().to_numpy()
+    tabela = agrupado.size().index.to_frame(index=False)
+
+    tempos = pd.to_numeric(df[coluna_tempo], errors='coerce').to_numpy(dtype=float)
+    falhas = np.ones(len(df), dtype=bool) if coluna_censura is None else ~df[coluna_censura].to_numpy(dtype=bool)
+    validos = (codigos >= 0) & np.isfinite(tempos) & (tempos > 0)
+    codigos, tempos, falhas = codigos[validos], tempos[validos], falhas[validos]
+    ordem = np.lexsort((tempos, codigos))
+    codigos, tempos, falhas = codigos[ordem], tempos[ordem], falhas[ordem]
+
+    # Com as linhas em ordem de (grupo, tempo), o maior tempo de cada grupo é o último
+    amostras = np.bincount(codigos, minlength=len(tabela))
+    n_falhas = np.bincount(codigos[falhas], minlength=len(tabela))
+    fins = np.cumsum(amostras)
+    maximos = np.where(amostras > 0, tempos[np.maximum(fins - 1, 0)] if len(tempos) else 0, np.nan)
+    menor_falha = np.full(len(tabela), np.inf)
+    maior_falha = np.full(len(tabela), -np.inf)
+    np.minimum.at(menor_falha, codigos[falhas], tempos[falhas])
+    np.maximum.at(maior_falha, codigos[falhas], tempos[falhas])
+    ajustaveis = (n_falhas >= 2) & (menor_falha < maior_falha)
+
+    linhas = ajustaveis[codigos]
+    contagens = amostras[ajustaveis]
+    r = n_falhas[ajustaveis]
+    escala = maximos[ajustaveis]
+    log_t = np.log(tempos[linhas] / np.repeat(escala, contagens))
+    inicios_ajuste = np.cumsum(contagens) - contagens
+    beta, s0 = _mle_numpy_grupos(log_t, inicios_ajuste, contagens, falhas[linhas])
+    eta = escala * (s0 / r) ** (1 / beta)
+
+    # Informação de Fisher observada no ótimo, com z = (t / eta) ** beta (soma r no ótimo, sobre todos
+    # os tempos) e u = ln(t / eta); sem censura, r = n
+    u = log_t - np.repeat(np.log(eta / escala), contagens)
+    z = np.exp(np.repeat(beta, contagens) * u)
+    info_bb = r / beta ** 2 + _somas_por_grupo(z * u * u, inicios_ajuste)
+    info_ee = r * beta ** 2 / eta ** 2
+    info_be = -(beta / eta) * _somas_por_grupo(z * u, inicios_ajuste)
+    determinante = info_bb * info_ee - info_be ** 2
+    erro_log_beta = np.sqrt(info_ee / determinante) / beta
+    erro_log_eta = np.sqrt(info_bb / determinante) / eta
+    quantil = NormalDist().inv_cdf(0.5 + nivel_confianca / 2)
+
+    tabela['Amostras'] = amostras
+    tabela['Censurados'] = amostras - n_falhas
+    for coluna, valores in {
+        'Beta': beta,
+        'Eta': eta,
+        'Beta_Inf': beta * np.exp(-quantil * erro_log_beta),
+        'Beta_Sup': beta * np.exp(quantil * erro_log_beta),
+        'Eta_Inf': eta * np.exp(-quantil * erro_log_eta),
+        'Eta_Sup': eta * np.exp(quantil * erro_log_eta),
+    }.items():
+        tabela[coluna] = np.nan
+        tabela.loc[ajustaveis, coluna] = valores
+    return tabela
+
+# Ajustes já feitos, compartilhados por todas as sessões e indexados pelo hash dos tempos:
+# reexecuções da página (qualquer widget) não reajustam a mesma amostra
+_cache_ajustes = CacheLRU(max_entradas=64)
+
+def chave_tempos(tempos, censurados=None):
+    """Hash do conteúdo do array de tempos (float64) e da máscara de censura, usado como chave de cache."""
+    hash_ = hashlib.blake2b(np.ascontiguousarray(tempos, dtype=np.float64).ravel().tobytes(), digest_size=16)
+    if censurados is not None:
+        hash_.update(np.ascontiguousarray(censurados, dtype=bool).ravel().tobytes())
+    return hash_.hexdigest()
+
+def ajustar_weibull_em_cache(tempos, metodo='numpy', censurados=None):
+    """ajustar_weibull com cache por (hash dos tempos e da censura, método)."""
+    return _cache_ajustes.obter(
+        (chave_tempos(tempos, censurados), metodo), lambda: ajustar_weibull(tempos, metodo, censurados)
+    )
+
+def ajustar_weibull_por_grupo_em_cache(df, colunas_grupo, coluna_tempo='Tempo entre falhas (h)', nivel_confianca=0.95,
+                                       coluna_censura=None):
+    """ajustar_weibull_por_grupo com cache pelo hash das colunas usadas."""
+    colunas_grupo = list(colunas_grupo)
+    colunas = [*colunas_grupo, coluna_tempo] + ([coluna_censura] if coluna_censura else [])
+    hashes = pd.util.hash_pandas_object(df[colunas], index=False).to_numpy()
+    chave = (hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest(), tuple(colunas), nivel_confianca)
+    return _cache_ajustes.obter(
+        chave, lambda: ajustar_weibull_por_grupo(df, colunas_grupo, coluna_tempo, nivel_confianca, coluna_censura)
+    )
+
+# --- Tempos entre falhas a partir do histórico ---
+
+COLUNAS_TEMPOS_ENTRE_FALHAS = ['FROTA', 'EQUIPAMENTO', 'SISTEMA', 'CONJUNTO', 'ITEM']
+
+def tempos_entre_falhas(df_falhas, fim_periodo=None, colunas_grupo=('EQUIPAMENTO', 'ITEM')):
+    """Tempos entre falhas (h) de cada grupo, derivados de DATA INICIAL/DATA FINAL da planilha 'Falhas'.
+
+    Em cada grupo, ordenado por DATA INICIAL, o tempo até a falha é o intervalo entre o fim do
+    reparo anterior (o maior DATA FINAL até ali, para tolerar registros sobrepostos) e o início da
+    falha. O último intervalo, do fim do último reparo até fim_periodo (padrão: o maior DATA FINAL
+    da planilha), é censurado à direita: a unidade ainda operava quando a observação terminou.
+    O período antes da primeira falha não entra, pois seu início é desconhecido. Falhas que começam
+    depois de fim_periodo são ignoradas, e intervalos não positivos (sobreposições) descartados.
+
+    Tudo é feito com operações vetorizadas sobre os grupos ordenados, sem laços por grupo.
+    Retorna um DataFrame com as COLUNAS_TEMPOS_ENTRE_FALHAS presentes (da falha que encerra o
+    intervalo, ou da última falha no caso censurado), 'Tempo entre falhas (h)' e 'Censurado';
+    sem linhas quando a planilha está vazia ou não tem nenhum DATA FINAL (sem fim_periodo).
+    """
+    colunas_grupo = list(colunas_grupo)
+    inicio = df_falhas['DATA INICIAL'].to_numpy(dtype='datetime64[ns]')
+    final = df_falhas['DATA FINAL'].to_numpy(dtype='datetime64[ns]')
+    if fim_periodo is not None:
+        fim = np.datetime64(pd.Timestamp(fim_periodo), 'ns')
+    else:
+        # Sem nenhum DATA FINAL o fim é NaT e nenhuma linha passa pelo filtro abaixo
+        fim = final.max() if len(final) else np.datetime64('NaT', 'ns')
+
+    codigos = df_falhas.groupby(colunas_grupo, observed=True, sort=False).ngroup().to_numpy()
+    posicoes = np.flatnonzero((codigos >= 0) & ~np.isnat(inicio) & ~np.isnat(final) & (inicio <= fim))
+    posicoes = posicoes[np.lexsort((inicio[posicoes], codigos[posicoes]))]
+    codigos, inicio, final = codigos[posicoes], inicio[posicoes], np.minimum(final[posicoes], fim)
+
+    # Fim do último reparo até cada linha, dentro do grupo (máximo acumulado segmentado)
+    fim_reparos = pd.Series(final).groupby(codigos).cummax().to_numpy(dtype='datetime64[ns]')
+    mesmo_grupo = codigos[1:] == codigos[:-1]
+    ultima_do_grupo = np.r_[~mesmo_grupo, True] if len(codigos) else np.zeros(0, dtype=bool)
+
+    horas_ate_falha = (inicio[1:] - fim_reparos[:-1]) / np.timedelta64(1, 'h')
+    intervalos = np.flatnonzero(mesmo_grupo) + 1
+    horas_censuradas = (fim - fim_reparos[ultima_do_grupo]) / np.timedelta64(1, 'h')
+
+    linhas = np.concatenate([posicoes[intervalos], posicoes[ultima_do_grupo]])
+    horas = np.concatenate([horas_ate_falha[intervalos - 1], horas_censuradas])
+    censurado = np.r_[np.zeros(len(intervalos), dtype=bool), np.ones(len(horas_censuradas), dtype=bool)]
+    positivos = horas > 0
+
+    colunas = [col for col in COLUNAS_TEMPOS_ENTRE_FALHAS if col in df_falhas.columns]
+    tabela = df_falhas[colunas].take(linhas[positivos]).reset_index(drop=True)
+    tabela['Tempo entre falhas (h)'] = horas[positivos]
+    tabela['Censurado'] = censurado[positivos]
+    return tabela
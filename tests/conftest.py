@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import sys
+from pathlib import Path
+
+# Os testes importam os módulos do app (modules.*) a partir da raiz do repositório
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,139 @@
+# tests/test_distribuicoes.py
+
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.optimize import minimize
+
+from modules.distribuicoes import Exponencial, Lognormal, Weibull, ajustar_distribuicoes, tabela_aic
+
+# Cada distribuição do módulo e a equivalente do scipy.stats
+PARES = [
+    (Weibull(1.7, 120.0), stats.weibull_min(1.7, scale=120.0)),
+    (Weibull(0.6, 40.0), stats.weibull_min(0.6, scale=40.0)),
+    (Weibull(2.5, 300.0, gama=50.0, tres_parametros=True), stats.weibull_min(2.5, loc=50.0, scale=300.0)),
+    (Exponencial(75.0), stats.expon(scale=75.0)),
+    (Lognormal(4.0, 0.8), stats.lognorm(0.8, scale=np.exp(4.0))),
+    (Lognormal(1.0, 2.5), stats.lognorm(2.5, scale=np.exp(1.0))),
+]
+IDS = ['weibull', 'weibull_infantil', 'weibull_3p', 'exponencial', 'lognormal', 'lognormal_dispersa']
+
+def _amostra(distribuicao, n, seed=0, censura=False):
+    """Amostra do scipy.stats e, com censura, limites de observação uniformes até o percentil 90."""
+    rng = np.random.default_rng(seed)
+    tempos = distribuicao.rvs(n, random_state=rng)
+    if not censura:
+        return tempos, None
+    limites = rng.uniform(0, distribuicao.ppf(0.9), n)
+    return np.minimum(tempos, limites), tempos > limites
+
+def _log_verossimilhanca_scipy(distribuicao, tempos, censurados):
+    if censurados is None:
+        return distribuicao.logpdf(tempos).sum()
+    return distribuicao.logpdf(tempos[~censurados]).sum() + distribuicao.logsf(tempos[censurados]).sum()
+
+def _no_scipy(distribuicao):
+    """A distribuição ajustada como objeto do scipy.stats."""
+    if isinstance(distribuicao, Weibull):
+        return stats.weibull_min(distribuicao.beta, loc=distribuicao.gama, scale=distribuicao.eta)
+    if isinstance(distribuicao, Exponencial):
+        return stats.expon(scale=distribuicao.mtbf)
+    return stats.lognorm(distribuicao.sigma, scale=np.exp(distribuicao.mu))
+
+@pytest.mark.parametrize('propria, referencia', PARES, ids=IDS)
+def test_curvas_iguais_ao_scipy(propria, referencia):
+    t = referencia.ppf(np.linspace(0.001, 0.999, 400))
+    assert propria.confiabilidade(t) == pytest.approx(referencia.sf(t), rel=1e-9, abs=1e-12)
+    assert propria.risco_acumulado(t) == pytest.approx(-referencia.logsf(t), rel=1e-9)
+    assert propria.log_densidade(t) == pytest.approx(referencia.logpdf(t), rel=1e-9, abs=1e-9)
+    assert propria.taxa_falha(t) == pytest.approx(referencia.pdf(t) / referencia.sf(t), rel=1e-7)
+    p = np.array([0.01, 0.10, 0.50, 0.90])
+    assert propria.vida_b(p) == pytest.approx(referencia.ppf(p), rel=1e-9)
+
+@pytest.mark.parametrize('censura', [False, True], ids=['sem_censura', 'com_censura'])
+@pytest.mark.parametrize('propria, referencia', PARES, ids=IDS)
+def test_log_verossimilhanca_igual_ao_scipy(propria, referencia, censura):
+    tempos, censurados = _amostra(referencia, 300, censura=censura)
+    assert propria.log_verossimilhanca(tempos, censurados) == pytest.approx(
+        _log_verossimilhanca_scipy(referencia, tempos, censurados), rel=1e-9
+    )
+
+def test_ajustes_sem_censura_iguais_ao_fit_do_scipy():
+    tempos, _ = _amostra(stats.lognorm(0.7, scale=200.0), 800, seed=1)
+    weibull, _, exponencial, lognormal = ajustar_distribuicoes(tempos)
+
+    beta, _, eta = stats.weibull_min.fit(tempos, floc=0)
+    assert (weibull.beta, weibull.eta) == pytest.approx((beta, eta), rel=1e-4)
+    _, escala = stats.expon.fit(tempos, floc=0)
+    assert exponencial.mtbf == pytest.approx(escala, rel=1e-9)
+    sigma, _, escala = stats.lognorm.fit(tempos, floc=0)
+    assert (lognormal.mu, lognormal.sigma) == pytest.approx((np.log(escala), sigma), rel=1e-6)
+
+def test_lognormal_censurada_no_maximo_da_verossimilhanca():
+    referencia = stats.lognorm(0.9, scale=150.0)
+    tempos, censurados = _amostra(referencia, 1000, seed=2, censura=True)
+    lognormal = ajustar_distribuicoes(tempos, censurados)[3]
+
+    # Máximo encontrado por Nelder-Mead sobre a verossimilhança do scipy.stats, sem gradiente
+    def menos_log_verossimilhanca(parametros):
+        mu, log_sigma = parametros
+        return -_log_verossimilhanca_scipy(stats.lognorm(np.exp(log_sigma), scale=np.exp(mu)), tempos, censurados)
+    mu, log_sigma = minimize(menos_log_verossimilhanca, [5.0, 0.0], method='Nelder-Mead',
+                             options={'xatol': 1e-9, 'fatol': 1e-12, 'maxiter': 5000}).x
+    assert (lognormal.mu, lognormal.sigma) == pytest.approx((mu, np.exp(log_sigma)), rel=1e-4)
+    assert lognormal.log_verossimilhanca(tempos, censurados) >= -menos_log_verossimilhanca([mu, log_sigma]) - 1e-6
+
+def test_exponencial_censurada_tempo_total_por_falha():
+    tempos, censurados = _amostra(stats.expon(scale=60.0), 500, seed=3, censura=True)
+    exponencial = ajustar_distribuicoes(tempos, censurados)[2]
+    resultado = minimize(lambda p: -_log_verossimilhanca_scipy(stats.expon(scale=p[0]), tempos, censurados),
+                         [30.0], method='Nelder-Mead', options={'xatol': 1e-9, 'fatol': 1e-12})
+    assert exponencial.mtbf == pytest.approx(resultado.x[0], rel=1e-5)
+
+@pytest.mark.parametrize('censura', [False, True], ids=['sem_censura', 'com_censura'])
+def test_tabela_aic_igual_a_formula(censura):
+    tempos, censurados = _amostra(stats.weibull_min(1.4, scale=90.0), 400, seed=4, censura=censura)
+    distribuicoes = ajustar_distribuicoes(tempos, censurados)
+    tabela = tabela_aic(distribuicoes, tempos, censurados).set_index('Distribuição')
+    for distribuicao in distribuicoes:
+        ln_l = _log_verossimilhanca_scipy(_no_scipy(distribuicao), tempos, censurados)
+        assert tabela.loc[distribuicao.nome, 'AIC'] == pytest.approx(2 * distribuicao.n_parametros - 2 * ln_l, rel=1e-9)
+    assert tabela['ΔAIC'].iloc[0] == 0
+    assert tabela['AIC'].is_monotonic_increasing
+
+# Amostras grandes de uma família conhecida: o AIC deve apontar essa família (ou a Weibull 3P, que contém a 2P)
+SELECAO = [
+    (stats.weibull_min(2.5, scale=200.0), {'Weibull', 'Weibull 3P'}),
+    (stats.weibull_min(3.0, loc=100.0, scale=150.0), {'Weibull 3P'}),
+    (stats.lognorm(0.6, scale=80.0), {'Lognormal'}),
+]
+
+CASOS_SELECAO = [
+    pytest.param(*SELECAO[0], False, id='weibull-sem_censura'),
+    pytest.param(*SELECAO[0], True, id='weibull-com_censura'),
+    pytest.param(*SELECAO[1], False, id='weibull_3p-sem_censura'),
+    pytest.param(*SELECAO[1], True, id='weibull_3p-com_censura'),
+    pytest.param(*SELECAO[2], False, id='lognormal-sem_censura'),
+    pytest.param(*SELECAO[2], True, id='lognormal-com_censura'),
+]
+
+@pytest.mark.parametrize('referencia, esperadas, censura', CASOS_SELECAO)
+def test_aic_escolhe_a_familia_geradora(referencia, esperadas, censura):
+    tempos, censurados = _amostra(referencia, 3000, seed=5, censura=censura)
+    tabela = tabela_aic(ajustar_distribuicoes(tempos, censurados), tempos, censurados)
+    assert tabela['Distribuição'].iloc[0] in esperadas
+    # As outras famílias ficam longe: ΔAIC > 10 é praticamente sem suporte; com censura (até ~80% dos tempos
+    # na Weibull deslocada) sobra menos informação e o limite é ΔAIC > 4, ainda bem menos suporte
+    limite = 4 if censura else 10
+    assert (tabela.loc[~tabela['Distribuição'].isin(esperadas), 'ΔAIC'] > limite).all()
+
+def test_exponencial_preferida_quando_a_taxa_e_constante():
+    # A Weibull com beta ≈ 1 ajusta tão bem quanto, mas paga um parâmetro a mais. Em parte das amostras a
+    # diferença de verossimilhança passa da penalidade por acaso (teste da razão de verossimilhanças a ~16%),
+    # e a Weibull 3P ainda ganha com gama logo abaixo do menor tempo; por isso uma semente fixa
+    tempos, _ = _amostra(stats.expon(scale=50.0), 2000, seed=8)
+    distribuicoes = ajustar_distribuicoes(tempos)
+    tabela = tabela_aic(distribuicoes, tempos).set_index('Distribuição')
+    assert tabela['AIC'].idxmin() == 'Exponencial'
+    assert distribuicoes[0].beta == pytest.approx(1, abs=0.05)
+    assert tabela.loc['Lognormal', 'ΔAIC'] > 10
@@ -0,0 +1,64 @@
+# tests/test_duracao.py
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.utils import clean_duration, clean_duration_series
+
+# Valores que os dois conversores devem tratar igual
+CORPUS_LEGADO = [
+    0, 3, 2.5, -1.5, np.float64(7.25), np.int64(4), True,
+    '3', '2.5', '5,5', ' 7 ', '2h', '2 h', ' 7 H', '1.5 horas', '3,25h', '1e3', '1_000', '1_5h',
+    '', '   ', 'abc', 'h', '--', None, np.nan, pd.NaT,
+    '10:75', '1:05:75', '1h75', 'x:30',
+]
+
+# Formatos novos: clean_duration dá NaN ou trunca na hora, a versão vetorizada lê a duração completa
+DIVERGENTES = {
+    '1:30': 1.5,
+    '01:30:00': 1.5,
+    '10:05:30': 10 + 5 / 60 + 30 / 3600,
+    '1h30': 1.5,
+    '1h30min': 1.5,
+    '2 h 15 m': 2.25,
+    '1,5h30': 2.0,
+    datetime.time(1, 30): 1.5,
+}
+
+def _legado(valores):
+    return np.array([clean_duration(valor) for valor in valores], dtype=float)
+
+@pytest.mark.parametrize('valor', CORPUS_LEGADO, ids=repr)
+def test_valor_isolado_igual_ao_legado(valor):
+    obtido = clean_duration_series(pd.Series([valor], dtype=object)).to_numpy()
+    np.testing.assert_array_equal(obtido, _legado([valor]))
+
+@pytest.mark.parametrize('valor, esperado', list(DIVERGENTES.items()), ids=repr)
+def test_formatos_novos(valor, esperado):
+    assert clean_duration_series(pd.Series([valor], dtype=object)).iloc[0] == pytest.approx(esperado)
+
+def test_coluna_mista_igual_ao_legado():
+    # Numa coluna mista cada célula passa por um caminho diferente (número, texto numérico, regex, regra antiga)
+    valores = CORPUS_LEGADO * 3
+    serie = pd.Series(valores + list(DIVERGENTES), dtype=object).sample(frac=1, random_state=0)
+    obtido = clean_duration_series(serie)
+    legado = pd.Series(_legado(serie), index=serie.index)
+    divergente = serie.map(lambda valor: any(valor is chave or valor == chave for chave in DIVERGENTES))
+    pd.testing.assert_series_equal(obtido[~divergente], legado[~divergente], check_names=False)
+    assert obtido[divergente].notna().all()
+
+@pytest.mark.parametrize('serie', [
+    pd.Series([1.0, 2.5, np.nan]),
+    pd.Series([1, 2, 3]),
+    pd.Series(['1', '2,5', None], dtype=object),
+    pd.Series(['1', '2.5', '3'], dtype='string'),
+], ids=['float', 'int', 'texto numerico', 'string'])
+def test_caminhos_rapidos(serie):
+    np.testing.assert_array_equal(clean_duration_series(serie).to_numpy(), _legado(serie.astype(object)))
+
+def test_preserva_indice():
+    serie = pd.Series(['1:30', '2h', 'abc'], index=[10, 20, 30], dtype=object)
+    assert list(clean_duration_series(serie).index) == [10, 20, 30]
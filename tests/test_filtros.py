@@ -0,0 +1,126 @@
+# tests/test_filtros.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.filtros import IndiceFiltros, fatiar_periodo, janela_dias, ordenar_por_data
+
+COLUNAS = ['FROTA', 'EQUIPAMENTO', 'ITEM']
+
+def _falhas(n, seed=0, ordenadas=True, fracao_nat=0.05):
+    """Falhas aleatórias com colunas de filtro (texto, categoria e NaN) e DATA INICIAL com horas e NaT."""
+    rng = np.random.default_rng(seed)
+    datas = pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90 * 24 * 60, n), unit='min'))
+    # Parte das falhas começa exatamente à meia-noite, nos limites das janelas de dias inteiros
+    meia_noite = rng.random(n) < 0.2
+    datas[meia_noite] = datas[meia_noite].dt.floor('D')
+    datas[rng.random(n) < fracao_nat] = pd.NaT
+    df = pd.DataFrame({
+        'FROTA': rng.choice(['F1', 'F2', 'F3'], n),
+        'EQUIPAMENTO': pd.Categorical(rng.choice([f'EQ{i}' for i in range(12)], n)),
+        'ITEM': rng.choice(['MOTOR', 'BOMBA', 'FREIO', None], n),
+        'DATA INICIAL': datas,
+        'VALOR': np.arange(n),
+    })
+    if ordenadas:
+        df = df.sort_values('DATA INICIAL', kind='stable', na_position='last', ignore_index=True)
+    return df
+
+def _mascara(df, selecoes, periodo=None):
+    """Os mesmos filtros com máscaras booleanas do pandas, como a página fazia antes do índice."""
+    mascara = pd.Series(True, index=df.index)
+    for col, valores in selecoes.items():
+        if col in df.columns:
+            mascara &= df[col].isin(valores)
+    if periodo is not None:
+        inicio, fim = janela_dias(periodo)
+        mascara &= (df['DATA INICIAL'] >= inicio) & (df['DATA INICIAL'] < fim)
+    return df[mascara]
+
+PERIODOS = [
+    None,
+    (pd.Timestamp('2024-02-01').date(), pd.Timestamp('2024-02-10').date()),
+    (pd.Timestamp('2024-01-15').date(), pd.Timestamp('2024-01-15').date()),
+    (pd.Timestamp('2023-06-01').date(), pd.Timestamp('2023-12-31').date()),
+    (pd.Timestamp('2023-12-01').date(), pd.Timestamp('2025-01-01').date()),
+]
+
+SELECOES = [
+    {},
+    {'FROTA': ['F1']},
+    {'FROTA': ['F1', 'F3'], 'EQUIPAMENTO': ['EQ0', 'EQ5', 'EQ11']},
+    {'EQUIPAMENTO': ['EQ2'], 'ITEM': ['MOTOR', 'FREIO']},
+    {'ITEM': ['INEXISTENTE']},
+    {'FROTA': ['F2'], 'COLUNA_FORA_DO_INDICE': ['x']},
+]
+
+@pytest.mark.parametrize('ordenadas', [True, False], ids=['ordenadas', 'fora_de_ordem'])
+@pytest.mark.parametrize('periodo', PERIODOS, ids=['sem_periodo', 'fevereiro', 'um_dia', 'antes', 'tudo'])
+@pytest.mark.parametrize('selecoes', SELECOES, ids=['nenhuma', 'frota', 'frota_equip', 'equip_item', 'vazia', 'fora'])
+def test_filtrar_igual_a_mascara(selecoes, periodo, ordenadas):
+    df = _falhas(3000, ordenadas=ordenadas)
+    indice = IndiceFiltros(df, COLUNAS, coluna_data='DATA INICIAL')
+    pd.testing.assert_frame_equal(indice.filtrar(df, selecoes, periodo), _mascara(df, selecoes, periodo))
+
+@pytest.mark.parametrize('selecoes', [{}, {'FROTA': ['F1']}], ids=['so_periodo', 'frota_e_periodo'])
+def test_periodo_inclui_o_ultimo_dia_inteiro(selecoes):
+    # F1 tem menos linhas que o período: com a frota selecionada, o período filtra os candidatos dela
+    datas_f1 = ['2024-01-09 23:59:59', '2024-01-10 00:00:00', '2024-01-10 23:59:59', '2024-01-11 00:00:00']
+    df = pd.DataFrame({
+        'FROTA': ['F1'] * 4 + ['F2'] * 10,
+        'DATA INICIAL': pd.to_datetime(datas_f1 + ['2024-01-10 12:00:00'] * 10),
+    }).sort_values('DATA INICIAL', kind='stable')
+    indice = IndiceFiltros(df, ['FROTA'], coluna_data='DATA INICIAL')
+    dia = pd.Timestamp('2024-01-10').date()
+    filtrado = indice.filtrar(df, selecoes, (dia, dia))
+    pd.testing.assert_frame_equal(filtrado, _mascara(df, selecoes, (dia, dia)))
+    assert filtrado['DATA INICIAL'].min() == pd.Timestamp('2024-01-10')
+    assert filtrado['DATA INICIAL'].max() == pd.Timestamp('2024-01-10 23:59:59')
+
+def test_valores_igual_a_unique_da_mascara():
+    df = _falhas(2000, seed=1, ordenadas=False)
+    indice = IndiceFiltros(df, COLUNAS, coluna_data='DATA INICIAL')
+    for selecoes in SELECOES:
+        esperado = _mascara(df, selecoes)
+        for col in COLUNAS:
+            assert indice.valores(col, selecoes) == sorted(esperado[col].dropna().unique())
+
+LIMITES = [
+    ('2024-02-01', '2024-02-11'),
+    ('2024-01-15 06:30', '2024-01-15 06:31'),
+    ('2023-01-01', '2024-01-01'),
+    ('2024-03-31', '2025-01-01'),
+    ('2023-01-01', '2025-01-01'),
+    ('2024-02-10', '2024-02-10'),
+    ('2024-02-10', '2024-02-01'),
+]
+
+@pytest.mark.parametrize('inicio, fim', LIMITES,
+                         ids=['dias', 'um_minuto', 'antes', 'final', 'tudo', 'janela_vazia', 'invertida'])
+def test_fatiar_periodo_igual_a_mascara(inicio, fim):
+    df = _falhas(3000, seed=2)
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    fatia = fatiar_periodo(df, 'DATA INICIAL', inicio, fim)
+    esperado = df[(df['DATA INICIAL'] >= inicio) & (df['DATA INICIAL'] < fim)]
+    pd.testing.assert_frame_equal(fatia, esperado)
+
+def test_fatiar_periodo_sem_datas_validas():
+    df = pd.DataFrame({'DATA INICIAL': pd.to_datetime([pd.NaT, pd.NaT])})
+    assert fatiar_periodo(df, 'DATA INICIAL', pd.Timestamp('2000-01-01'), pd.Timestamp('2100-01-01')).empty
+    indice = IndiceFiltros(df, [], coluna_data='DATA INICIAL')
+    assert indice.filtrar(df, {}, (pd.Timestamp('2000-01-01').date(), pd.Timestamp('2100-01-01').date())).empty
+
+@pytest.mark.parametrize('fracao_nat', [0.0, 0.05, 1.0], ids=['sem_nat', 'com_nat', 'so_nat'])
+def test_ordenar_por_data_igual_a_sort_values(fracao_nat):
+    df = _falhas(2000, seed=3, ordenadas=False, fracao_nat=fracao_nat)
+    esperado = df.sort_values('DATA INICIAL', kind='stable', na_position='last', ignore_index=True)
+    ordenado = ordenar_por_data(df, 'DATA INICIAL')
+    pd.testing.assert_frame_equal(ordenado, esperado)
+    # Já ordenado: só renumera o índice, sem reordenar
+    pd.testing.assert_frame_equal(ordenar_por_data(ordenado.set_index(ordenado.index + 10), 'DATA INICIAL'), esperado)
+
+def test_nat_no_meio_nao_conta_como_ordenado():
+    df = pd.DataFrame({'DATA INICIAL': pd.to_datetime(['2024-01-01', None, '2024-01-02']), 'VALOR': [0, 1, 2]})
+    assert list(ordenar_por_data(df, 'DATA INICIAL')['VALOR']) == [0, 2, 1]
+    assert ordenar_por_data(df, 'DATA_FINAL') is df
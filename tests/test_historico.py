@@ -0,0 +1,123 @@
+# tests/test_historico.py
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import historico
+from modules.historico import (
+    CHAVE_FALHA, anexar_falhas, calcular_agregados, carregar_agregados, carregar_historico,
+    carregar_rollup_hierarquia, salvar_historico
+)
+from modules.motor_kpis import NIVEIS_HIERARQUIA, RollupHierarquia
+
+def _falhas(n, seed=0, equipamentos=('EQ1', 'EQ2', 'EQ3'), causas=('DESGASTE', 'QUEBRA')):
+    """Falhas aleatórias com todas as colunas que o histórico grava; DATA INICIAL em horas cheias."""
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 24 * 60, n), unit='h')
+    duracao = rng.integers(1, 10, n).astype(float)
+    return pd.DataFrame({
+        'FROTA': 'F1',
+        'EQUIPAMENTO': rng.choice(list(equipamentos), n),
+        'SISTEMA': rng.choice(['MOTOR', 'FREIO'], n),
+        'CONJUNTO': rng.choice(['BOMBA', 'DISCO'], n),
+        'ITEM': rng.choice(['I1', 'I2', 'I3'], n),
+        'CAUSA': rng.choice(list(causas), n),
+        'DATA INICIAL': inicio,
+        'DATA FINAL': inicio + pd.to_timedelta(duracao, unit='h'),
+        'DURAÇÃO': duracao,
+    }).drop_duplicates(CHAVE_FALHA).sort_values('DATA INICIAL', ignore_index=True)
+
+def _indicadores():
+    return pd.DataFrame({'EQUIPAMENTO': ['EQ1'], 'DATA_FINAL': [pd.Timestamp('2024-02-01')], 'HORIMETRO': [100.0]})
+
+def _comparavel(df):
+    """Texto no lugar das categorias e linhas em uma ordem independente da gravação, para comparar frames."""
+    df = df.astype({col: str for col in df.select_dtypes('category').columns})
+    return df.sort_values([*CHAVE_FALHA, 'DATA FINAL'], ignore_index=True)
+
+def test_lote_sobreposto_nao_duplica_falhas(tmp_path):
+    base = _falhas(200)
+    nome = salvar_historico('frota', base, _indicadores(), diretorio=tmp_path)
+
+    # Metade do lote já está na base e uma falha nova aparece duas vezes no próprio lote
+    novas = _falhas(300, seed=1)
+    novas = novas[~novas.set_index(CHAVE_FALHA).index.isin(base.set_index(CHAVE_FALHA).index)]
+    lote = pd.concat([base.iloc[:100], novas, novas.iloc[:1]], ignore_index=True)
+    inseridas, descartadas = anexar_falhas(nome, lote, diretorio=tmp_path)
+    assert (inseridas, descartadas) == (len(novas), 101)
+
+    # Reanexar o mesmo lote não grava nada nem cria outro incremento
+    assert anexar_falhas(nome, lote, diretorio=tmp_path) == (0, len(lote))
+    assert len(list((tmp_path / nome).glob(historico.PADRAO_INCREMENTOS_FALHAS))) == 1
+
+    df_falhas, _, _ = carregar_historico(nome, diretorio=tmp_path)
+    assert len(df_falhas) == len(base) + len(novas)
+    assert not df_falhas.duplicated(CHAVE_FALHA).any()
+    assert df_falhas['DATA INICIAL'].is_monotonic_increasing
+
+    metadados = json.loads((tmp_path / nome / historico.ARQUIVO_METADADOS).read_text(encoding='utf-8'))
+    assert metadados['linhas']['Falhas'] == len(df_falhas)
+    assert metadados['incrementos'] == 1
+
+def test_historico_com_incrementos_igual_a_reconstrucao(tmp_path):
+    completo = _falhas(600, seed=2)
+    embaralhado = completo.sample(frac=1, random_state=0)
+    partes = [embaralhado.iloc[i::4] for i in range(4)]
+
+    nome = salvar_historico('incremental', partes[0], _indicadores(), diretorio=tmp_path)
+    for parte in partes[1:]:
+        anexar_falhas(nome, parte, diretorio=tmp_path)
+    salvar_historico('reconstruido', completo, _indicadores(), diretorio=tmp_path)
+
+    incremental, indicadores, _ = carregar_historico(nome, diretorio=tmp_path)
+    reconstruido, indicadores_completo, _ = carregar_historico('reconstruido', diretorio=tmp_path)
+    pd.testing.assert_frame_equal(_comparavel(incremental), _comparavel(reconstruido))
+    pd.testing.assert_frame_equal(indicadores, indicadores_completo)
+
+    # Agregados mantidos a cada incremento batem com os recalculados sobre o histórico inteiro
+    agregados = carregar_agregados(nome, diretorio=tmp_path)
+    for coluna in historico.ARQUIVOS_AGREGADOS:
+        esperado = calcular_agregados(completo, coluna)
+        obtido = agregados[coluna].astype({coluna: str})
+        pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False)
+
+    # Rollup combinado incremento a incremento igual ao montado de uma vez
+    rollup = carregar_rollup_hierarquia(nome, diretorio=tmp_path)
+    direto = RollupHierarquia.de_tabela(completo)
+    for nivel in NIVEIS_HIERARQUIA:
+        pd.testing.assert_frame_equal(
+            rollup.kpis(nivel).sort_index(), direto.kpis(nivel).sort_index(), check_dtype=False, check_index_type=False
+        )
+
+@pytest.mark.parametrize('colunas_do_lote', [['EQUIPAMENTO'], ['CAUSA'], ['EQUIPAMENTO', 'CAUSA']],
+                         ids=['equipamento', 'causa', 'ambos'])
+def test_categorias_novas_nos_incrementos(tmp_path, colunas_do_lote):
+    base = _falhas(100, seed=3)
+    nome = salvar_historico('categorias', base, _indicadores(), diretorio=tmp_path)
+
+    # Cada incremento traz valores que nem a base nem o incremento anterior conheciam
+    lotes = []
+    for i, seed in enumerate((4, 5)):
+        lote = _falhas(50, seed=seed, equipamentos=(f'NOVO{i}A', f'NOVO{i}B'), causas=(f'CAUSA{i}',))
+        for col in {'EQUIPAMENTO', 'CAUSA'} - set(colunas_do_lote):
+            lote[col] = base[col].iloc[0]
+        lote = lote[~lote.set_index(CHAVE_FALHA).index.isin(base.set_index(CHAVE_FALHA).index)]
+        anexar_falhas(nome, lote, diretorio=tmp_path)
+        lotes.append(lote)
+
+    df_falhas, df_indicadores, _ = carregar_historico(nome, diretorio=tmp_path)
+    esperado = pd.concat([base, *lotes], ignore_index=True)
+    for col in ['EQUIPAMENTO', 'CAUSA', 'ITEM']:
+        # Um só dicionário, ordenado e com os valores da base e de todos os incrementos
+        categorias = df_falhas[col].cat.categories
+        assert list(categorias) == sorted(esperado[col].unique())
+        assert df_falhas[col].isna().sum() == 0
+        pd.testing.assert_series_equal(
+            df_falhas[col].value_counts().sort_index(), esperado[col].value_counts().sort_index(),
+            check_index_type=False, check_categorical=False
+        )
+    # Colunas das duas planilhas compartilham o mesmo dicionário
+    assert df_indicadores['EQUIPAMENTO'].cat.categories.equals(df_falhas['EQUIPAMENTO'].cat.categories)
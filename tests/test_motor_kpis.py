@@ -0,0 +1,114 @@
+# tests/test_motor_kpis.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.motor_kpis import NIVEIS_HIERARQUIA, CuboKPI, RollupHierarquia
+
+def _falhas(n, seed=0, equipamentos=30):
+    """Falhas aleatórias com a hierarquia SISTEMA → CONJUNTO → ITEM; um mesmo CONJUNTO aparece em dois sistemas."""
+    rng = np.random.default_rng(seed)
+    caminhos = [('MOTOR', 'BOMBA', 'ROTOR'), ('MOTOR', 'BOMBA', 'SELO'), ('MOTOR', 'ARREFECIMENTO', 'RADIADOR'),
+                ('FREIO', 'DISCO', 'PASTILHA'), ('FREIO', 'BOMBA', 'SELO'), ('HIDRAULICO', 'CILINDRO', 'HASTE')]
+    escolhidos = np.array(caminhos)[rng.integers(0, len(caminhos), n)]
+    inicio = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24, n), unit='h')
+    duracao = rng.exponential(3, n)
+    return pd.DataFrame({
+        'FROTA': rng.choice(['F1', 'F2'], n),
+        'EQUIPAMENTO': pd.Categorical(rng.choice([f'EQ{i:02d}' for i in range(equipamentos)], n)),
+        'SISTEMA': escolhidos[:, 0],
+        'CONJUNTO': escolhidos[:, 1],
+        'ITEM': escolhidos[:, 2],
+        'CAUSA': rng.choice(['DESGASTE', 'QUEBRA', None], n),
+        'DATA INICIAL': inicio,
+        'DATA FINAL': inicio + pd.to_timedelta(duracao, unit='h'),
+        'DURAÇÃO': duracao,
+    })
+
+def _por_groupby(df, colunas):
+    """KPIs de um agrupamento da hierarquia calculados direto nas falhas."""
+    tabela = df.groupby(colunas, observed=True).agg(
+        Tempo_Total_Parada=('DURAÇÃO', 'sum'),
+        Ocorrencias=('DURAÇÃO', 'count'),
+        Equip_Afetados=('EQUIPAMENTO', 'nunique'),
+    )
+    tabela['MTTR'] = tabela['Tempo_Total_Parada'] / tabela['Ocorrencias']
+    return tabela
+
+def _comparar(obtido, esperado):
+    colunas = ['Tempo_Total_Parada', 'Ocorrencias', 'MTTR', 'Equip_Afetados']
+    obtido = obtido[colunas].sort_index()
+    obtido.index = obtido.index.astype(str)
+    esperado = esperado[colunas].sort_index()
+    esperado.index = esperado.index.astype(str)
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, check_names=False)
+
+def _caminhos(df, profundidade):
+    """Todos os caminhos {'SISTEMA': s[, 'CONJUNTO': c]} presentes nas falhas."""
+    colunas = NIVEIS_HIERARQUIA[:profundidade]
+    return [dict(zip(colunas, valores)) for valores in df[colunas].drop_duplicates().itertuples(index=False)]
+
+@pytest.mark.parametrize('nivel', NIVEIS_HIERARQUIA)
+def test_kpis_igual_a_groupby(nivel):
+    df = _falhas(5000)
+    kpis = RollupHierarquia.de_tabela(df).kpis(nivel)
+    _comparar(kpis, _por_groupby(df, [nivel]))
+    assert kpis['Tempo_Total_Parada'].is_monotonic_decreasing
+
+@pytest.mark.parametrize('profundidade', [1, 2], ids=['sistema', 'conjunto'])
+def test_detalhar_igual_a_groupby_filtrado(profundidade):
+    df = _falhas(5000, seed=1)
+    rollup = RollupHierarquia.de_tabela(df)
+    filho = NIVEIS_HIERARQUIA[profundidade]
+    for caminho in _caminhos(df, profundidade):
+        mascara = np.logical_and.reduce([df[col] == valor for col, valor in caminho.items()])
+        esperado = _por_groupby(df[mascara], [filho])
+        detalhe = rollup.detalhar(caminho)
+        _comparar(detalhe, esperado)
+        assert detalhe['Tempo_Total_Parada'].is_monotonic_decreasing
+        assert sorted(rollup.valores(filho, caminho)) == sorted(esperado.index)
+
+def test_valores_sem_caminho():
+    df = _falhas(1000, seed=2)
+    rollup = RollupHierarquia.de_tabela(df)
+    for nivel in NIVEIS_HIERARQUIA:
+        assert sorted(rollup.valores(nivel)) == sorted(df[nivel].unique())
+
+def test_caminho_inexistente_fica_vazio():
+    rollup = RollupHierarquia.de_tabela(_falhas(500, seed=3))
+    assert rollup.detalhar({'SISTEMA': 'INEXISTENTE'}).empty
+    assert rollup.valores('CONJUNTO', {'SISTEMA': 'INEXISTENTE'}) == []
+
+def test_combinar_igual_ao_rollup_da_uniao():
+    # Os dois lotes têm equipamentos em comum e equipamentos só seus, em ordens de categoria diferentes
+    df = _falhas(4000, seed=4)
+    df['EQUIPAMENTO'] = df['EQUIPAMENTO'].astype(str)
+    a, b = df[df['EQUIPAMENTO'] < 'EQ20'], df[df['EQUIPAMENTO'] >= 'EQ10']
+    b = b.assign(EQUIPAMENTO=pd.Categorical(b['EQUIPAMENTO'], categories=sorted(b['EQUIPAMENTO'].unique(), reverse=True)))
+    combinado = RollupHierarquia.de_tabela(a).combinar(RollupHierarquia.de_tabela(b))
+    uniao = pd.concat([a.astype({'EQUIPAMENTO': str}), b.astype({'EQUIPAMENTO': str})], ignore_index=True)
+    for nivel in NIVEIS_HIERARQUIA:
+        _comparar(combinado.kpis(nivel), _por_groupby(uniao, [nivel]))
+    for caminho in _caminhos(uniao, 2):
+        mascara = (uniao['SISTEMA'] == caminho['SISTEMA']) & (uniao['CONJUNTO'] == caminho['CONJUNTO'])
+        _comparar(combinado.detalhar(caminho), _por_groupby(uniao[mascara], ['ITEM']))
+
+def test_folhas_e_de_folhas_reconstroem_o_rollup():
+    rollup = RollupHierarquia.de_tabela(_falhas(2000, seed=5, equipamentos=13))
+    copia = RollupHierarquia.de_folhas(rollup.folhas(), rollup.equipamentos)
+    for nivel in NIVEIS_HIERARQUIA:
+        pd.testing.assert_frame_equal(copia.kpis(nivel), rollup.kpis(nivel))
+
+def test_cubo_igual_a_groupby_com_causa_vazia():
+    df = _falhas(3000, seed=6)
+    cubo = CuboKPI(df)
+    for niveis in (['EQUIPAMENTO'], ['FROTA'], ['SISTEMA', 'CONJUNTO'], ['ITEM']):
+        esperado = df.groupby(niveis, observed=True).agg(
+            Tempo_Total_Parada=('DURAÇÃO', 'sum'), Ocorrencias=('DURAÇÃO', 'count'), Ultima_Falha=('DATA FINAL', 'max')
+        )
+        esperado['MTTR'] = esperado['Tempo_Total_Parada'] / esperado['Ocorrencias']
+        pd.testing.assert_frame_equal(cubo.agregar(niveis), esperado, check_dtype=False)
+    # O rollup do cubo (montado sobre a tabela agregada) é o mesmo das falhas
+    for nivel in NIVEIS_HIERARQUIA:
+        _comparar(cubo.hierarquia.kpis(nivel), _por_groupby(df, [nivel]))
@@ -0,0 +1,282 @@
+# tests/test_motor_mtbf.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import secoes_kpis
+from modules.filtros import IndiceFiltros, janela_dias
+from modules.motor_kpis import CuboKPI
+from modules.motor_mtbf import MatrizDisponibilidade, MotorMTBF, episodios_unidos, parada_unida
+from modules.pipeline_kpis import janela_periodo
+
+def _falhas(linhas):
+    """Falhas a partir de (FROTA, EQUIPAMENTO, ITEM, DATA INICIAL, DATA FINAL); DURAÇÃO em horas."""
+    df = pd.DataFrame(linhas, columns=['FROTA', 'EQUIPAMENTO', 'ITEM', 'DATA INICIAL', 'DATA FINAL'])
+    df['DATA INICIAL'] = pd.to_datetime(df['DATA INICIAL'])
+    df['DATA FINAL'] = pd.to_datetime(df['DATA FINAL'])
+    df['SISTEMA'], df['CONJUNTO'], df['CAUSA'] = 'MOTOR', 'BOMBA', 'DESGASTE'
+    df['DURAÇÃO'] = (df['DATA FINAL'] - df['DATA INICIAL']).dt.total_seconds() / 3600
+    return df
+
+# EQ1 passa da frota F1 para a F2; suas duas paradas se sobrepõem por 1 h
+FALHAS_DUAS_FROTAS = [
+    ('F1', 'EQ1', 'MOTOR', '2024-01-01 10:00', '2024-01-01 12:00'),
+    ('F2', 'EQ1', 'BOMBA', '2024-01-01 11:00', '2024-01-01 13:00'),
+    ('F1', 'EQ2', 'MOTOR', '2024-01-02 00:00', '2024-01-02 05:00'),
+]
+
+def test_equipamento_em_duas_frotas():
+    df = _falhas(FALHAS_DUAS_FROTAS)
+    motor = MotorMTBF(df, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-03'))
+
+    # Uma linha por equipamento, com a união das paradas de todas as frotas
+    equipamentos = motor.agregar('EQUIPAMENTO')
+    assert list(equipamentos.index.astype(str)) == ['EQ1', 'EQ2']
+    assert equipamentos.loc['EQ1', 'Ocorrencias'] == 2
+    assert equipamentos.loc['EQ1', 'Tempo_Parada (h)'] == pytest.approx(3.0)
+    assert equipamentos.loc['EQ1', 'MTBF (h)'] == pytest.approx((48 - 3) / 2)
+
+    # Cada frota soma os equipamentos com as falhas registradas nela
+    frotas = motor.agregar('FROTA')
+    assert frotas.loc['F1', 'Tempo_Parada (h)'] == pytest.approx(2 + 5)
+    assert frotas.loc['F2', 'Tempo_Parada (h)'] == pytest.approx(2)
+    assert frotas['Ocorrencias'].sum() == len(df)
+
+    cubo = CuboKPI(df)
+    piores = secoes_kpis.piores_ativos(cubo, motor)
+    assert sorted(piores['EQUIPAMENTO'].astype(str)) == ['EQ1', 'EQ2']
+    comparacao = secoes_kpis.comparacao_equipamentos(cubo, motor, ['EQ1', 'EQ2']).set_index('EQUIPAMENTO')
+    assert comparacao.loc['EQ1', 'MTBF_h'] == pytest.approx(22.5)
+
+def test_mesma_janela_em_todos_os_calculos_do_periodo():
+    # A última falha começa no último dia selecionado e passa da meia-noite do dia seguinte
+    df = _falhas([
+        ('F1', 'EQ1', 'MOTOR', '2023-12-31 20:00', '2024-01-01 02:00'),
+        ('F1', 'EQ1', 'MOTOR', '2024-01-01 10:00', '2024-01-01 12:00'),
+        ('F1', 'EQ1', 'BOMBA', '2024-01-02 18:00', '2024-01-03 06:00'),
+    ])
+    periodo = (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02'))
+    assert janela_dias(periodo) == janela_periodo(df, periodo) == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-03'))
+
+    filtrado = IndiceFiltros(df, ['EQUIPAMENTO'], 'DATA INICIAL').filtrar(df, {}, periodo)
+    assert len(filtrado) == 2
+
+    # 2 h no dia 1 e 6 h até a meia-noite do dia 2, em 48 h; a falha que começou antes do período
+    # ficou fora do filtro
+    motor = MotorMTBF(filtrado, *janela_periodo(df, periodo))
+    equipamento = motor.agregar('EQUIPAMENTO').loc['EQ1']
+    assert equipamento['Ocorrencias'] == 2
+    assert motor.horas_janela == 48
+    assert equipamento['Tempo_Parada (h)'] == pytest.approx(8)
+
+    # Sem o filtro, DF e matriz recortam as mesmas paradas à mesma janela (+2 h da madrugada do dia 1)
+    sem_filtro = MotorMTBF(df, *janela_periodo(df, periodo)).agregar('EQUIPAMENTO').loc['EQ1']
+    assert sem_filtro['Tempo_Parada (h)'] == pytest.approx(10)
+    disponibilidade = secoes_kpis.disponibilidade_por_equipamento(df, pd.DataFrame(), periodo).set_index('EQUIPAMENTO')
+    assert disponibilidade.loc['EQ1', 'DF_Alcancada_Calculada (%)'] == pytest.approx(
+        (1 - sem_filtro['Tempo_Parada (h)'] / 48) * 100
+    )
+    matriz = MatrizDisponibilidade(df, *janela_dias(periodo))
+    assert matriz.parada.sum() == pytest.approx(sem_filtro['Tempo_Parada (h)'])
+
+def _uniao_ingenua(intervalos, inicio, fim):
+    """Horas da união dos intervalos recortados a [inicio, fim), por ordenação e laço simples."""
+    recortados = sorted(
+        (max(a, inicio), min(b, fim)) for a, b in intervalos if not (pd.isna(a) or pd.isna(b))
+    )
+    total, atual = pd.Timedelta(0), None
+    for a, b in recortados:
+        if b <= a:
+            continue
+        if atual is None or a > atual[1]:
+            if atual is not None:
+                total += atual[1] - atual[0]
+            atual = [a, b]
+        else:
+            atual[1] = max(atual[1], b)
+    if atual is not None:
+        total += atual[1] - atual[0]
+    return total.total_seconds() / 3600
+
+def _mtbf_ingenuo(df, colunas, inicio, fim):
+    """Ocorrências e parada unida por grupo de `colunas`, grupo a grupo."""
+    linhas = []
+    for chave, grupo in df.groupby(colunas, observed=True):
+        intervalos = zip(grupo['DATA INICIAL'], grupo['DATA FINAL'])
+        ocorrencias = int(((grupo['DATA INICIAL'] >= inicio) & (grupo['DATA INICIAL'] < fim)).sum())
+        linhas.append((*np.atleast_1d(chave), ocorrencias, _uniao_ingenua(intervalos, inicio, fim)))
+    return pd.DataFrame(linhas, columns=[*colunas, 'Ocorrencias', 'Tempo_Parada (h)']).set_index(colunas)
+
+# Casos montados à mão, todos em EQ1/MOTOR na janela de 2024-01-01 a 2024-01-03
+CASOS_UNIAO = {
+    'sobreposicao': [('01 10:00', '01 12:00'), ('01 11:00', '01 14:00')],
+    'aninhada': [('01 08:00', '01 20:00'), ('01 10:00', '01 11:00'), ('01 12:00', '01 13:00')],
+    'encostadas': [('01 08:00', '01 09:00'), ('01 09:00', '01 10:00')],
+    'fora_de_ordem': [('02 10:00', '02 11:00'), ('01 10:00', '02 10:30')],
+    'corta_inicio_da_janela': [('2023-12-31 22:00', '01 02:00')],
+    'corta_fim_da_janela': [('02 22:00', '2024-01-03 05:00')],
+    'cobre_a_janela': [('2023-12-30 00:00', '2024-01-04 00:00'), ('01 10:00', '01 11:00')],
+    'fora_da_janela': [('2024-01-05 10:00', '2024-01-05 11:00')],
+}
+
+def _data(texto):
+    return pd.Timestamp(texto if texto.startswith('20') else f'2024-01-{texto}')
+
+@pytest.mark.parametrize('intervalos', list(CASOS_UNIAO.values()), ids=list(CASOS_UNIAO))
+def test_uniao_de_casos_simples(intervalos):
+    inicio, fim = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-03')
+    df = _falhas([('F1', 'EQ1', 'MOTOR', _data(a), _data(b)) for a, b in intervalos])
+    tabela = MotorMTBF(df, inicio, fim).agregar(['EQUIPAMENTO', 'ITEM'])
+    esperado = _uniao_ingenua(zip(df['DATA INICIAL'], df['DATA FINAL']), inicio, fim)
+    assert tabela['Tempo_Parada (h)'].iloc[0] == pytest.approx(esperado)
+    assert tabela['Tempo_Operacao (h)'].iloc[0] == pytest.approx(48 - esperado)
+
+def _falhas_aleatorias(n, seed=0):
+    """Falhas curtas e longas (que se sobrepõem e aninham) de 6 equipamentos em 3 frotas, alguns em duas."""
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(-2 * 86400, 32 * 86400, n), unit='s')
+    duracao = pd.to_timedelta(np.where(rng.random(n) < 0.1, rng.exponential(72, n), rng.exponential(3, n)), unit='h')
+    equipamento = rng.integers(0, 6, n)
+    # EQ0 e EQ1 trocam de frota ao longo do mês
+    frota = np.where(equipamento < 2, rng.integers(0, 2, n), equipamento % 3)
+    return _falhas(list(zip(
+        [f'F{f}' for f in frota], [f'EQ{e}' for e in equipamento],
+        [f'I{i}' for i in rng.integers(0, 4, n)], inicio, (inicio + duracao).floor('s'),
+    ))).sort_values('DATA INICIAL', ignore_index=True)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_motor_igual_a_uniao_ingenua(seed):
+    df = _falhas_aleatorias(400, seed)
+    inicio, fim = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-31')
+    horas = (fim - inicio).total_seconds() / 3600
+    motor = MotorMTBF(df, inicio, fim)
+
+    for colunas in (['EQUIPAMENTO', 'ITEM'], ['EQUIPAMENTO']):
+        obtido = motor.agregar(colunas)
+        obtido.index = obtido.index.map(lambda chave: tuple(map(str, np.atleast_1d(chave))))
+        esperado = _mtbf_ingenuo(df, colunas, inicio, fim)
+        esperado.index = esperado.index.map(lambda chave: tuple(map(str, np.atleast_1d(chave))))
+        obtido = obtido.loc[esperado.index]
+        np.testing.assert_array_equal(obtido['Ocorrencias'], esperado['Ocorrencias'])
+        np.testing.assert_allclose(obtido['Tempo_Parada (h)'], esperado['Tempo_Parada (h)'], rtol=0, atol=1e-9)
+        falhas = esperado['Ocorrencias'].where(esperado['Ocorrencias'] > 0)
+        np.testing.assert_allclose(obtido['MTBF (h)'], (horas - esperado['Tempo_Parada (h)']) / falhas, atol=1e-9)
+
+    # ITEM e FROTA somam os pares (EQUIPAMENTO, ITEM) e (FROTA, EQUIPAMENTO) da versão ingênua
+    for nivel, colunas in (('ITEM', ['EQUIPAMENTO', 'ITEM']), ('FROTA', ['FROTA', 'EQUIPAMENTO'])):
+        pares = _mtbf_ingenuo(df, colunas, inicio, fim).reset_index()
+        pares['Tempo_Operacao (h)'] = horas - pares['Tempo_Parada (h)']
+        esperado = pares.groupby(nivel)[['Ocorrencias', 'Tempo_Parada (h)', 'Tempo_Operacao (h)']].sum()
+        obtido = motor.agregar(nivel)
+        obtido.index = obtido.index.astype(str)
+        obtido = obtido.loc[esperado.index]
+        np.testing.assert_array_equal(obtido['Ocorrencias'], esperado['Ocorrencias'])
+        np.testing.assert_allclose(obtido['Tempo_Operacao (h)'], esperado['Tempo_Operacao (h)'], atol=1e-9)
+
+def _registros_com_defeitos(n, seed=0):
+    """Falhas em segundos inteiros de 3 equipamentos; ~10% com DATA FINAL < DATA INICIAL e ~5% de NaT em cada data."""
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(-6 * 3600, 2 * 86400, n), unit='s')
+    fim = inicio + pd.to_timedelta(rng.integers(1, 12 * 3600, n), unit='s')
+    invertidas = rng.random(n) < 0.1
+    fim = fim.where(~invertidas, inicio - pd.to_timedelta(rng.integers(1, 3600, n), unit='s'))
+    df = pd.DataFrame({
+        'EQUIPAMENTO': rng.choice(['EQ1', 'EQ2', 'EQ3'], n),
+        'DATA INICIAL': inicio.where(rng.random(n) >= 0.05),
+        'DATA FINAL': fim.where(rng.random(n) >= 0.05),
+    })
+    return df
+
+def _marcacao_por_segundo(df, inicio, fim):
+    """Horas paradas por equipamento marcando cada segundo [início, fim) das falhas válidas na janela."""
+    segundos = int((fim - inicio).total_seconds())
+    horas = {}
+    for equipamento, grupo in df.groupby('EQUIPAMENTO'):
+        parado = np.zeros(segundos, dtype=bool)
+        for a, b in zip(grupo['DATA INICIAL'], grupo['DATA FINAL']):
+            if pd.isna(a) or pd.isna(b):
+                continue
+            a = int(np.clip((a - inicio).total_seconds(), 0, segundos))
+            b = int(np.clip((b - inicio).total_seconds(), 0, segundos))
+            parado[a:b] = True
+        horas[equipamento] = parado.sum() / 3600
+    return pd.Series(horas)
+
+@pytest.mark.parametrize('seed', [0, 1, 2, 3])
+def test_parada_unida_igual_a_marcacao_por_segundo(seed):
+    df = _registros_com_defeitos(300, seed)
+    inicio, fim = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-03')
+    obtido = parada_unida(df, ['EQUIPAMENTO'], inicio, fim).set_index('EQUIPAMENTO')['Tempo_Parada (h)']
+    esperado = _marcacao_por_segundo(df, inicio, fim)
+    np.testing.assert_allclose(obtido.loc[esperado.index], esperado, rtol=0, atol=1e-9)
+    assert (obtido <= 48).all()
+
+def test_episodios_disjuntos_e_ordenados():
+    df = _registros_com_defeitos(300)
+    codigos = pd.factorize(df['EQUIPAMENTO'])[0]
+    grupos, a, b = episodios_unidos(
+        codigos, df['DATA INICIAL'].to_numpy('datetime64[ns]'), df['DATA FINAL'].to_numpy('datetime64[ns]'),
+        (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-03'))
+    )
+    assert (b > a).all()
+    mesmo_grupo = grupos[1:] == grupos[:-1]
+    assert (np.diff(grupos) >= 0).all()
+    # Episódios consecutivos do mesmo grupo nem se tocam: teriam sido unidos
+    assert (a[1:][mesmo_grupo] > b[:-1][mesmo_grupo]).all()
+
+def test_registros_invertidos_e_sem_data_nao_contam():
+    df = pd.DataFrame({
+        'EQUIPAMENTO': ['EQ1', 'EQ1', 'EQ1', 'EQ1'],
+        'DATA INICIAL': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 12:00', None, '2024-01-01 15:00']),
+        'DATA FINAL': pd.to_datetime(['2024-01-01 08:00', None, '2024-01-01 13:00', '2024-01-01 16:00']),
+    })
+    tabela = parada_unida(df, ['EQUIPAMENTO'], pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02'))
+    assert tabela['Tempo_Parada (h)'].tolist() == [1.0]
+
+def _falhas_longas(n, seed=0):
+    """Falhas de 7 equipamentos em 60 dias com duração média de 30 h: muitos episódios cobrem vários dias."""
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60 * 86400, n), unit='s')
+    df = pd.DataFrame({
+        'EQUIPAMENTO': pd.Categorical([f'EQ{i}' for i in rng.integers(0, 7, n)]),
+        'DATA INICIAL': inicio,
+        'DATA FINAL': inicio + pd.to_timedelta(rng.exponential(30, n), unit='h'),
+    })
+    return df.sort_values('DATA INICIAL', ignore_index=True)
+
+@pytest.mark.parametrize('inicio, fim', [
+    ('2024-01-05', '2024-02-20'),
+    ('2024-01-05 06:00', '2024-02-20 18:30'),  # primeiro e último dia parciais
+], ids=['dias_inteiros', 'pontas_parciais'])
+def test_matriz_dia_a_dia_igual_a_parada_unida(inicio, fim):
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    df = _falhas_longas(300)
+    matriz = MatrizDisponibilidade(df, inicio, fim)
+    assert matriz.horas.sum() == pytest.approx((fim - inicio).total_seconds() / 3600)
+
+    for k, dia in enumerate(matriz.dias):
+        a, b = max(dia.start_time, inicio), min(dia.start_time + pd.Timedelta(days=1), fim)
+        assert matriz.horas[k] == pytest.approx((b - a).total_seconds() / 3600)
+        esperado = parada_unida(df, ['EQUIPAMENTO'], a, b).set_index('EQUIPAMENTO')['Tempo_Parada (h)']
+        # A matriz guarda float32: até 24 h por célula, erro de arredondamento abaixo de 1e-5 h
+        np.testing.assert_allclose(matriz.parada[:, k], esperado.reindex(matriz.equipamentos), rtol=0, atol=1e-5)
+
+def test_totais_da_matriz_iguais_a_df():
+    df = _falhas_longas(300, seed=1)
+    periodo = (pd.Timestamp('2024-01-05'), pd.Timestamp('2024-02-20'))
+    matriz = MatrizDisponibilidade(df, *janela_dias(periodo))
+    calculada = secoes_kpis.disponibilidade_por_equipamento(df, pd.DataFrame(), periodo).set_index('EQUIPAMENTO')
+
+    for frequencia in ('D', 'W', 'M'):
+        _, parada, horas = matriz.agrupar(frequencia)
+        df_matriz = (1 - parada.sum(axis=1, dtype=np.float64) / horas.sum()) * 100
+        # Só o arredondamento das células float32 separa as duas (~1e-6 ponto percentual)
+        np.testing.assert_allclose(
+            df_matriz, calculada['DF_Alcancada_Calculada (%)'].reindex(matriz.equipamentos), rtol=0, atol=1e-5
+        )
+
+    # A série da frota divide a parada de todos pelas horas de todos os equipamentos
+    frota = matriz.serie_frota('M')
+    _, parada, horas = matriz.agrupar('M')
+    np.testing.assert_allclose(frota['DF (%)'], (1 - parada.sum(axis=0) / (horas * len(matriz.equipamentos))) * 100)
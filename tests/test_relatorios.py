@@ -0,0 +1,65 @@
+# tests/test_relatorios.py
+
+import os
+import time
+
+import pytest
+
+from modules import relatorios
+
+def _gravar_pdf(*dados):
+    with open(dados[-1], 'wb') as arquivo:
+        arquivo.write(b'%PDF')
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """Pasta temporária dos relatórios isolada por teste; o PDF em si é trocado por alguns bytes."""
+    monkeypatch.setattr(relatorios, 'PASTA_TEMPORARIOS', str(tmp_path / 'temporarios'))
+    monkeypatch.setattr(relatorios, '_temporarios_processo', set())
+    monkeypatch.setattr(relatorios, 'generate_pdf_report', _gravar_pdf)
+    return tmp_path / 'temporarios'
+
+def _envelhecer(caminho, segundos):
+    instante = time.time() - segundos
+    os.utime(caminho, (instante, instante))
+
+def test_relatorio_novo_substitui_o_anterior_da_sessao(pasta):
+    primeiro = relatorios.gerar_relatorio_pdf_temporario('dados')
+    segundo = relatorios.gerar_relatorio_pdf_temporario('dados', anterior=primeiro)
+    assert os.path.dirname(segundo) == str(pasta)
+    assert not os.path.exists(primeiro)
+    assert os.listdir(pasta) == [os.path.basename(segundo)]
+    assert relatorios._temporarios_processo == {segundo}
+
+def test_falha_na_geracao_nao_deixa_arquivo(pasta, monkeypatch):
+    def falhar(*dados):
+        raise RuntimeError('fpdf')
+    monkeypatch.setattr(relatorios, 'generate_pdf_report', falhar)
+    with pytest.raises(RuntimeError):
+        relatorios.gerar_relatorio_pdf_temporario('dados')
+    assert os.listdir(pasta) == []
+    assert relatorios._temporarios_processo == set()
+
+def test_arquivos_de_sessoes_abandonadas_expiram(pasta):
+    # Sessões que nunca geraram outro relatório: um PDF, um zip e uma pasta de lote interrompido
+    antigos = [relatorios.gerar_relatorio_pdf_temporario('dados'), relatorios._novo_temporario('relatorios_manutencao_', '.zip')]
+    lote = pasta / 'relatorios_lote_x'
+    lote.mkdir()
+    (lote / 'EQ1.pdf').write_bytes(b'%PDF')
+    for caminho in [*antigos, lote]:
+        _envelhecer(caminho, relatorios.VALIDADE_TEMPORARIOS + 60)
+    recente = relatorios.gerar_relatorio_pdf_temporario('dados')
+
+    assert os.listdir(pasta) == [os.path.basename(recente)]
+    assert relatorios._temporarios_processo == {recente}
+    assert relatorios.limpar_temporarios_antigos(pasta=str(pasta)) == 0
+
+def test_limpeza_sem_pasta():
+    assert relatorios.limpar_temporarios_antigos(pasta='/caminho/que/nao/existe') == 0
+
+def test_arquivos_do_processo_removidos_ao_encerrar(pasta):
+    caminhos = [relatorios.gerar_relatorio_pdf_temporario('dados') for _ in range(3)]
+    os.remove(caminhos[0])  # já removido por fora não impede a limpeza dos demais
+    relatorios._remover_temporarios_processo()
+    assert os.listdir(pasta) == []
+    assert relatorios._temporarios_processo == set()
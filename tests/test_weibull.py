@@ -0,0 +1,118 @@
+# tests/test_weibull.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.weibull import ajustar_weibull, ajustar_weibull_3p, ajustar_weibull_por_grupo, tempos_entre_falhas
+
+def _amostra(n, censura, seed=0, beta=1.7, eta=120.0):
+    """Tempos Weibull(beta, eta) e, com censura, limites de observação uniformes (True: censurado)."""
+    rng = np.random.default_rng(seed)
+    tempos = eta * rng.weibull(beta, n)
+    if not censura:
+        return tempos, None
+    limites = rng.uniform(0, 2 * eta, n)
+    return np.minimum(tempos, limites), tempos > limites
+
+@pytest.mark.parametrize('censura', [False, True], ids=['sem_censura', 'com_censura'])
+@pytest.mark.parametrize('n', [30, 500, 5000])
+def test_numpy_igual_ao_lifelines(n, censura):
+    pytest.importorskip('lifelines')
+    tempos, censurados = _amostra(n, censura, seed=n)
+    proprio = ajustar_weibull(tempos, 'numpy', censurados)
+    referencia = ajustar_weibull(tempos, 'lifelines', censurados)
+
+    # beta/eta correspondem a rho_/lambda_ do WeibullFitter; a diferença que sobra (~1e-6) é a
+    # tolerância de parada do otimizador do lifelines, o Newton próprio converge a 1e-10
+    assert proprio.beta == pytest.approx(referencia.beta, rel=1e-5)
+    assert proprio.eta == pytest.approx(referencia.eta, rel=1e-5)
+    assert proprio.n_censurados == referencia.n_censurados == (0 if censurados is None else censurados.sum())
+
+@pytest.mark.parametrize('fracao_censura', [0.0, 0.3, 0.8], ids=['sem_censura', 'censura_moderada', 'censura_pesada'])
+def test_3p_no_maximo_da_verossimilhanca(fracao_censura):
+    # Limites de observação uniformes desde 0: muitos tempos censurados caem antes da localização gama = 100
+    stats = pytest.importorskip('scipy.stats')
+    minimize = pytest.importorskip('scipy.optimize').minimize
+    rng = np.random.default_rng(7)
+    tempos = 100 + 150 * rng.weibull(3.0, 2000)
+    censurados = rng.random(2000) < fracao_censura
+    tempos = np.where(censurados, rng.uniform(0, tempos), tempos)
+    ajuste = ajustar_weibull_3p(tempos, censurados=censurados)
+
+    def menos_log_verossimilhanca(parametros):
+        beta, gama, eta = parametros
+        if beta <= 0 or eta <= 0 or not 0 <= gama < tempos[~censurados].min():
+            return np.inf
+        weibull = stats.weibull_min(beta, loc=gama, scale=eta)
+        return -(weibull.logpdf(tempos[~censurados]).sum() + weibull.logsf(tempos[censurados]).sum())
+    beta, gama, eta = minimize(menos_log_verossimilhanca, [2.0, 50.0, 200.0], method='Nelder-Mead',
+                               options={'maxiter': 20000, 'xatol': 1e-8, 'fatol': 1e-10}).x
+
+    # Perto do máximo o perfil em gama é muito plano (com censura pesada, 0,2 h de gama mudam ln L em 1e-4):
+    # a verossimilhança é comparada a 1e-3 e os parâmetros só a 1%
+    assert (ajuste.beta, ajuste.gama, ajuste.eta) == pytest.approx((beta, gama, eta), rel=1e-2)
+    assert -menos_log_verossimilhanca([ajuste.beta, ajuste.gama, ajuste.eta]) == pytest.approx(
+        -menos_log_verossimilhanca([beta, gama, eta]), abs=1e-3
+    )
+
+def _tempos_por_grupo(n_grupos, seed=0):
+    """Tempos de grupos EQUIPAMENTO × ITEM de 1 a 40 linhas, formas e escalas variadas e ~20% censurados."""
+    rng = np.random.default_rng(seed)
+    tamanhos = rng.integers(1, 41, n_grupos)
+    tempos = np.concatenate([
+        rng.uniform(10, 500) * rng.weibull(rng.uniform(0.6, 3), tamanho) for tamanho in tamanhos
+    ])
+    grupos = np.repeat(np.arange(n_grupos), tamanhos)
+    df = pd.DataFrame({
+        'EQUIPAMENTO': grupos % 30,
+        'ITEM': grupos // 30,
+        'Tempo entre falhas (h)': tempos,
+        'Censurado': rng.random(len(tempos)) < 0.2,
+    })
+    # Um grupo com as falhas todas iguais, que não pode ser ajustado
+    df.loc[df['EQUIPAMENTO'].eq(0) & df['ITEM'].eq(0), ['Tempo entre falhas (h)', 'Censurado']] = [50.0, False]
+    return df
+
+@pytest.mark.parametrize('coluna_censura', [None, 'Censurado'], ids=['sem_censura', 'com_censura'])
+def test_ajuste_por_grupo_igual_ao_ajuste_individual(coluna_censura):
+    df = _tempos_por_grupo(300)
+    tabela = ajustar_weibull_por_grupo(df, ['EQUIPAMENTO', 'ITEM'], coluna_censura=coluna_censura)
+    assert len(tabela) == df.groupby(['EQUIPAMENTO', 'ITEM']).ngroups
+
+    ajustados = 0
+    for linha, (_, grupo) in zip(tabela.itertuples(), df.groupby(['EQUIPAMENTO', 'ITEM'], sort=True)):
+        censurados = None if coluna_censura is None else grupo[coluna_censura]
+        try:
+            individual = ajustar_weibull(grupo['Tempo entre falhas (h)'], censurados=censurados)
+        except ValueError:
+            assert np.isnan(linha.Beta) and np.isnan(linha.Eta)
+            continue
+        # Os dois Newton param com passo <= 1e-10 * beta; a diferença observada fica abaixo de 1e-10
+        assert linha.Beta == pytest.approx(individual.beta, rel=1e-9)
+        assert linha.Eta == pytest.approx(individual.eta, rel=1e-9)
+        assert linha.Amostras == individual.n and linha.Censurados == individual.n_censurados
+        ajustados += 1
+    assert ajustados > 250
+
+def _falhas(datas_iniciais, datas_finais):
+    return pd.DataFrame({
+        'EQUIPAMENTO': 'EQ1',
+        'ITEM': 'MOTOR',
+        'DATA INICIAL': pd.to_datetime(pd.Series(datas_iniciais, dtype=object)),
+        'DATA FINAL': pd.to_datetime(pd.Series(datas_finais, dtype=object)),
+    })
+
+@pytest.mark.parametrize('fim_periodo', [None, '2024-02-01'])
+@pytest.mark.parametrize('datas_finais', [[], [None, None]], ids=['sem_linhas', 'sem_data_final'])
+def test_tempos_entre_falhas_sem_dados_validos(datas_finais, fim_periodo):
+    df = _falhas(['2024-01-01', '2024-01-05'][:len(datas_finais)], datas_finais)
+    tabela = tempos_entre_falhas(df, fim_periodo)
+    assert tabela.empty
+    assert list(tabela.columns) == ['EQUIPAMENTO', 'ITEM', 'Tempo entre falhas (h)', 'Censurado']
+
+def test_tempos_entre_falhas_censura_o_ultimo_intervalo():
+    df = _falhas(['2024-01-01 00:00', '2024-01-03 00:00'], ['2024-01-01 02:00', '2024-01-03 04:00'])
+    tabela = tempos_entre_falhas(df, '2024-01-04 00:00')
+    assert tabela['Tempo entre falhas (h)'].tolist() == [46.0, 20.0]
+    assert tabela['Censurado'].tolist() == [False, True]